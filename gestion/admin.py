@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Programa, Asignatura, Estudiante, Seccion, PeriodoAcademico, Inscripcion, DetalleInscripcion, Docente, Administrador
+from .models import Programa, Asignatura, Estudiante, Seccion, PeriodoAcademico, Inscripcion, DetalleInscripcion, Docente, Administrador, CorreoPendiente, AlertaTemprana
 
 @admin.register(Programa)
 class ProgramaAdmin(admin.ModelAdmin):
@@ -25,13 +25,20 @@ class SeccionAdmin(admin.ModelAdmin):
 
 @admin.register(Estudiante)
 class EstudianteAdmin(admin.ModelAdmin):
-    list_display = ('cedula', 'get_full_name', 'programa')
+    list_display = ('cedula', 'get_full_name', 'programa', 'get_avance')
     search_fields = ('cedula', 'usuario__first_name', 'usuario__last_name')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_avance().select_related('usuario', 'programa')
+
     @admin.display(description='Nombre Completo')
     def get_full_name(self, obj):
         return obj.usuario.get_full_name()
 
+    @admin.display(description='Avance (%)', ordering='avance')
+    def get_avance(self, obj):
+        return obj.avance
+
 @admin.register(Docente)
 class DocenteAdmin(admin.ModelAdmin):
     list_display = ('cedula', 'get_full_name', 'telefono', 'tipo_contratacion')
@@ -53,3 +60,49 @@ class AdministradorAdmin(admin.ModelAdmin):
 @admin.register(PeriodoAcademico)
 class PeriodoAdmin(admin.ModelAdmin):
     list_display = ('nombre_periodo', 'activo')
+    actions = ['simular_recalculo_notas', 'recalcular_notas', 'congelar_estadisticas']
+
+    @admin.action(description='Simular recálculo de notas finales (sin guardar)')
+    def simular_recalculo_notas(self, request, queryset):
+        from gestion.calificaciones import recalcular_notas
+        for periodo in queryset:
+            cambios = recalcular_notas(periodo, simular=True)
+            self.message_user(request, f"{periodo}: {len(cambios)} registros cambiarían.")
+
+    @admin.action(description='Recalcular notas finales del período')
+    def recalcular_notas(self, request, queryset):
+        from gestion.calificaciones import recalcular_notas
+        for periodo in queryset:
+            cambios = recalcular_notas(periodo)
+            self.message_user(request, f"{periodo}: {len(cambios)} registros actualizados.")
+
+    @admin.action(description='Congelar estadísticas del período (instantánea)')
+    def congelar_estadisticas(self, request, queryset):
+        from gestion.estadisticas import congelar_periodo
+        for periodo in queryset:
+            filas = congelar_periodo(periodo)
+            self.message_user(request, f"{periodo}: {filas} agregados congelados.")
+
+
+@admin.register(CorreoPendiente)
+class CorreoPendienteAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'destinatarios', 'estado', 'intentos', 'proximo_intento', 'creado', 'enviado')
+    list_filter = ('estado',)
+    search_fields = ('asunto', 'destinatarios')
+    actions = ['reintentar']
+
+    @admin.action(description='Reintentar envío de los correos seleccionados')
+    def reintentar(self, request, queryset):
+        from django.utils import timezone
+        total = queryset.exclude(estado=CorreoPendiente.ENVIADO).update(
+            estado=CorreoPendiente.PENDIENTE, intentos=0, proximo_intento=timezone.now(), ultimo_error=''
+        )
+        self.message_user(request, f"{total} correos devueltos a la bandeja de salida.")
+
+
+@admin.register(AlertaTemprana)
+class AlertaTempranaAdmin(admin.ModelAdmin):
+    list_display = ('estudiante', 'detalle', 'periodo', 'tipo', 'promedio', 'nota_necesaria', 'detectada')
+    list_filter = ('tipo', 'periodo')
+    search_fields = ('estudiante__cedula', 'estudiante__usuario__first_name', 'estudiante__usuario__last_name')
+    list_select_related = ('estudiante__usuario', 'detalle__asignatura', 'periodo')
@@ -0,0 +1,115 @@
+"""
+Alerta temprana de rendimiento por lotes.
+
+`escanear` evalúa en una sola consulta todas las asignaturas del período: la
+cantidad de notas parciales, su suma y la nota necesaria para aprobar se calculan
+en la base de datos para todas las filas a la vez. El resultado se compara con las
+alertas vigentes (AlertaTemprana) y solo se notifica a quien entra en riesgo o
+reprueba por primera vez; editar de nuevo una nota no repite el correo.
+
+Lo ejecutan `manage.py escanear_alertas`, la tarea periódica de Huey y la carga
+de calificaciones en lote (limitado a los detalles cargados).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+
+from gestion.cache import incrementar
+from gestion.models import AlertaTemprana, DetalleInscripcion, PeriodoAcademico
+from gestion.notifications import notify_student_failure, notify_student_risk
+
+# Alcance de caché (gestion.cache) del listado de alertas.
+ALCANCE = 'alertas'
+
+NOTAS_PARCIALES = ['nota1', 'nota2', 'nota3', 'nota4']
+
+# Con 3 parciales cargadas hay riesgo si la cuarta necesaria es de 15 puntos o más,
+# es decir si la suma no pasa de 25; con las 4 se reprueba si la suma es menor que 40.
+PUNTOS_PARA_APROBAR = 40
+NECESARIO_RIESGO = 15
+
+
+def candidatos(periodo, detalle_ids=None):
+    """Detalles del período en riesgo o reprobados, anotados con num_notas y suma_notas."""
+    detalles = DetalleInscripcion.objects.filter(
+        inscripcion__periodo=periodo, estatus__in=['CURSANDO', 'REPROBADO']
+    )
+    if detalle_ids is not None:
+        detalles = detalles.filter(pk__in=detalle_ids)
+    return detalles.annotate(
+        num_notas=sum(
+            (Case(When(**{f'{campo}__isnull': False}, then=Value(1)), default=Value(0), output_field=IntegerField())
+             for campo in NOTAS_PARCIALES),
+            Value(0),
+        ),
+        suma_notas=sum(
+            (Coalesce(F(campo), Value(Decimal('0')), output_field=DecimalField(max_digits=6, decimal_places=2))
+             for campo in NOTAS_PARCIALES),
+            Value(Decimal('0')),
+        ),
+    ).filter(
+        Q(num_notas=3, suma_notas__lte=PUNTOS_PARA_APROBAR - NECESARIO_RIESGO)
+        | Q(num_notas=4, suma_notas__lt=PUNTOS_PARA_APROBAR)
+    ).select_related('asignatura', 'inscripcion__estudiante__usuario')
+
+
+def _alerta(detalle, periodo):
+    suma = Decimal(detalle.suma_notas)
+    riesgo = detalle.num_notas == 3
+    return AlertaTemprana(
+        detalle=detalle,
+        estudiante_id=detalle.inscripcion.estudiante_id,
+        periodo=periodo,
+        tipo=AlertaTemprana.RIESGO if riesgo else AlertaTemprana.REPROBADO,
+        promedio=(suma / detalle.num_notas).quantize(Decimal('0.01')),
+        nota_necesaria=PUNTOS_PARA_APROBAR - suma if riesgo else None,
+    )
+
+
+def escanear(periodo=None, detalle_ids=None, notificar=True):
+    """
+    Actualiza las alertas del período (por defecto el activo) y notifica las nuevas.
+    Con detalle_ids solo se evalúan esos detalles. Retorna los conteos
+    {'nuevas', 'resueltas', 'vigentes'}.
+    """
+    if periodo is None:
+        periodo = PeriodoAcademico.objects.filter(activo=True).first()
+        if periodo is None:
+            return {'nuevas': 0, 'resueltas': 0, 'vigentes': 0}
+
+    detalles = {d.pk: d for d in candidatos(periodo, detalle_ids)}
+    alertas = [_alerta(detalle, periodo) for detalle in detalles.values()]
+
+    previas = AlertaTemprana.objects.filter(periodo=periodo)
+    if detalle_ids is not None:
+        previas = previas.filter(detalle_id__in=detalle_ids)
+    previas = dict(previas.values_list('detalle_id', 'tipo'))
+
+    nuevas = [alerta for alerta in alertas if previas.get(alerta.detalle_id) != alerta.tipo]
+    resueltas = previas.keys() - detalles.keys()
+
+    with transaction.atomic():
+        if alertas:
+            AlertaTemprana.objects.bulk_create(
+                alertas, update_conflicts=True, unique_fields=['detalle'],
+                update_fields=['tipo', 'promedio', 'nota_necesaria', 'actualizada'],
+            )
+        if resueltas:
+            AlertaTemprana.objects.filter(periodo=periodo, detalle_id__in=resueltas).delete()
+        if notificar and nuevas:
+            transaction.on_commit(lambda: _notificar(nuevas))
+    if nuevas or resueltas:
+        incrementar(ALCANCE)
+
+    return {'nuevas': len(nuevas), 'resueltas': len(resueltas), 'vigentes': len(alertas)}
+
+
+def _notificar(alertas):
+    for alerta in alertas:
+        estudiante = alerta.detalle.inscripcion.estudiante
+        if alerta.tipo == AlertaTemprana.RIESGO:
+            notify_student_risk(estudiante, alerta.detalle.asignatura, alerta.promedio, alerta.nota_necesaria)
+        else:
+            notify_student_failure(estudiante, alerta.detalle.asignatura, alerta.promedio)
@@ -0,0 +1,69 @@
+"""
+GET condicional (ETag / 304) para endpoints de lectura pesados.
+
+El ETag se arma con las versiones de los alcances de gestion.cache de los
+que depende la respuesta, el usuario y la URL completa. Si el cliente envía
+ese mismo ETag en If-None-Match se responde 304 antes de ejecutar cualquier
+consulta o serialización de la vista. Los alcances se incrementan desde
+gestion.signals cuando cambian los datos.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from gestion.cache import version
+
+
+def calcular_etag(request, nombre, alcances, por_dia=False):
+    partes = [nombre, str(request.user.pk), request.get_full_path()]
+    if por_dia:
+        partes.append(date.today().isoformat())
+    partes += [f'{alcance}={version(alcance)}' for alcance in alcances]
+    return '"%s"' % hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+def _etags_solicitados(request):
+    cabecera = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return {etag.strip().removeprefix('W/') for etag in cabecera.split(',') if etag.strip()}
+
+
+def alcance_estudiante(vista, request):
+    """Alcance de caché del estudiante autenticado (ninguno si el usuario no es estudiante)."""
+    from gestion.models import Estudiante
+    estudiante_id = Estudiante.objects.filter(usuario=request.user).values_list('pk', flat=True).first()
+    return [f'estudiante:{estudiante_id}'] if estudiante_id else []
+
+
+def con_etag(*alcances, por_dia=False):
+    """
+    Decorador para métodos de ViewSet que responden GET.
+
+    Cada alcance es un nombre (por ejemplo 'secciones') o una función
+    (vista, request) -> lista de nombres, para alcances que dependen del usuario.
+    Con por_dia=True el ETag también cambia con la fecha (respuestas que
+    dependen del día actual, como el estado de los períodos).
+    Se aplica después de la autenticación y los permisos de DRF.
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            nombres = []
+            for alcance in alcances:
+                nombres.extend(alcance(self, request) if callable(alcance) else [alcance])
+            etag = calcular_etag(request, f'{type(self).__name__}.{metodo.__name__}', nombres, por_dia)
+
+            if etag in _etags_solicitados(request):
+                respuesta = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                respuesta = metodo(self, request, *args, **kwargs)
+                if respuesta.status_code != status.HTTP_200_OK:
+                    return respuesta
+            respuesta['ETag'] = etag
+            # El navegador puede guardar la respuesta pero debe revalidarla siempre.
+            respuesta['Cache-Control'] = 'private, no-cache'
+            return respuesta
+        return envoltura
+    return decorador
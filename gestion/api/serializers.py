@@ -153,7 +153,8 @@ class SeccionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Seccion
-        fields = ['id', 'asignatura', 'nombre_asignatura', 'codigo_asignatura', 'codigo_seccion', 'docente', 'docente_nombre', 'estudiantes_count', 'horarios']
+        fields = ['id', 'asignatura', 'nombre_asignatura', 'codigo_asignatura', 'codigo_seccion', 'docente', 'docente_nombre', 'estudiantes_count', 'cupo_maximo', 'inscritos', 'horarios']
+        read_only_fields = ['inscritos']
 
     def get_docente_nombre(self, obj):
         if obj.docente:
@@ -222,6 +223,9 @@ class AsignaturaSerializer(serializers.ModelSerializer):
 class EstudianteSerializer(serializers.ModelSerializer):
     usuario = UserSerializer(read_only=True)
     nombre_completo = serializers.SerializerMethodField()
+    porcentaje_avance = serializers.SerializerMethodField()
+    aprobadas = serializers.SerializerMethodField()
+    total_asignaturas = serializers.SerializerMethodField()
 
     first_name = serializers.CharField(write_only=True, required=False)
     last_name = serializers.CharField(write_only=True, required=False)
@@ -229,7 +233,8 @@ class EstudianteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Estudiante
-        fields = ['id', 'usuario', 'nombre_completo', 'cedula', 'telefono', 'programa', 'fecha_ingreso', 'first_name', 'last_name', 'email']
+        fields = ['id', 'usuario', 'nombre_completo', 'cedula', 'telefono', 'programa', 'fecha_ingreso',
+                  'porcentaje_avance', 'aprobadas', 'total_asignaturas', 'first_name', 'last_name', 'email']
         read_only_fields = ['fecha_ingreso', 'nombre_completo']
 
     def get_nombre_completo(self, obj):
@@ -238,6 +243,24 @@ class EstudianteSerializer(serializers.ModelSerializer):
         except Exception:
             return str(obj.usuario)
 
+    def _anotado(self, obj):
+        # Los listados usan Estudiante.objects.con_avance(); tras crear o editar
+        # se anota solo esta instancia.
+        if not hasattr(obj, 'avance'):
+            anotado = Estudiante.objects.con_avance().filter(pk=obj.pk).values('avance', 'aprobadas', 'total_asignaturas').first() or {}
+            for campo in ('avance', 'aprobadas', 'total_asignaturas'):
+                setattr(obj, campo, anotado.get(campo, 0))
+        return obj
+
+    def get_porcentaje_avance(self, obj):
+        return self._anotado(obj).avance
+
+    def get_aprobadas(self, obj):
+        return self._anotado(obj).aprobadas
+
+    def get_total_asignaturas(self, obj):
+        return self._anotado(obj).total_asignaturas
+
     def update(self, instance, validated_data):
         user = instance.usuario
         user_changed = False
@@ -415,3 +438,18 @@ class DocumentoCalificacionesSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Tipo de archivo no permitido (ext)")
 
         return value
+
+
+class AuditoriaNotaSerializer(serializers.ModelSerializer):
+    usuario_nombre = serializers.SerializerMethodField()
+
+    class Meta:
+        from gestion.models import AuditoriaNota
+        model = AuditoriaNota
+        fields = ['id', 'detalle', 'estudiante', 'seccion', 'periodo', 'campo', 'valor_anterior', 'valor_nuevo',
+                  'usuario', 'usuario_nombre', 'origen', 'fecha']
+
+    def get_usuario_nombre(self, obj):
+        if obj.usuario:
+            return obj.usuario.get_full_name() or obj.usuario.username
+        return None
@@ -12,8 +12,12 @@ from gestion.utils import apply_excel_styling
 from gestion.api.serializers import (
     EstudianteSerializer, AsignaturaSerializer, PensumSerializer,
     PlanificacionSerializer, DocumentoCalificacionesSerializer, CreateUserSerializer, UserSerializer,
-    ProgramaSerializer, SeccionSerializer, DocenteSerializer, AdministradorSerializer, PeriodoAcademicoSerializer
+    ProgramaSerializer, SeccionSerializer, DocenteSerializer, AdministradorSerializer, PeriodoAcademicoSerializer,
+    AuditoriaNotaSerializer
 )
+from gestion.api.etag import con_etag, alcance_estudiante
+from gestion import resumenes
+from gestion.resumenes import obtener as obtener_resumen, obtener_varios as obtener_resumenes
 from gestion.permissions import IsAdmin, IsDocente, IsEstudiante, IsDocenteOrAdminOrOwner, IsDocenteOrAdmin
 from django.contrib.auth.models import User
 
@@ -36,6 +40,13 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             return [IsEstudiante()]
         return []
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            # Avance anotado en el mismo SELECT: sin consultas por estudiante.
+            queryset = queryset.con_avance().select_related('usuario', 'programa').prefetch_related('usuario__groups')
+        return queryset
+
     def perform_destroy(self, instance):
         """Al eliminar un estudiante, también elimina el usuario de Django asociado."""
         user = instance.usuario
@@ -506,13 +517,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def progreso(self, request, pk=None):
         estudiante = self.get_object()
-        avance = estudiante.calcular_avance()
-
-        total_asignaturas = Estudiante.objects.filter(pk=estudiante.pk).exists() and estudiante.programa and estudiante.programa and estudiante.programa.asignatura_set.count() or 0
-        aprobadas = DetalleInscripcion.objects.filter(
-            inscripcion__estudiante=estudiante,
-            nota_final__gte=10
-        ).count()
+        resumen = obtener_resumen(estudiante)
 
         nombre = ''
         try:
@@ -525,9 +530,11 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             'cedula': estudiante.cedula,
             'nombre': nombre,
             'programa': estudiante.programa.nombre_programa if estudiante.programa else '',
-            'porcentaje_avance': avance,
-            'total_asignaturas': total_asignaturas,
-            'aprobadas': aprobadas,
+            'porcentaje_avance': resumen.avance,
+            'total_asignaturas': resumen.total_asignaturas,
+            'aprobadas': resumen.aprobadas,
+            'uc_aprobadas': resumen.uc_aprobadas,
+            'indice': float(resumen.indice) if resumen.indice is not None else None,
         }
         return Response(datos)
 
@@ -575,13 +582,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         except Estudiante.DoesNotExist:
             return Response({'error': 'No tienes perfil de estudiante.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        avance = estudiante.calcular_avance()
-        
-        total_asignaturas = estudiante.programa.asignatura_set.count() if estudiante.programa else 0
-        aprobadas = DetalleInscripcion.objects.filter(
-            inscripcion__estudiante=estudiante,
-            nota_final__gte=10
-        ).count()
+        resumen = obtener_resumen(estudiante)
 
         nombre = ''
         try:
@@ -595,10 +596,12 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             'nombre': nombre,
             'nombre_completo': nombre,
             'programa': estudiante.programa.nombre_programa if estudiante.programa else '',
-            'porcentaje_avance': avance,
-            'total_asignaturas': total_asignaturas,
-            'aprobadas': aprobadas,
-            'uc_actuales': estudiante.get_uc_periodo_actual() if hasattr(estudiante, 'get_uc_periodo_actual') else 0
+            'porcentaje_avance': resumen.avance,
+            'total_asignaturas': resumen.total_asignaturas,
+            'aprobadas': resumen.aprobadas,
+            'uc_actuales': resumen.uc_periodo_actual,
+            'uc_aprobadas': resumen.uc_aprobadas,
+            'indice': float(resumen.indice) if resumen.indice is not None else None,
         })
 
 
@@ -622,14 +625,16 @@ class EstudianteViewSet(viewsets.ModelViewSet):
             cell.font = header_font
 
         row_num = 4
-        for est in Estudiante.objects.select_related('usuario', 'programa').all():
+        estudiantes = list(Estudiante.objects.select_related('usuario', 'programa', 'resumen'))
+        por_estudiante = obtener_resumenes(estudiantes)
+        for est in estudiantes:
             ws.cell(row=row_num, column=1, value=est.usuario.first_name)
             ws.cell(row=row_num, column=2, value=est.usuario.last_name)
             ws.cell(row=row_num, column=3, value=est.cedula)
             ws.cell(row=row_num, column=4, value=est.telefono)
             ws.cell(row=row_num, column=5, value=est.usuario.email)
             ws.cell(row=row_num, column=6, value=est.programa.nombre_programa if est.programa else '')
-            ws.cell(row=row_num, column=7, value=f"{est.calcular_avance()}")
+            ws.cell(row=row_num, column=7, value=f"{por_estudiante[est.pk].avance}")
             row_num += 1
 
         apply_excel_styling(ws, 3)
@@ -646,6 +651,14 @@ class AsignaturaViewSet(viewsets.ModelViewSet):
     filterset_fields = ['programa', 'semestre']
     search_fields = ['nombre_asignatura', 'codigo']
 
+    @con_etag('secciones', 'asignaturas', 'inscripciones', 'periodos', 'usuarios')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @con_etag('secciones', 'asignaturas', 'inscripciones', 'periodos', 'usuarios')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'], url_path='assign-docente')
     def assign_docente(self, request, pk=None):
         asignatura = self.get_object()
@@ -786,10 +799,71 @@ class ProgramaViewSet(viewsets.ModelViewSet):
     
     def get_permissions(self):
         from rest_framework.permissions import IsAuthenticated
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'prelaciones']:
             return [IsAuthenticated()]
         return [IsAdmin()]
 
+    @con_etag('programas')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @con_etag('programas')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def prelaciones(self, request, pk=None):
+        """
+        Pensum del programa en orden topológico, con las prelaciones directas,
+        transitivas y las asignaturas que desbloquea cada asignatura.
+        """
+        from gestion.prelaciones import obtener_grafo
+        programa = self.get_object()
+        grafo = obtener_grafo(programa.pk)
+
+        asignaturas = []
+        for asignatura_id in grafo.topologico():
+            item = grafo.info(asignatura_id)
+            item['prelaciones'] = grafo.prelaciones(asignatura_id)
+            item['prelaciones_transitivas'] = grafo.prelaciones_transitivas(asignatura_id)
+            item['desbloquea'] = grafo.desbloquea(asignatura_id)
+            asignaturas.append(item)
+        return Response({'programa_id': programa.pk, 'asignaturas': asignaturas})
+
+class AuditoriaNotaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta del historial de cambios de notas, filtrable por estudiante,
+    sección, período, detalle, campo y rango de fechas (fecha__gte / fecha__lte).
+    Los docentes solo ven el historial de sus secciones.
+    """
+    from rest_framework.pagination import PageNumberPagination
+
+    class Paginacion(PageNumberPagination):
+        page_size = 100
+        page_size_query_param = 'page_size'
+        max_page_size = 1000
+
+    serializer_class = AuditoriaNotaSerializer
+    permission_classes = [IsDocenteOrAdmin]
+    pagination_class = Paginacion
+    filterset_fields = {
+        'estudiante': ['exact'],
+        'seccion': ['exact'],
+        'periodo': ['exact'],
+        'detalle': ['exact'],
+        'campo': ['exact'],
+        'fecha': ['gte', 'lte'],
+    }
+
+    def get_queryset(self):
+        from gestion.models import AuditoriaNota
+        queryset = AuditoriaNota.objects.select_related('usuario')
+        user = self.request.user
+        if not user.is_superuser and not user.groups.filter(name='Administrador').exists():
+            queryset = queryset.filter(seccion__docente=user)
+        return queryset
+
+
 class UserManagementViewSet(viewsets.ViewSet):
     """Endpoints para que el administrador cree usuarios (docente/estudiante)."""
     permission_classes = [IsAdmin]
@@ -1010,10 +1084,7 @@ class DocumentoCalificacionesViewSet(viewsets.ModelViewSet):
         if estudiante.usuario != self.request.user and not self.request.user.is_superuser and not self.request.user.groups.filter(name='Docente').exists():
             raise PermissionError('No autorizado')
         doc = serializer.save()
-        try:
-            doc.estudiante.calcular_avance()
-        except Exception:
-            pass
+        resumenes.marcar(doc.estudiante_id)
 
 
 class SeccionViewSet(viewsets.ModelViewSet):
@@ -1023,6 +1094,7 @@ class SeccionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['asignatura', 'asignatura__programa', 'docente']
 
     @action(detail=False, methods=['get'], url_path='master-horario')
+    @con_etag('secciones', 'programas', 'usuarios')
     def master_horario(self, request):
         """
         Retorna horarios de todas las secciones, filtrable por programa, semestre y sección.
@@ -1559,13 +1631,13 @@ class SeccionViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         from rest_framework.permissions import IsAuthenticated
-        if self.action in ['list', 'retrieve', 'estudiantes']:
+        if self.action in ['list', 'retrieve', 'estudiantes', 'simular_inscripcion']:
             return [IsAuthenticated()]
         if self.action in ['inscribir_estudiante', 'desinscribir_estudiante', 'descargar_listado', 'master_horario', 'descargar_master_horario']:
             return [IsDocenteOrAdmin()]
-        if self.action in ['inscribirme', 'desinscribirme']:
+        if self.action in ['inscribirme', 'desinscribirme', 'inscribir_lote', 'estado_solicitud', 'disponibles']:
             return [IsEstudiante()]
-        if self.action in ['mis_secciones', 'calificar']:
+        if self.action in ['mis_secciones', 'calificar', 'calificar_lote', 'importar_notas']:
             return [IsDocente()]
         return [IsAdmin()]
 
@@ -1655,6 +1727,38 @@ class SeccionViewSet(viewsets.ModelViewSet):
         wb.save(response)
         return response
 
+    @action(detail=True, methods=['post'], url_path='importar-notas', parser_classes=[MultiPartParser, FormParser])
+    def importar_notas(self, request, pk=None):
+        """
+        Importa las notas desde la planilla de evaluación (formato de descargar-listado).
+        Retorna por fila los cambios aplicados; si alguna fila es inválida no se guarda ninguna.
+        """
+        from gestion.calificaciones import importar_planilla
+
+        seccion = self.get_object()
+        user = request.user
+
+        if not user.is_superuser and not user.groups.filter(name='Administrador').exists():
+            if seccion.docente != user:
+                return Response({'error': 'No estás asignado a esta sección.'}, status=status.HTTP_403_FORBIDDEN)
+
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'Se requiere el archivo de la planilla.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultado = importar_planilla(seccion, archivo)
+        if 'errores' in resultado:
+            return Response({
+                'error': 'No se guardó ninguna calificación: revisa las filas con error.',
+                'errores': resultado['errores']
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'Calificaciones importadas.',
+            'modificadas': sum(1 for fila in resultado['filas'] if fila['cambios']),
+            'filas': resultado['filas']
+        })
+
     @action(detail=True, methods=['post'], url_path='inscribir-estudiante')
     def inscribir_estudiante(self, request, pk=None):
         """Permite a un docente inscribir un estudiante en su sección asignada."""
@@ -1706,12 +1810,200 @@ class SeccionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if settings.INSCRIPCIONES_EN_COLA:
+            from gestion.inscripciones import encolar_solicitud
+            solicitud = encolar_solicitud(estudiante, seccion)
+            return Response({
+                'status': 'Solicitud de inscripción recibida. Consulta su estado en unos segundos.',
+                'solicitud_id': solicitud.id,
+                'estado': solicitud.estado
+            }, status=status.HTTP_202_ACCEPTED)
+
         result = self._inscribir_estudiante_en_seccion(estudiante, seccion)
         if result.get('error'):
             return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({'status': 'Te has inscrito exitosamente.', 'detalle_id': result.get('detalle_id')})
 
+    @action(detail=False, methods=['get'], url_path=r'solicitudes/(?P<solicitud_id>[0-9]+)')
+    def estado_solicitud(self, request, solicitud_id=None):
+        """Consulta liviana del estado de una solicitud de inscripción encolada."""
+        from gestion.models import SolicitudInscripcion
+
+        solicitud = SolicitudInscripcion.objects.filter(
+            pk=solicitud_id, estudiante__usuario=request.user
+        ).values('id', 'seccion_id', 'estado', 'mensaje', 'detalle_id', 'creada', 'procesada').first()
+        if not solicitud:
+            return Response({'error': 'Solicitud no encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if solicitud['estado'] == SolicitudInscripcion.PENDIENTE:
+            solicitud['posicion'] = SolicitudInscripcion.objects.filter(
+                seccion_id=solicitud['seccion_id'], estado=SolicitudInscripcion.PENDIENTE, id__lte=solicitud['id']
+            ).count()
+        return Response(solicitud)
+
+    @action(detail=False, methods=['get'], url_path='disponibles')
+    def disponibles(self, request):
+        """
+        Devuelve todas las secciones del programa del estudiante autenticado
+        indicando si puede inscribirlas o por qué no (prelación, límite de UC o choque).
+        """
+        from gestion.inscripciones import secciones_disponibles
+
+        try:
+            estudiante = Estudiante.objects.get(usuario=request.user)
+        except Estudiante.DoesNotExist:
+            return Response({'error': 'No tienes perfil de estudiante.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(secciones_disponibles(estudiante))
+
+    @action(detail=False, methods=['post'], url_path='simular-inscripcion')
+    def simular_inscripcion(self, request):
+        """
+        Valida una combinación de secciones sin inscribir nada y retorna todos
+        los errores por sección junto con la grilla semanal resultante.
+        Docentes y administradores pueden simular para otro estudiante con 'estudiante_id'.
+        """
+        from gestion.inscripciones import simular_inscripcion
+
+        user = request.user
+        estudiante_id = request.data.get('estudiante_id')
+        es_staff = user.is_superuser or user.groups.filter(name__in=['Administrador', 'Docente']).exists()
+        try:
+            if estudiante_id and es_staff:
+                estudiante = Estudiante.objects.get(pk=estudiante_id)
+            else:
+                estudiante = Estudiante.objects.get(usuario=user)
+        except (Estudiante.DoesNotExist, ValueError):
+            return Response({'error': 'Estudiante no encontrado.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        seccion_ids = request.data.get('secciones')
+        if not isinstance(seccion_ids, list):
+            return Response({'error': 'Se requiere una lista de secciones.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            seccion_ids = list(dict.fromkeys(int(sid) for sid in seccion_ids))
+        except (TypeError, ValueError):
+            return Response({'error': 'Identificadores de sección inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(simular_inscripcion(estudiante, seccion_ids))
+
+    @action(detail=False, methods=['post'], url_path='inscribir-lote')
+    def inscribir_lote(self, request):
+        """
+        Inscribe al estudiante autenticado en varias secciones a la vez.
+        Las secciones se validan en conjunto (prelaciones, límite de UC y choques
+        entre ellas y con lo ya inscrito); si alguna falla no se inscribe ninguna.
+        """
+        from django.db import DatabaseError, transaction
+        from gestion.models import Inscripcion
+        from gestion.inscripciones import EstadoAcademico, mensaje_cupo_bloqueado, mensaje_sin_cupo
+        from gestion.cache import incrementar
+        from gestion import estadisticas
+
+        try:
+            estudiante = Estudiante.objects.get(usuario=request.user)
+        except Estudiante.DoesNotExist:
+            return Response({'error': 'No tienes perfil de estudiante.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        seccion_ids = request.data.get('secciones')
+        if not isinstance(seccion_ids, list) or not seccion_ids:
+            return Response({'error': 'Se requiere una lista de secciones.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            seccion_ids = list(dict.fromkeys(int(sid) for sid in seccion_ids))
+        except (TypeError, ValueError):
+            return Response({'error': 'Identificadores de sección inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        secciones = Seccion.objects.filter(pk__in=seccion_ids).select_related('asignatura').prefetch_related('horarios')
+        secciones_map = {seccion.pk: seccion for seccion in secciones}
+
+        estado = EstadoAcademico.para_inscripcion(estudiante)
+        resultados = []
+        aceptadas = []
+        for seccion_id in seccion_ids:
+            seccion = secciones_map.get(seccion_id)
+            if seccion is None:
+                error = 'Sección no encontrada.'
+            elif estudiante.programa_id != seccion.asignatura.programa_id:
+                error = 'Esta asignatura no pertenece a tu programa.'
+            else:
+                error = estado.validar(seccion)
+
+            resultado = {
+                'seccion_id': seccion_id,
+                'asignatura': seccion.asignatura.nombre_asignatura if seccion else None,
+            }
+            if error:
+                resultado['error'] = error
+            else:
+                estado.registrar(seccion)
+                aceptadas.append((seccion, resultado))
+            resultados.append(resultado)
+
+        if len(aceptadas) != len(seccion_ids):
+            return Response({
+                'error': 'No se realizó ninguna inscripción: revisa las secciones con error.',
+                'resultados': resultados
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Los cupos se reservan en orden de seccion_id: dos lotes con las mismas secciones
+        # en distinto orden bloquean las filas en la misma secuencia y no se interbloquean.
+        sin_cupo = []
+        reservando = None
+        try:
+            with transaction.atomic():
+                for seccion, resultado in sorted(aceptadas, key=lambda par: par[0].pk):
+                    reservando = (seccion, resultado)
+                    if not seccion.ocupar_cupo():
+                        sin_cupo.append(resultado)
+                reservando = None
+                if sin_cupo:
+                    transaction.set_rollback(True)
+                else:
+                    inscripcion, _ = Inscripcion.objects.get_or_create(
+                        estudiante=estudiante,
+                        periodo=estado.periodo
+                    )
+                    detalles = DetalleInscripcion.objects.bulk_create([
+                        DetalleInscripcion(
+                            inscripcion=inscripcion,
+                            asignatura=seccion.asignatura,
+                            seccion=seccion,
+                            estatus='CURSANDO'
+                        )
+                        for seccion, _ in aceptadas
+                    ])
+                    inscripcion.ajustar_contadores(total=len(detalles))
+                    estadisticas.marcar(*(seccion.pk for seccion, _ in aceptadas))
+                    resumenes.marcar(estudiante.pk)
+        except DatabaseError:
+            # Bloqueo o interbloqueo al reservar: se informa en la sección afectada, no como un 500.
+            if reservando is None:
+                raise
+            seccion, resultado = reservando
+            resultado['error'] = mensaje_cupo_bloqueado(seccion)
+            return Response({
+                'error': 'No se realizó ninguna inscripción: revisa las secciones con error.',
+                'resultados': resultados
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if sin_cupo:
+            for seccion, resultado in aceptadas:
+                if resultado in sin_cupo:
+                    resultado['error'] = mensaje_sin_cupo(seccion)
+            return Response({
+                'error': 'No se realizó ninguna inscripción: revisa las secciones con error.',
+                'resultados': resultados
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        for (seccion, resultado), detalle in zip(aceptadas, detalles):
+            resultado['detalle_id'] = detalle.id
+        incrementar(f'estudiante:{estudiante.pk}', 'inscripciones')
+
+        return Response({
+            'status': f'Te has inscrito exitosamente en {len(detalles)} secciones.',
+            'resultados': resultados
+        })
+
     @action(detail=True, methods=['post'], url_path='desinscribirme')
     def desinscribirme(self, request, pk=None):
         """Permite a un estudiante desinscribirse de una sección."""
@@ -1838,68 +2130,26 @@ class SeccionViewSet(viewsets.ModelViewSet):
             if seccion.docente != user:
                 return Response({'error': 'No estás asignado a esta sección.'}, status=status.HTTP_403_FORBIDDEN)
         
+        from gestion.calificaciones import aplicar_notas
+
         detalle_id = request.data.get('detalle_id')
-        nota1 = request.data.get('nota1')
-        nota2 = request.data.get('nota2')
-        nota3 = request.data.get('nota3')
-        nota4 = request.data.get('nota4')
-        nota_reparacion = request.data.get('nota_reparacion')
         
         if not detalle_id:
             return Response({'error': 'Se requiere detalle_id.'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            detalle = DetalleInscripcion.objects.get(pk=detalle_id, seccion=seccion)
+            # La inscripción, el estudiante y el período van en la misma consulta: los
+            # usan la auditoría, las señales y las notificaciones al guardar.
+            detalle = DetalleInscripcion.objects.select_related(
+                'asignatura', 'inscripcion__estudiante__usuario', 'inscripcion__periodo'
+            ).get(pk=detalle_id, seccion=seccion)
         except DetalleInscripcion.DoesNotExist:
             return Response({'error': 'Detalle de inscripción no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
         
-        from decimal import Decimal, InvalidOperation
-        def parse_nota(val):
-            if val is None or val == '':
-                return None
-            try:
-                nota = Decimal(str(val))
-                if nota < 1 or nota > 20:
-                    raise ValueError('Nota fuera de rango')
-                return nota
-            except (InvalidOperation, ValueError):
-                return None
-        
-        if nota1 is not None:
-            detalle.nota1 = parse_nota(nota1)
-        if nota2 is not None:
-            detalle.nota2 = parse_nota(nota2)
-        if nota3 is not None:
-            detalle.nota3 = parse_nota(nota3)
-        if nota4 is not None:
-            detalle.nota4 = parse_nota(nota4)
-        
-        if nota_reparacion is not None:
-            if nota_reparacion == '' or nota_reparacion is None:
-                detalle.nota_reparacion = None
-            else:
-                notas_actuales = [
-                    detalle.nota1 if nota1 is None else parse_nota(nota1),
-                    detalle.nota2 if nota2 is None else parse_nota(nota2),
-                    detalle.nota3 if nota3 is None else parse_nota(nota3),
-                    detalle.nota4 if nota4 is None else parse_nota(nota4)
-                ]
-                
-                if all(n is not None for n in notas_actuales):
-                    from decimal import Decimal
-                    promedio_temp = sum(notas_actuales) / Decimal(4)
-                    
-                    if promedio_temp >= 10:
-                        return Response({
-                            'error': 'Solo se puede cargar Nota de Reparación para estudiantes reprobados (promedio < 10).'
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response({
-                        'error': 'Debe cargar las 4 notas parciales antes de asignar una Nota de Reparación.'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                detalle.nota_reparacion = parse_nota(nota_reparacion)
-        
+        error = aplicar_notas(detalle, request.data)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
         detalle.save()  # El método save() calcula nota_final automáticamente
         
         return Response({
@@ -1909,127 +2159,54 @@ class SeccionViewSet(viewsets.ModelViewSet):
             'estatus': detalle.estatus
         })
 
-        return {'detalle_id': detalle.id}
-
-    def _inscribir_estudiante_en_seccion(self, estudiante, seccion, allow_conflicts=False):
-        """Método interno para realizar la inscripción con validaciones."""
-        from gestion.models import Inscripcion, DetalleInscripcion, PeriodoAcademico, Asignatura, Horario
-        from django.core.exceptions import ValidationError
-        from django.db.models import Sum, Q
-
-        asignatura = seccion.asignatura
-        user_requesting = self.request.user
-
-        
-        should_check_conflicts = True
-        if user_requesting.is_superuser or user_requesting.groups.filter(name='Administrador').exists() or user_requesting.groups.filter(name='Docente').exists():
-            should_check_conflicts = False
-
-        nombre_upper = asignatura.nombre_asignatura.upper()
-        if "SERVICIO COMUNITARIO" in nombre_upper:
-            total_creditos = Asignatura.objects.filter(programa=estudiante.programa).aggregate(total=Sum('creditos'))['total'] or 0
-            
-            creditos_aprobados = DetalleInscripcion.objects.filter(
-                inscripcion__estudiante=estudiante
-            ).filter(
-                Q(estatus='APROBADO') | Q(nota_final__gte=10)
-            ).aggregate(total=Sum('asignatura__creditos'))['total'] or 0
-
-            if creditos_aprobados < (total_creditos * 0.5):
-                porcentaje_actual = (creditos_aprobados / total_creditos * 100) if total_creditos > 0 else 0
-                return {
-                    'error': f'Requisito no cumplido: Para cursar Servicio Comunitario debes tener aprobado el 50% de las Unidades de Crédito. (Tienes: {creditos_aprobados} UC - {porcentaje_actual:.1f}%)'
-                }
+    @action(detail=True, methods=['post'], url_path='calificar-lote')
+    def calificar_lote(self, request, pk=None):
+        """
+        Carga las calificaciones de toda la sección en una sola solicitud.
+        Recibe {'calificaciones': [{'detalle_id', 'nota1', ..., 'nota_reparacion'}, ...]};
+        si alguna fila es inválida no se guarda ninguna.
+        """
+        from gestion.calificaciones import calificar_lote
 
-        periodo = PeriodoAcademico.objects.filter(activo=True, inscripciones_activas=True).first()
-        if not periodo:
-            periodo_cerrado = PeriodoAcademico.objects.filter(activo=True).first()
-            if periodo_cerrado:
-                return {'error': f'Las inscripciones están cerradas para el período {periodo_cerrado.nombre_periodo}.'}
-            return {'error': 'No hay período académico activo.'}
+        seccion = self.get_object()
+        user = request.user
 
-        ya_inscrito_periodo = DetalleInscripcion.objects.filter(
-            inscripcion__estudiante=estudiante,
-            inscripcion__periodo=periodo,
-            asignatura=asignatura
-        ).exists()
+        if not user.is_superuser and not user.groups.filter(name='Administrador').exists():
+            if seccion.docente != user:
+                return Response({'error': 'No estás asignado a esta sección.'}, status=status.HTTP_403_FORBIDDEN)
 
-        if ya_inscrito_periodo:
-            return {'error': 'El estudiante ya está inscrito en esta asignatura en el período actual.'}
+        filas = request.data.get('calificaciones')
+        if not isinstance(filas, list) or not all(isinstance(f, dict) for f in filas):
+            return Response({'error': 'Se requiere una lista de calificaciones.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        ya_aprobo = DetalleInscripcion.objects.filter(
-            inscripcion__estudiante=estudiante,
-            asignatura=asignatura,
-            estatus='APROBADO'
-        ).exists()
-
-        if ya_aprobo:
-            return {'error': 'El estudiante ya aprobó esta asignatura anteriormente.'}
-
-        prelaciones = asignatura.prelaciones.all()
-        for prereq in prelaciones:
-            from django.db.models import Q
-            aprobada = DetalleInscripcion.objects.filter(
-                inscripcion__estudiante=estudiante,
-                asignatura=prereq
-            ).filter(Q(nota_final__gte=10) | Q(estatus='APROBADO')).exists()
-            
-            if not aprobada:
-                return {'error': f'No puedes inscribir esta materia. Requiere haber aprobado: {prereq.nombre_asignatura} ({prereq.codigo}).'}
+        resultado = calificar_lote(seccion, filas)
+        if 'errores' in resultado:
+            return Response({
+                'error': 'No se guardó ninguna calificación: revisa las filas con error.',
+                'errores': resultado['errores']
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        uc_inscritas = DetalleInscripcion.objects.filter(
-            inscripcion__estudiante=estudiante,
-            inscripcion__periodo=periodo
-        ).aggregate(total=Sum('asignatura__creditos'))['total'] or 0
+        return Response({
+            'status': 'Calificaciones guardadas.',
+            'resultados': [{
+                'detalle_id': d.id,
+                'nota_final': float(d.nota_final) if d.nota_final else None,
+                'nota_reparacion': float(d.nota_reparacion) if d.nota_reparacion else None,
+                'estatus': d.estatus
+            } for d in resultado['detalles']]
+        })
 
-        uc_nueva = asignatura.creditos
-        
-        if (uc_inscritas + uc_nueva) > 35:
-            return {
-                'error': f'No puedes inscribir esta asignatura porque superarías el límite de 35 UC. (Tienes {uc_inscritas} UC + {uc_nueva} UC de esta materia = {uc_inscritas + uc_nueva})'
-            }
+    def _inscribir_estudiante_en_seccion(self, estudiante, seccion, allow_conflicts=False):
+        """Método interno para realizar la inscripción con validaciones."""
+        from gestion.inscripciones import inscribir
 
-        if should_check_conflicts:
-            horarios_nuevos = seccion.horarios.all() # QuerySet de Horario
-            if horarios_nuevos.exists():
-                inscripciones_actuales = DetalleInscripcion.objects.filter(
-                    inscripcion__estudiante=estudiante,
-                    inscripcion__periodo=periodo
-                ).select_related('seccion', 'asignatura')
-
-                for inscripcion_existente in inscripciones_actuales:
-                    seccion_existente = inscripcion_existente.seccion
-                    if not seccion_existente: continue
-                    
-                    horarios_existentes = seccion_existente.horarios.all()
-
-                    for h_nuevo in horarios_nuevos:
-                        for h_existente in horarios_existentes:
-                            if h_nuevo.dia == h_existente.dia:
-                                if (h_nuevo.hora_inicio < h_existente.hora_fin) and (h_nuevo.hora_fin > h_existente.hora_inicio):
-                                    dia_str = h_nuevo.get_dia_display()
-                                    return {
-                                        'error': (
-                                            f"CHOQUE DE HORARIO: La asignatura '{asignatura.nombre_asignatura}' "
-                                            f"choca con '{seccion_existente.asignatura.nombre_asignatura}' "
-                                            f"el día {dia_str} ({h_nuevo.hora_inicio.strftime('%H:%M')} - {h_nuevo.hora_fin.strftime('%H:%M')}). "
-                                            f"Por favor comunica esta situación a un administrador."
-                                        )
-                                    }
-
-        inscripcion, _ = Inscripcion.objects.get_or_create(
-            estudiante=estudiante,
-            periodo=periodo
-        )
+        user_requesting = self.request.user
 
-        detalle = DetalleInscripcion.objects.create(
-            inscripcion=inscripcion,
-            asignatura=asignatura,
-            seccion=seccion,
-            estatus='CURSANDO'
-        )
+        should_check_conflicts = True
+        if user_requesting.is_superuser or user_requesting.groups.filter(name__in=['Administrador', 'Docente']).exists():
+            should_check_conflicts = False
 
-        return {'detalle_id': detalle.id}
+        return inscribir(estudiante, seccion, verificar_choques=should_check_conflicts)
 
 
 class PeriodoAcademicoViewSet(viewsets.ModelViewSet):
@@ -2043,6 +2220,14 @@ class PeriodoAcademicoViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return [IsAdmin()]
 
+    @con_etag('periodos', por_dia=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @con_etag('periodos', por_dia=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'], url_path='activo')
     def activo(self, request):
         """Retorna el período académico activo actual."""
@@ -2088,9 +2273,16 @@ class PeriodoAcademicoViewSet(viewsets.ModelViewSet):
                 'error': f'Este período no puede activarse hasta {periodo.fecha_inicio}.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        from gestion.inscripciones import recontar_inscritos
+        from gestion.estadisticas import congelar_periodo
+        cerrados = list(PeriodoAcademico.objects.filter(activo=True).exclude(pk=periodo.pk))
         PeriodoAcademico.objects.update(activo=False)
         periodo.activo = True
         periodo.save()
+        recontar_inscritos()
+        # Las estadísticas de los períodos que se cierran quedan congeladas.
+        for cerrado in cerrados:
+            congelar_periodo(cerrado)
         return Response({
             'status': 'success',
             'mensaje': f'Período {periodo.nombre_periodo} activado correctamente.'
@@ -2106,10 +2298,84 @@ class EstadisticasViewSet(viewsets.ViewSet):
             return [IsEstudiante()]
         return [IsDocenteOrAdmin()]
 
+    @staticmethod
+    def _periodo_solicitado(request):
+        """
+        Período del parámetro 'periodo' (id). Retorna (periodo, error): periodo es
+        None si no se indicó, y error una Response si el período no existe.
+        """
+        periodo_id = request.query_params.get('periodo')
+        if not periodo_id:
+            return None, None
+        periodo = PeriodoAcademico.objects.filter(pk=periodo_id).first() if str(periodo_id).isdigit() else None
+        if periodo is None:
+            return None, Response({'error': 'Período no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        return periodo, None
+
+    @staticmethod
+    def _secciones_desglose(programa_id=None, docente=None):
+        """Secciones que cubren el desglose y la distribución: las que tienen docente asignado."""
+        secciones = Seccion.objects.filter(docente__isnull=False)
+        if programa_id:
+            secciones = secciones.filter(asignatura__programa_id=programa_id)
+        if docente is not None:
+            secciones = secciones.filter(docente=docente)
+        return secciones
+
+    @classmethod
+    def _filas_desglose(cls, programa_id=None, docente=None, periodo=None):
+        """
+        Filas del desglose por sección, ordenadas como el pensum. Sin período se
+        suman todos los períodos; el período activo se lee de EstadisticaSeccion y
+        los períodos pasados de la instantánea congelada al cerrarlos (en vivo si
+        aún no tienen instantánea).
+        """
+        from gestion.estadisticas import anotar_secciones, congelado, leer_instantanea
+        from gestion.models import InstantaneaEstadistica
+
+        def redondear(valor):
+            return round(float(valor), 2) if valor else 0
+
+        if congelado(periodo):
+            instantaneas = leer_instantanea(periodo, InstantaneaEstadistica.SECCION)
+            if programa_id:
+                instantaneas = instantaneas.filter(programa_id=programa_id)
+            if docente is not None:
+                instantaneas = instantaneas.filter(docente=docente)
+            return [{
+                'semestre': fila.semestre,
+                'asignatura_id': fila.asignatura_id,
+                'codigo': fila.asignatura_codigo,
+                'nombre': fila.asignatura_nombre,
+                'seccion_id': fila.seccion_id,
+                'seccion': fila.seccion_codigo,
+                'docente': fila.docente_nombre or 'Sin asignar',
+                'count': fila.inscritos,
+                'avg': redondear(fila.suma_notas / fila.calificadas if fila.calificadas else None),
+                'max': redondear(fila.nota_maxima),
+                'min': redondear(fila.nota_minima),
+            } for fila in instantaneas.order_by('semestre', 'orden', 'asignatura_codigo', 'seccion_codigo')]
+
+        secciones = anotar_secciones(cls._secciones_desglose(programa_id, docente).select_related('asignatura', 'docente'), periodo).order_by(
+            'asignatura__semestre', 'asignatura__orden', 'asignatura_id', 'id'
+        )
+        return [{
+            'semestre': seccion.asignatura.semestre,
+            'asignatura_id': seccion.asignatura_id,
+            'codigo': seccion.asignatura.codigo,
+            'nombre': seccion.asignatura.nombre_asignatura,
+            'seccion_id': seccion.id,
+            'seccion': seccion.codigo_seccion,
+            'docente': seccion.docente.get_full_name() if seccion.docente else 'Sin asignar',
+            'count': seccion.count or 0,
+            'avg': redondear(seccion.avg),
+            'max': redondear(seccion.max),
+            'min': redondear(seccion.min),
+        } for seccion in secciones]
+
     @action(detail=False, methods=['get'], url_path='descargar-desglose-excel')
     def descargar_desglose_excel(self, request):
         """Genera reporte Excel del desglose académico (Admin/Docente)."""
-        from django.db.models import Avg, Max, Min, Count
         import openpyxl
         from openpyxl.styles import Font, Alignment
         from gestion.models import Programa
@@ -2123,9 +2389,11 @@ class EstadisticasViewSet(viewsets.ViewSet):
         if not is_admin and not is_docente:
             return Response({'error': 'No autorizado.'}, status=status.HTTP_403_FORBIDDEN)
 
-        asignaturas = Asignatura.objects.all().order_by('semestre', 'orden')
+        periodo, error = self._periodo_solicitado(request)
+        if error:
+            return error
+
         if programa_id:
-            asignaturas = asignaturas.filter(programa_id=programa_id)
             try:
                 programa_nombre = Programa.objects.get(id=programa_id).nombre_programa
             except:
@@ -2150,7 +2418,7 @@ class EstadisticasViewSet(viewsets.ViewSet):
         ws['A2'].font = header_font
         ws.merge_cells('B2:E2')
         
-        periodo_actual = PeriodoAcademico.objects.filter(activo=True).first()
+        periodo_actual = periodo or PeriodoAcademico.objects.filter(activo=True).first()
         ws['A3'] = "Período:"
         ws['B3'] = str(periodo_actual) if periodo_actual else "N/A"
         ws['A3'].font = header_font
@@ -2162,37 +2430,18 @@ class EstadisticasViewSet(viewsets.ViewSet):
             
         row_num = 6
         
-        for asig in asignaturas:
-            secciones = asig.secciones.filter(docente__isnull=False).select_related('docente')
-            
-            if is_docente and not is_admin:
-                secciones = secciones.filter(docente=user)
-                
-            for seccion in secciones:
-                stats = DetalleInscripcion.objects.filter(seccion=seccion).aggregate(
-                    count=Count('id'),
-                    avg=Avg('nota_final'),
-                    max=Max('nota_final'),
-                    min=Min('nota_final')
-                )
-                
-                
-                count = stats['count'] or 0
-                avg = round(float(stats['avg']), 2) if stats['avg'] else 0
-                max_val = round(float(stats['max']), 2) if stats['max'] else 0
-                min_val = round(float(stats['min']), 2) if stats['min'] else 0
-                
-                ws.cell(row=row_num, column=1, value=asig.semestre)
-                ws.cell(row=row_num, column=2, value=asig.codigo)
-                ws.cell(row=row_num, column=3, value=asig.nombre_asignatura)
-                ws.cell(row=row_num, column=4, value=seccion.codigo_seccion)
-                ws.cell(row=row_num, column=5, value=seccion.docente.get_full_name() if seccion.docente else 'Sin asignar')
-                ws.cell(row=row_num, column=6, value=count)
-                ws.cell(row=row_num, column=7, value=avg)
-                ws.cell(row=row_num, column=8, value=max_val)
-                ws.cell(row=row_num, column=9, value=min_val)
-                ws.cell(row=row_num, column=10, value="Activo" if count > 0 else "Sin Estudiantes") # Estado derivado simple
-                row_num += 1
+        for fila in self._filas_desglose(programa_id, user if is_docente and not is_admin else None, periodo):
+            ws.cell(row=row_num, column=1, value=fila['semestre'])
+            ws.cell(row=row_num, column=2, value=fila['codigo'])
+            ws.cell(row=row_num, column=3, value=fila['nombre'])
+            ws.cell(row=row_num, column=4, value=fila['seccion'])
+            ws.cell(row=row_num, column=5, value=fila['docente'])
+            ws.cell(row=row_num, column=6, value=fila['count'])
+            ws.cell(row=row_num, column=7, value=fila['avg'])
+            ws.cell(row=row_num, column=8, value=fila['max'])
+            ws.cell(row=row_num, column=9, value=fila['min'])
+            ws.cell(row=row_num, column=10, value="Activo" if fila['count'] > 0 else "Sin Estudiantes") # Estado derivado simple
+            row_num += 1
 
         apply_excel_styling(ws, 5, custom_widths={'A': 10.0, 'B': 14.0, 'C': 42.0, 'E': 42.0})
         
@@ -2202,115 +2451,215 @@ class EstadisticasViewSet(viewsets.ViewSet):
         return response
 
     @action(detail=False, methods=['get'], url_path='desglose')
+    @con_etag('estadisticas', 'secciones', 'periodos', 'usuarios')
     def desglose(self, request):
-        """Devuelve el desglose académico real por semestre/asignatura/sección."""
-        from django.db.models import Avg, Max, Min, Count
-        
+        """
+        Devuelve el desglose académico real por semestre/asignatura/sección.
+        Con ?periodo=<id> se limita a ese período (los pasados salen de su instantánea).
+        """
         programa_id = request.query_params.get('programa')
         user = request.user
         
         is_admin = user.is_superuser or user.groups.filter(name='Administrador').exists()
         is_docente = user.groups.filter(name='Docente').exists()
         
-        asignaturas = Asignatura.objects.all().order_by('semestre', 'orden')
-        if programa_id:
-            asignaturas = asignaturas.filter(programa_id=programa_id)
+        periodo, error = self._periodo_solicitado(request)
+        if error:
+            return error
         
         semestres = {}
-        for asig in asignaturas:
-            sem_key = asig.semestre
+        asignaturas = {}
+        for fila in self._filas_desglose(programa_id, user if is_docente and not is_admin else None, periodo):
+            sem_key = fila['semestre']
             if sem_key not in semestres:
                 semestres[sem_key] = {
                     'id': sem_key,
                     'name': f'Semestre {sem_key}',
                     'subjects': []
                 }
-            
-            secciones_data = []
-            secciones = asig.secciones.filter(docente__isnull=False).select_related('docente')
-            
-            if is_docente and not is_admin:
-                secciones = secciones.filter(docente=user)
-            
-            for seccion in secciones:
-                stats = DetalleInscripcion.objects.filter(
-                    seccion=seccion
-                ).aggregate(
-                    count=Count('id'),
-                    avg=Avg('nota_final'),
-                    max=Max('nota_final'),
-                    min=Min('nota_final')
-                )
-                
-                secciones_data.append({
-                    'id': seccion.id,
-                    'code': seccion.codigo_seccion,
-                    'docente': seccion.docente.get_full_name() if seccion.docente else 'Sin asignar',
-                    'count': stats['count'] or 0,
-                    'avg': round(float(stats['avg']), 2) if stats['avg'] else 0,
-                    'max': round(float(stats['max']), 2) if stats['max'] else 0,
-                    'min': round(float(stats['min']), 2) if stats['min'] else 0
-                })
-            
-            if secciones_data:  # Solo agregar asignaturas con secciones activas
-                semestres[sem_key]['subjects'].append({
-                    'id': asig.id,
-                    'code': asig.codigo,
-                    'name': asig.nombre_asignatura,
-                    'sections': secciones_data
-                })
+        
+            # Solo aparecen asignaturas con secciones activas
+            clave = (sem_key, fila['codigo'])
+            if clave not in asignaturas:
+                asignaturas[clave] = {
+                    'id': fila['asignatura_id'],
+                    'code': fila['codigo'],
+                    'name': fila['nombre'],
+                    'sections': []
+                }
+                semestres[sem_key]['subjects'].append(asignaturas[clave])
+        
+            asignaturas[clave]['sections'].append({
+                'id': fila['seccion_id'],
+                'code': fila['seccion'],
+                'docente': fila['docente'],
+                'count': fila['count'],
+                'avg': fila['avg'],
+                'max': fila['max'],
+                'min': fila['min']
+            })
         
         result = [sem for sem in sorted(semestres.values(), key=lambda x: x['id']) if sem['subjects']]
         return Response(result)
 
+    @action(detail=False, methods=['get'], url_path='distribucion')
+    @con_etag('estadisticas', 'secciones', 'periodos', 'usuarios')
+    def distribucion(self, request):
+        """
+        Distribución de notas finales por sección y asignatura: tasa de aprobación,
+        desviación estándar, cuartiles e histograma 1-20. Mismo alcance que el desglose
+        (el docente solo ve sus secciones) y filtros ?programa= y ?periodo=.
+        """
+        from gestion.estadisticas import distribucion
+
+        programa_id = request.query_params.get('programa')
+        user = request.user
+
+        is_admin = user.is_superuser or user.groups.filter(name='Administrador').exists()
+        is_docente = user.groups.filter(name='Docente').exists()
+
+        periodo, error = self._periodo_solicitado(request)
+        if error:
+            return error
+
+        secciones = self._secciones_desglose(programa_id, user if is_docente and not is_admin else None)
+        detalles = DetalleInscripcion.objects.filter(seccion__in=secciones)
+        if periodo is not None:
+            detalles = detalles.filter(inscripcion__periodo=periodo)
+
+        return Response(distribucion(detalles))
+
+    @action(detail=False, methods=['get'], url_path='alertas')
+    @con_etag('alertas', 'periodos', 'usuarios')
+    def alertas(self, request):
+        """
+        Estudiantes con alerta temprana vigente (riesgo o reprobado) del período activo
+        o de ?periodo=. El docente solo ve sus secciones; filtros ?programa= y ?tipo=.
+        """
+        from gestion.models import AlertaTemprana
+
+        periodo, error = self._periodo_solicitado(request)
+        if error:
+            return error
+        if periodo is None:
+            periodo = PeriodoAcademico.objects.filter(activo=True).first()
+            if periodo is None:
+                return Response([])
+
+        user = request.user
+        is_admin = user.is_superuser or user.groups.filter(name='Administrador').exists()
+        is_docente = user.groups.filter(name='Docente').exists()
+
+        alertas = AlertaTemprana.objects.filter(periodo=periodo).select_related(
+            'estudiante__usuario', 'detalle__asignatura', 'detalle__seccion'
+        )
+        if is_docente and not is_admin:
+            alertas = alertas.filter(detalle__seccion__docente=user)
+        programa_id = request.query_params.get('programa')
+        if programa_id:
+            alertas = alertas.filter(detalle__asignatura__programa_id=programa_id)
+        tipo = request.query_params.get('tipo')
+        if tipo:
+            alertas = alertas.filter(tipo=tipo.upper())
+
+        return Response([{
+            'id': alerta.id,
+            'estudiante_id': alerta.estudiante_id,
+            'cedula': alerta.estudiante.cedula,
+            'nombre': alerta.estudiante.usuario.get_full_name() or alerta.estudiante.usuario.username,
+            'asignatura': alerta.detalle.asignatura.nombre_asignatura,
+            'codigo': alerta.detalle.asignatura.codigo,
+            'seccion': alerta.detalle.seccion.codigo_seccion if alerta.detalle.seccion else None,
+            'tipo': alerta.tipo,
+            'promedio': float(alerta.promedio),
+            'nota_necesaria': float(alerta.nota_necesaria) if alerta.nota_necesaria is not None else None,
+            'detectada': alerta.detectada,
+        } for alerta in alertas.order_by('tipo', '-nota_necesaria', 'estudiante__cedula')])
+
     @action(detail=False, methods=['get'], url_path='chart-data')
     def chart_data(self, request):
-        """Devuelve datos para el gráfico radar según el rol del usuario."""
-        from django.db.models import Avg
+        """
+        Devuelve datos para el gráfico radar según el rol del usuario.
+        La serie sale de una consulta agrupada por semestre y se cachea por
+        (alcance del rol, programa) hasta que cambian las estadísticas o las secciones.
+        """
+        from gestion.cache import obtener_o_calcular
         
         user = request.user
         is_admin = user.is_superuser or user.groups.filter(name='Administrador').exists()
         is_docente = user.groups.filter(name='Docente').exists()
         programa_id = request.query_params.get('programa')
         
+        if is_admin:
+            alcance_rol = 'admin'
+        elif is_docente:
+            alcance_rol = f'docente:{user.pk}'
+            programa_id = None  # el docente siempre ve solo sus secciones
+        else:
+            return Response({'labels': [f'Sem {n}' for n in range(1, 9)], 'data': [0] * 8})
+        
+        periodo, error = self._periodo_solicitado(request)
+        if error:
+            return error
+        
+        return Response(obtener_o_calcular(
+            f'chart-data:{alcance_rol}:{programa_id or "todos"}:{periodo.pk if periodo else "todos"}',
+            ['estadisticas', 'secciones', 'periodos'],
+            lambda: self._serie_radar(None if is_admin else user, programa_id, periodo),
+        ))
+
+    @staticmethod
+    def _serie_radar(docente=None, programa_id=None, periodo=None):
+        from django.db.models import Max
+        from gestion.estadisticas import congelado, leer_instantanea, por_semestre
+        from gestion.models import EstadisticaSeccion, InstantaneaEstadistica
+        
+        asignaturas = Asignatura.objects.all()
+        if docente is not None:
+            asignaturas = asignaturas.filter(secciones__docente=docente)
+        if programa_id:
+            asignaturas = asignaturas.filter(programa_id=programa_id)
+        
+        if congelado(periodo):
+            # Período cerrado: el administrador lee los agregados por semestre y el
+            # docente los de sus secciones, ambos de la instantánea.
+            nivel = InstantaneaEstadistica.SEMESTRE if docente is None else InstantaneaEstadistica.SECCION
+            estadisticas = leer_instantanea(periodo, nivel)
+            if docente is not None:
+                estadisticas = estadisticas.filter(docente=docente)
+            if programa_id:
+                estadisticas = estadisticas.filter(programa_id=programa_id)
+            filas = por_semestre(estadisticas, por_programa=False, congeladas=True)
+        else:
+            estadisticas = EstadisticaSeccion.objects.all()
+            if periodo is not None:
+                estadisticas = estadisticas.filter(periodo=periodo)
+            if docente is not None:
+                estadisticas = estadisticas.filter(seccion__docente=docente)
+            if programa_id:
+                estadisticas = estadisticas.filter(seccion__asignatura__programa_id=programa_id)
+            filas = por_semestre(estadisticas, por_programa=False)
+        promedios = {fila['semestre']: fila['avg'] for fila in filas}
+        
+        # Al menos los 8 ejes de siempre; más si el pensum tiene más semestres.
+        semestres = max(8, asignaturas.aggregate(ultimo=Max('semestre'))['ultimo'] or 0)
+        
         labels = []
         data = []
-        
-        for sem_num in range(1, 9):
+        for sem_num in range(1, semestres + 1):
             labels.append(f'Sem {sem_num}')
-            
-            if is_admin:
-                detalles = DetalleInscripcion.objects.filter(
-                    asignatura__semestre=sem_num,
-                    nota_final__isnull=False
-                )
-                if programa_id:
-                    detalles = detalles.filter(asignatura__programa_id=programa_id)
-                
-                avg = detalles.aggregate(avg=Avg('nota_final'))['avg']
-                data.append(round(float(avg), 2) if avg else 0)
-            
-            elif is_docente:
-                secciones_docente = Seccion.objects.filter(docente=user, asignatura__semestre=sem_num)
-                avg = DetalleInscripcion.objects.filter(
-                    seccion__in=secciones_docente,
-                    nota_final__isnull=False
-                ).aggregate(avg=Avg('nota_final'))['avg']
-                
-                data.append(round(float(avg), 2) if avg else 0)
-            else:
-                data.append(0)
+            avg = promedios.get(sem_num)
+            data.append(round(float(avg), 2) if avg else 0)
         
-        return Response({
+        return {
             'labels': labels,
             'data': data
-        })
+        }
 
     @action(detail=False, methods=['get'], url_path='mi-progreso')
+    @con_etag(alcance_estudiante, 'resumenes', 'secciones', 'programas', 'usuarios')
     def mi_progreso(self, request):
         """Devuelve el progreso académico del estudiante autenticado."""
-        from django.db.models import Avg
-        
         user = request.user
         
         try:
@@ -2318,12 +2667,10 @@ class EstadisticasViewSet(viewsets.ViewSet):
         except Estudiante.DoesNotExist:
             return Response({'error': 'Usuario no es estudiante.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        avance = estudiante.calcular_avance()
-        total_asignaturas = estudiante.programa.asignatura_set.count() if estudiante.programa else 0
-        aprobadas = DetalleInscripcion.objects.filter(
-            inscripcion__estudiante=estudiante,
-            nota_final__gte=10
-        ).count()
+        resumen = obtener_resumen(estudiante)
+        avance = resumen.avance
+        total_asignaturas = resumen.total_asignaturas
+        aprobadas = resumen.aprobadas
         
         nombre = ''
         try:
@@ -2448,7 +2795,7 @@ class ChatAsesoriasView(APIView):
                 Información del estudiante:
                 - Nombre: {estudiante.usuario.get_full_name()}
                 - Programa: {estudiante.programa.nombre_programa if estudiante.programa else 'No asignado'}
-                - Avance académico: {estudiante.calcular_avance()}%
+                - Avance académico: {obtener_resumen(estudiante).avance}%
                 """
             except Estudiante.DoesNotExist:
                 pass
@@ -0,0 +1,103 @@
+"""
+Auditoría de cambios de notas.
+
+Durante una solicitud HTTP los cambios se acumulan en un buffer y se escriben
+al terminar con un solo bulk_create (ver sismepa.middleware.AuditoriaNotasMiddleware),
+de modo que auditar no agrega una escritura por cada nota. Solo se escriben los
+cambios cuya transacción se confirmó: los de un lote revertido se descartan.
+Fuera de una solicitud (comandos, shell) los cambios se escriben de inmediato,
+dentro de la transacción en curso.
+"""
+import logging
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from gestion.models import AuditoriaNota
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_AUDITADOS = ['nota1', 'nota2', 'nota3', 'nota4', 'nota_reparacion', 'nota_final']
+
+_buffer = ContextVar('auditoria_notas', default=None)
+
+
+def iniciar():
+    """Activa el buffer para el contexto actual. Retorna el token para finalizar()."""
+    return _buffer.set([])
+
+
+class _Lote:
+    """Entradas agregadas juntas; se confirman cuando se confirma su transacción."""
+
+    def __init__(self, entradas):
+        self.entradas = entradas
+        self.confirmado = False
+
+    def confirmar(self):
+        self.confirmado = True
+
+
+def finalizar(token, usuario=None, origen=''):
+    """Escribe las entradas confirmadas y desactiva el buffer."""
+    lotes = _buffer.get()
+    _buffer.reset(token)
+
+    def escribir():
+        entradas = [entrada for lote in lotes if lote.confirmado for entrada in lote.entradas]
+        try:
+            guardar(entradas, usuario, origen)
+        except Exception as e:
+            logger.error(f"No se pudo guardar la auditoría de notas ({len(entradas)} entradas): {e}")
+
+    # Si la solicitud corre dentro de una transacción externa se escribe al confirmarla.
+    transaction.on_commit(escribir)
+
+
+def guardar(entradas, usuario=None, origen=''):
+    if not entradas:
+        return
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+    for entrada in entradas:
+        if entrada.usuario_id is None and usuario is not None:
+            entrada.usuario = usuario
+        if not entrada.origen:
+            entrada.origen = origen[:100]
+    AuditoriaNota.objects.bulk_create(entradas)
+
+
+def agregar(entradas, usuario=None, origen=''):
+    """Agrega entradas al buffer de la solicitud, o las guarda si no hay buffer activo."""
+    buffer = _buffer.get()
+    if buffer is None:
+        guardar(entradas, usuario, origen)
+    elif entradas:
+        lote = _Lote(entradas)
+        buffer.append(lote)
+        # Si la transacción se revierte el callback se descarta y el lote no se escribe.
+        transaction.on_commit(lote.confirmar)
+
+
+def registrar(detalles, usuario=None, origen=''):
+    """
+    Registra los cambios de nota de los detalles comparando sus valores actuales
+    con los que tenían al cargarse (DetalleInscripcion.valor_original).
+    """
+    entradas = []
+    for detalle in detalles:
+        for campo in CAMPOS_AUDITADOS:
+            anterior = detalle.valor_original(campo)
+            nuevo = getattr(detalle, campo)
+            if anterior == nuevo:
+                continue
+            entradas.append(AuditoriaNota(
+                detalle_id=detalle.pk,
+                estudiante_id=detalle.inscripcion.estudiante_id,
+                seccion_id=detalle.seccion_id,
+                periodo_id=detalle.inscripcion.periodo_id,
+                campo=campo,
+                valor_anterior=anterior,
+                valor_nuevo=nuevo,
+            ))
+    agregar(entradas, usuario, origen)
@@ -0,0 +1,54 @@
+"""
+Contadores de versión para invalidar cachés por alcance.
+
+Cada alcance (por ejemplo 'estudiante:15' o 'secciones') tiene un número de
+versión guardado en la caché de Django. Las claves de los datos cacheados
+incluyen las versiones de los alcances de los que dependen, de modo que
+incrementar una versión invalida todo lo derivado sin tener que borrarlo.
+"""
+import time
+
+from django.core.cache import cache
+
+TIMEOUT_DATOS = 60 * 60
+
+
+def _clave(alcance):
+    return f'version:{alcance}'
+
+
+def version(alcance):
+    """Versión actual del alcance."""
+    clave = _clave(alcance)
+    valor = cache.get(clave)
+    if valor is None:
+        # Un valor inicial basado en el reloj evita reutilizar versiones
+        # antiguas si el contador fue desalojado de la caché.
+        cache.add(clave, int(time.time() * 1000), None)
+        valor = cache.get(clave)
+    return valor
+
+
+def incrementar(*alcances):
+    """Invalida los datos que dependen de los alcances indicados."""
+    for alcance in alcances:
+        try:
+            cache.incr(_clave(alcance))
+        except ValueError:
+            version(alcance)
+
+
+def clave_versionada(nombre, *alcances):
+    """Clave de caché que cambia cuando cambia cualquiera de los alcances."""
+    versiones = '.'.join(str(version(alcance)) for alcance in alcances)
+    return f'{nombre}:{versiones}'
+
+
+def obtener_o_calcular(nombre, alcances, calcular, timeout=TIMEOUT_DATOS):
+    """Retorna el valor cacheado para las versiones actuales o lo calcula y guarda."""
+    clave = clave_versionada(nombre, *alcances)
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave, valor, timeout)
+    return valor
@@ -0,0 +1,370 @@
+"""
+Reglas de carga de calificaciones compartidas por la carga individual
+(SeccionViewSet.calificar) y la carga en lote de una sección completa.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+
+from gestion import alertas, auditoria, estadisticas, resumenes
+from gestion.cache import incrementar
+from gestion.models import AuditoriaNota, DetalleInscripcion, Inscripcion
+from gestion.notifications import notify_student_repair_grade, notify_student_period_completion
+
+CAMPOS_NOTAS = ['nota1', 'nota2', 'nota3', 'nota4']
+NOMBRES_NOTAS = {'nota1': 'Nota 1', 'nota2': 'Nota 2', 'nota3': 'Nota 3', 'nota4': 'Nota 4', 'nota_reparacion': 'Nota R'}
+
+
+def parse_nota(val):
+    if val is None or val == '':
+        return None
+    try:
+        nota = Decimal(str(val))
+        if nota < 1 or nota > 20:
+            raise ValueError('Nota fuera de rango')
+        return nota
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _nota_invalida(campo, valor):
+    return f'{NOMBRES_NOTAS[campo]} inválida: {valor}. Debe ser un número entre 1 y 20.'
+
+
+def aplicar_notas(detalle, datos):
+    """
+    Aplica al detalle las notas presentes en 'datos': las ausentes no se tocan y
+    un null o '' explícito borra la nota. Retorna un mensaje de error si alguna
+    nota no es un número entre 1 y 20 o si la nota de reparación no es admisible.
+    """
+    for campo in CAMPOS_NOTAS + ['nota_reparacion']:
+        valor = datos.get(campo)
+        if valor not in (None, '') and parse_nota(valor) is None:
+            return _nota_invalida(campo, valor)
+
+    for campo in CAMPOS_NOTAS:
+        if campo in datos:
+            setattr(detalle, campo, parse_nota(datos[campo]))
+
+    if 'nota_reparacion' not in datos:
+        return None
+    nota_reparacion = datos['nota_reparacion']
+    if nota_reparacion in (None, ''):
+        detalle.nota_reparacion = None
+        return None
+
+    notas_actuales = [getattr(detalle, campo) for campo in CAMPOS_NOTAS]
+    if not all(n is not None for n in notas_actuales):
+        return 'Debe cargar las 4 notas parciales antes de asignar una Nota de Reparación.'
+    if sum(notas_actuales) / Decimal(4) >= 10:
+        return 'Solo se puede cargar Nota de Reparación para estudiantes reprobados (promedio < 10).'
+
+    detalle.nota_reparacion = parse_nota(nota_reparacion)
+    return None
+
+
+def detalles_de_seccion(seccion):
+    return DetalleInscripcion.objects.filter(seccion=seccion).select_related(
+        'asignatura', 'inscripcion__periodo', 'inscripcion__estudiante__usuario'
+    ).order_by('pk')
+
+
+def calificar_lote(seccion, filas, detalles=None):
+    """
+    Carga las calificaciones de toda una sección.
+
+    'filas' es una lista de diccionarios con 'detalle_id' y las notas a cargar.
+    Si alguna fila es inválida no se guarda nada y se retorna {'errores': [...]}.
+    Los cambios se guardan con un solo bulk_update y las notificaciones se
+    envían juntas una vez confirmada la transacción.
+    """
+    if detalles is None:
+        detalles = {d.pk: d for d in detalles_de_seccion(seccion)}
+
+    errores = []
+    modificados = []
+    anteriores = {}
+    for fila in filas:
+        try:
+            detalle = detalles.get(int(fila.get('detalle_id')))
+        except (TypeError, ValueError):
+            detalle = None
+        if detalle is None:
+            errores.append({'detalle_id': fila.get('detalle_id'), 'error': 'Detalle de inscripción no encontrado.'})
+            continue
+        if detalle.pk in anteriores:
+            errores.append({'detalle_id': detalle.pk, 'error': 'Detalle duplicado en el lote.'})
+            continue
+        anteriores[detalle.pk] = (detalle.nota_reparacion, detalle.nota_final)
+        error = aplicar_notas(detalle, fila)
+        if error:
+            errores.append({'detalle_id': detalle.pk, 'error': error})
+            continue
+        # Igual que DetalleInscripcion.save()
+        if any([detalle.nota1, detalle.nota2, detalle.nota3, detalle.nota4, detalle.nota_reparacion]):
+            detalle.calcular_nota_final()
+        if detalle.campos_modificados():
+            modificados.append(detalle)
+
+    if errores:
+        return {'errores': errores}
+
+    calificadas = {}
+    for detalle in modificados:
+        cambio = int(detalle.nota_final is not None) - int(anteriores[detalle.pk][1] is not None)
+        if cambio:
+            calificadas[detalle.inscripcion_id] = calificadas.get(detalle.inscripcion_id, 0) + cambio
+
+    # Solo se escriben las columnas que cambiaron en alguna fila: bulk_update arma
+    # una expresión CASE por columna, así que cada columna omitida abarata la consulta.
+    campos = sorted({campo for detalle in modificados for campo in detalle.campos_modificados()})
+    por_cambio = {}
+    for inscripcion_id, cambio in calificadas.items():
+        por_cambio.setdefault(cambio, []).append(inscripcion_id)
+
+    with transaction.atomic():
+        if modificados:
+            DetalleInscripcion.objects.bulk_update(modificados, campos)
+            auditoria.registrar(modificados)
+            estadisticas.marcar(seccion.pk)
+            resumenes.marcar(*{d.inscripcion.estudiante_id for d in modificados})
+        for cambio, inscripcion_ids in por_cambio.items():
+            Inscripcion.objects.filter(pk__in=inscripcion_ids).update(
+                asignaturas_calificadas=F('asignaturas_calificadas') + cambio
+            )
+        transaction.on_commit(lambda: _notificar_lote(modificados, anteriores))
+
+    incrementar(*{f'estudiante:{d.inscripcion.estudiante_id}' for d in modificados})
+    return {'detalles': modificados}
+
+
+def _notificar_lote(detalles, anteriores):
+    """Notificaciones de una carga en lote: las mismas que emite la carga individual."""
+    completadas = []
+    for detalle in detalles:
+        reparacion_anterior, final_anterior = anteriores[detalle.pk]
+        if detalle.nota_reparacion is not None and reparacion_anterior is None:
+            notify_student_repair_grade(detalle.inscripcion.estudiante, detalle.asignatura, detalle.nota_reparacion)
+        if detalle.nota_final is not None and final_anterior is None:
+            completadas.append(detalle.inscripcion)
+
+    # Alerta temprana solo de los detalles cargados: avisa a quien entra en riesgo
+    # o reprueba, no a quien ya tenía la alerta.
+    periodos = {}
+    for detalle in detalles:
+        periodos.setdefault(detalle.inscripcion.periodo, []).append(detalle.pk)
+    for periodo, detalle_ids in periodos.items():
+        alertas.escanear(periodo, detalle_ids)
+
+    if not completadas:
+        return
+
+    inscripciones = {i.pk: i for i in completadas}
+    completas = Inscripcion.objects.filter(
+        pk__in=inscripciones, asignaturas_calificadas__gte=F('total_asignaturas')
+    ).values_list('pk', flat=True)
+    todos = {}
+    for d in DetalleInscripcion.objects.filter(
+        inscripcion_id__in=list(completas)
+    ).select_related('asignatura'):
+        todos.setdefault(d.inscripcion_id, []).append(d)
+
+    for inscripcion_id, detalles_inscripcion in todos.items():
+        inscripcion = inscripciones[inscripcion_id]
+        notify_student_period_completion(inscripcion.estudiante, inscripcion.periodo, detalles_inscripcion)
+
+
+# Columnas de la planilla generada por SeccionViewSet.descargar_listado (fila 7 = encabezados).
+FILA_ENCABEZADOS = 7
+COLUMNAS_PLANILLA = ['Cédula', 'Nombre', 'Apellido', 'Correo', 'Nota 1', 'Nota 2', 'Nota 3', 'Nota 4', 'Nota R']
+CAMPOS_PLANILLA = {4: 'nota1', 5: 'nota2', 6: 'nota3', 7: 'nota4', 8: 'nota_reparacion'}
+
+
+def _texto_cedula(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip() if valor is not None else ''
+
+
+def _como_float(valor):
+    return float(valor) if valor is not None else None
+
+
+def importar_planilla(seccion, archivo):
+    """
+    Importa las notas de la planilla de evaluación de la sección.
+
+    La hoja se lee en modo streaming (read_only) y cada fila se asocia a su
+    DetalleInscripcion por cédula. Todas las filas se validan antes de guardar;
+    si alguna tiene error no se guarda ninguna. Retorna {'filas': [...]} con
+    los cambios por fila y, si hubo problemas, {'errores': [...]}.
+    """
+    import openpyxl
+
+    try:
+        wb = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    except Exception:
+        return {'errores': [{'fila': None, 'error': 'El archivo no es un Excel válido.'}]}
+
+    try:
+        filas_hoja = wb.active.iter_rows(min_row=FILA_ENCABEZADOS, max_col=len(COLUMNAS_PLANILLA), values_only=True)
+        encabezados = [str(v).strip() if v is not None else '' for v in next(filas_hoja, ())]
+        if encabezados[:len(COLUMNAS_PLANILLA)] != COLUMNAS_PLANILLA:
+            return {'errores': [{'fila': FILA_ENCABEZADOS, 'error': 'La planilla no tiene el formato de descargar-listado.'}]}
+        filas_leidas = [
+            (numero, valores) for numero, valores in enumerate(filas_hoja, FILA_ENCABEZADOS + 1)
+            if any(v not in (None, '') for v in valores)
+        ]
+    finally:
+        wb.close()
+
+    # Si la cédula aparece en varios períodos se usa la inscripción más reciente.
+    detalles = {}
+    por_cedula = {}
+    for detalle in detalles_de_seccion(seccion):
+        detalles[detalle.pk] = detalle
+        por_cedula[detalle.inscripcion.estudiante.cedula] = detalle
+
+    errores = []
+    filas = []
+    fila_de_detalle = {}
+    for numero, valores in filas_leidas:
+        cedula = _texto_cedula(valores[0])
+        detalle = por_cedula.get(cedula)
+        if detalle is None:
+            errores.append({'fila': numero, 'cedula': cedula, 'error': 'La cédula no está inscrita en esta sección.'})
+            continue
+        if detalle.pk in fila_de_detalle:
+            errores.append({'fila': numero, 'cedula': cedula, 'error': f'Cédula repetida (fila {fila_de_detalle[detalle.pk]}).'})
+            continue
+        fila_de_detalle[detalle.pk] = numero
+
+        datos = {'detalle_id': detalle.pk}
+        for indice, campo in CAMPOS_PLANILLA.items():
+            valor = valores[indice] if indice < len(valores) else None
+            if valor in (None, ''):
+                continue  # Celda vacía: se conserva la nota actual
+            if parse_nota(valor) is None:
+                errores.append({'fila': numero, 'cedula': cedula, 'error': f'{COLUMNAS_PLANILLA[indice]} inválida: {valor}.'})
+                break
+            datos[campo] = valor
+        else:
+            filas.append(datos)
+
+    if errores:
+        return {'errores': errores}
+
+    antes = {
+        pk: {campo: getattr(detalles[pk], campo) for campo in CAMPOS_NOTAS + ['nota_reparacion', 'nota_final']}
+        for pk in fila_de_detalle
+    }
+    resultado = calificar_lote(seccion, filas, detalles=detalles)
+    if 'errores' in resultado:
+        return {'errores': [
+            {'fila': fila_de_detalle[e['detalle_id']], 'cedula': detalles[e['detalle_id']].inscripcion.estudiante.cedula,
+             'error': e['error']}
+            for e in resultado['errores']
+        ]}
+
+    reporte = []
+    for detalle_id, numero in fila_de_detalle.items():
+        detalle = detalles[detalle_id]
+        cambios = {
+            campo: {'antes': _como_float(valor), 'despues': _como_float(getattr(detalle, campo))}
+            for campo, valor in antes[detalle.pk].items() if valor != getattr(detalle, campo)
+        }
+        reporte.append({
+            'fila': numero,
+            'cedula': detalle.inscripcion.estudiante.cedula,
+            'detalle_id': detalle.pk,
+            'cambios': cambios,
+            'estatus': detalle.estatus,
+        })
+    return {'filas': reporte}
+
+
+def expresiones_nota_final():
+    """
+    Reglas de DetalleInscripcion.calcular_nota_final expresadas en SQL:
+    la nota de reparación sustituye la nota final; si no hay, se promedian
+    las 4 notas parciales; si faltan notas se conservan los valores actuales.
+    """
+    from django.db.models import Case, CharField, DecimalField, Q, Value, When
+    from django.db.models.functions import Round
+    from django.db.models.lookups import GreaterThanOrEqual
+
+    completas = Q(nota1__isnull=False, nota2__isnull=False, nota3__isnull=False, nota4__isnull=False)
+    suma = F('nota1') + F('nota2') + F('nota3') + F('nota4')
+    decimal = DecimalField(max_digits=4, decimal_places=2)
+
+    nota_final = Case(
+        When(nota_reparacion__isnull=False, then=F('nota_reparacion')),
+        # Se multiplica por 0.25 en lugar de dividir entre 4 para que SQLite no haga división entera.
+        When(completas, then=Round(suma * Value(Decimal('0.25')), 2)),
+        default=F('nota_final'),
+        output_field=decimal,
+    )
+    estatus = Case(
+        When(nota_reparacion__gte=10, then=Value('APROBADO')),
+        When(nota_reparacion__isnull=False, then=Value('REPROBADO')),
+        # promedio >= 10 equivale a suma >= 40 y evita redondeos intermedios
+        When(completas & Q(GreaterThanOrEqual(suma, Value(Decimal(40)))), then=Value('APROBADO')),
+        When(completas, then=Value('REPROBADO')),
+        default=F('estatus'),
+        output_field=CharField(),
+    )
+    return nota_final, estatus
+
+
+def recalcular_notas(periodo, simular=False):
+    """
+    Recalcula nota_final y estatus de todas las asignaturas del período con un
+    solo UPDATE, sin cargar las filas ni emitir señales. Retorna la lista de
+    cambios {'detalle_id', 'cedula', 'asignatura', 'nota_final': [antes, despues],
+    'estatus': [antes, despues]}; con simular=True no guarda nada.
+    """
+    nota_final, estatus = expresiones_nota_final()
+    detalles = DetalleInscripcion.objects.filter(inscripcion__periodo=periodo)
+
+    filas = detalles.annotate(nueva_nota=nota_final, nuevo_estatus=estatus).values_list(
+        'pk', 'inscripcion__estudiante__cedula', 'asignatura__codigo',
+        'nota_final', 'nueva_nota', 'estatus', 'nuevo_estatus', 'inscripcion__estudiante_id', 'seccion_id'
+    ).order_by('pk')
+
+    cambios = []
+    entradas = []
+    secciones = set()
+    estudiantes = set()
+    for pk, cedula, asignatura, nota, nueva_nota, est, nuevo_estatus, estudiante_id, seccion_id in filas:
+        if nueva_nota is not None:
+            nueva_nota = Decimal(nueva_nota).quantize(Decimal('0.01'))
+        if nota != nueva_nota or est != nuevo_estatus:
+            estudiantes.add(estudiante_id)
+            cambios.append({
+                'detalle_id': pk,
+                'cedula': cedula,
+                'asignatura': asignatura,
+                'nota_final': [_como_float(nota), _como_float(nueva_nota)],
+                'estatus': [est, nuevo_estatus],
+            })
+        if nota != nueva_nota:
+            secciones.add(seccion_id)
+            entradas.append(AuditoriaNota(
+                detalle_id=pk, estudiante_id=estudiante_id, seccion_id=seccion_id, periodo_id=periodo.pk,
+                campo='nota_final', valor_anterior=nota, valor_nuevo=nueva_nota,
+            ))
+
+    if simular or not cambios:
+        return cambios
+
+    # Solo los estudiantes con filas en 'cambios' tienen contadores, resúmenes y cachés que rehacer.
+    with transaction.atomic():
+        detalles.update(nota_final=nota_final, estatus=estatus)
+        Inscripcion.recontar_contadores(Inscripcion.objects.filter(periodo=periodo, estudiante_id__in=estudiantes))
+        auditoria.agregar(entradas, origen='recalcular_notas')
+        estadisticas.marcar(*secciones)
+        resumenes.marcar(*estudiantes)
+
+    incrementar(*{f'estudiante:{estudiante_id}' for estudiante_id in estudiantes})
+    return cambios
@@ -0,0 +1,133 @@
+"""
+Bandeja de salida de correos.
+
+Las notificaciones se guardan como CorreoPendiente dentro de la transacción
+que las origina, así ninguna solicitud espera al servidor SMTP y un correo
+nunca sale por un cambio que terminó revirtiéndose. Un worker drena la
+bandeja por lotes con una sola conexión SMTP, reintenta con espera
+exponencial y deja como FALLIDO lo que agota los intentos. El lote se
+reclama en una transacción corta y se envía fuera de ella, de modo que
+ninguna fila queda bloqueada mientras se habla con el servidor SMTP.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from gestion.models import CorreoPendiente
+
+logger = logging.getLogger(__name__)
+
+ESPERA_BASE = 60  # segundos; se duplica en cada reintento
+ESPERA_MAXIMA = 6 * 60 * 60
+RECLAMO = timedelta(minutes=10)  # un lote reclamado vuelve a vencer si su worker muere
+
+
+def encolar(asunto, mensaje, destinatarios):
+    """Guarda el correo en la bandeja de salida y despierta al worker al confirmar la transacción."""
+    correo = CorreoPendiente.objects.create(
+        asunto=asunto[:255], mensaje=mensaje, destinatarios=','.join(destinatarios)
+    )
+    transaction.on_commit(_despertar_worker)
+    return correo
+
+
+def _despertar_worker():
+    from gestion.tasks import enviar_correos_task
+    if enviar_correos_task is None:
+        return
+    try:
+        enviar_correos_task()
+    except Exception as e:
+        # El correo ya está guardado; lo enviará el siguiente ciclo del worker.
+        logger.warning(f"No se pudo encolar el envío de correos: {e}")
+
+
+def espera_reintento(intentos):
+    return timedelta(seconds=min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA))
+
+
+def enviar_pendientes(limite=None):
+    """
+    Envía un lote de correos vencidos con una sola conexión SMTP.
+    Retorna (enviados, fallidos).
+    """
+    limite = limite or settings.CORREOS_LOTE
+    ahora = timezone.now()
+
+    # Reclamo: se corre proximo_intento para que otros workers no tomen el lote.
+    with transaction.atomic():
+        correos = list(
+            CorreoPendiente.objects.select_for_update(skip_locked=True).filter(
+                estado=CorreoPendiente.PENDIENTE, proximo_intento__lte=ahora
+            ).order_by('id')[:limite]
+        )
+        if not correos:
+            return 0, 0
+        CorreoPendiente.objects.filter(pk__in=[correo.pk for correo in correos]).update(
+            proximo_intento=ahora + RECLAMO
+        )
+
+    enviados = fallidos = 0
+    conexion = get_connection(fail_silently=False)
+    try:
+        conexion.open()
+    except Exception as e:
+        logger.error(f"No se pudo abrir la conexión SMTP: {e}")
+        for correo in correos:
+            _marcar_fallo(correo, e)
+        CorreoPendiente.objects.bulk_update(correos, ['estado', 'intentos', 'proximo_intento', 'ultimo_error'])
+        return 0, len(correos)
+
+    try:
+        for correo in correos:
+            mensaje = EmailMessage(
+                subject=correo.asunto,
+                body=correo.mensaje,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=correo.destinatarios.split(','),
+                connection=conexion,
+            )
+            try:
+                mensaje.send()
+            except Exception as e:
+                _marcar_fallo(correo, e)
+                fallidos += 1
+            else:
+                correo.estado = CorreoPendiente.ENVIADO
+                correo.enviado = timezone.now()
+                correo.intentos += 1
+                enviados += 1
+    finally:
+        conexion.close()
+
+    CorreoPendiente.objects.bulk_update(
+        correos, ['estado', 'intentos', 'proximo_intento', 'ultimo_error', 'enviado']
+    )
+
+    logger.info(f"Bandeja de salida: {enviados} enviados, {fallidos} con error.")
+    return enviados, fallidos
+
+
+def _marcar_fallo(correo, error):
+    correo.intentos += 1
+    correo.ultimo_error = str(error)
+    if correo.intentos >= settings.CORREOS_MAX_INTENTOS:
+        correo.estado = CorreoPendiente.FALLIDO
+        logger.error(f"Correo {correo.pk} a {correo.destinatarios} descartado tras {correo.intentos} intentos: {error}")
+    else:
+        correo.proximo_intento = timezone.now() + espera_reintento(correo.intentos)
+
+
+def enviar_todos():
+    """Drena la bandeja completa (solo correos vencidos). Retorna (enviados, fallidos)."""
+    total_enviados = total_fallidos = 0
+    while True:
+        enviados, fallidos = enviar_pendientes()
+        if not enviados and not fallidos:
+            return total_enviados, total_fallidos
+        total_enviados += enviados
+        total_fallidos += fallidos
@@ -0,0 +1,404 @@
+"""
+Estadísticas de notas precalculadas por (período, sección).
+
+Cada cambio de inscripción marca su sección; al confirmar la transacción se
+recalculan solo las filas de EstadisticaSeccion de las secciones marcadas. Un
+cambio de nota_final que no mueve el detalle de sección ajusta su fila con un
+solo UPDATE a partir de la nota anterior y la nueva. Los dashboards leen esas
+filas (y sus agrupaciones por programa y semestre) en una sola consulta, sin
+importar cuántos estudiantes haya. `manage.py reconstruir_estadisticas` rehace la tabla completa.
+
+Al cerrar un período sus agregados se congelan en InstantaneaEstadistica
+(congelar_periodo); las consultas de períodos pasados leen de ahí, y en vivo
+si el período aún no tiene instantánea.
+"""
+import statistics
+import threading
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Aggregate, Avg, Case, Count, DecimalField, F, FloatField, Max, Min, Q, StdDev, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Least, NullIf
+from django.utils import timezone
+
+from gestion.cache import incrementar
+from gestion.models import DetalleInscripcion, EstadisticaSeccion, Inscripcion, InstantaneaEstadistica
+
+# Alcance de caché (gestion.cache) de los datos derivados de estas estadísticas.
+ALCANCE = 'estadisticas'
+
+# Campos de DetalleInscripcion que afectan las estadísticas.
+CAMPOS_RELEVANTES = {'nota_final', 'seccion', 'seccion_id', 'inscripcion', 'inscripcion_id'}
+
+CAMPOS_ESTADISTICA = ['inscritos', 'calificadas', 'aprobados', 'suma_notas', 'nota_maxima', 'nota_minima', 'actualizado']
+
+_local = threading.local()
+
+
+def marcar(*seccion_ids):
+    """Programa el recálculo de las secciones indicadas para cuando se confirme la transacción."""
+    ids = {pk for pk in seccion_ids if pk is not None}
+    if not ids:
+        return
+    if not hasattr(_local, 'secciones'):
+        _local.secciones = set()
+    _local.secciones.update(ids)
+    transaction.on_commit(_vaciar)
+
+
+def _vaciar():
+    pendientes = getattr(_local, 'secciones', None)
+    if not pendientes:
+        return
+    ids = set(pendientes)
+    pendientes.clear()
+    actualizar(ids)
+
+
+def _secuencia():
+    """Número creciente por hilo: ordena los ajustes pendientes respecto de los recálculos."""
+    _local.secuencia = getattr(_local, 'secuencia', 0) + 1
+    return _local.secuencia
+
+
+def ajustar(seccion_id, inscripcion_id, anterior, nueva):
+    """
+    Programa, para cuando se confirme la transacción, el ajuste de la fila de la
+    sección por un cambio de nota_final (anterior -> nueva) de un detalle que no
+    cambió de sección ni de inscripción.
+    """
+    if seccion_id is None or anterior == nueva:
+        return
+    secuencia = _secuencia()
+    transaction.on_commit(lambda: _aplicar_ajuste(secuencia, seccion_id, inscripcion_id, anterior, nueva))
+
+
+def _aplicar_ajuste(secuencia, seccion_id, inscripcion_id, anterior, nueva):
+    if getattr(_local, 'recalculadas', {}).get(seccion_id, 0) > secuencia:
+        return  # La sección se recalculó después del cambio y ya lo incluye.
+
+    def nota(valor):
+        return Value(Decimal(str(valor)), output_field=DecimalField(max_digits=4, decimal_places=2))
+
+    def aprobada(valor):
+        return int(valor is not None and valor >= 10)
+
+    maxima, minima = F('nota_maxima'), F('nota_minima')
+    if nueva is not None:
+        maxima = Greatest(Coalesce('nota_maxima', nota(nueva)), nota(nueva))
+        minima = Least(Coalesce('nota_minima', nota(nueva)), nota(nueva))
+
+    filas = EstadisticaSeccion.objects.filter(
+        seccion_id=seccion_id, periodo_id=Subquery(Inscripcion.objects.filter(pk=inscripcion_id).values('periodo_id')),
+    )
+    if anterior is not None:
+        # Sin la nota anterior, máxima y mínima solo se mantienen si no era un extremo,
+        # si la nueva la reemplaza como tal o si era la única nota cargada; si no, se
+        # recalcula la sección.
+        unica = Q(calificadas=1)
+        if nueva is None or nueva > anterior:
+            filas = filas.filter(Q(nota_minima__lt=anterior) | unica)
+        if nueva is None or nueva < anterior:
+            filas = filas.filter(Q(nota_maxima__gt=anterior) | unica)
+        sola = nota(nueva) if nueva is not None else Value(None, output_field=DecimalField(max_digits=4, decimal_places=2))
+        maxima = Case(When(unica, then=sola), default=maxima)
+        minima = Case(When(unica, then=sola), default=minima)
+
+    # Los extremos van primero: dependen del valor de 'calificadas' antes del cambio.
+    cambios = {
+        'nota_maxima': maxima,
+        'nota_minima': minima,
+        'calificadas': F('calificadas') + (int(nueva is not None) - int(anterior is not None)),
+        'aprobados': F('aprobados') + (aprobada(nueva) - aprobada(anterior)),
+        'suma_notas': F('suma_notas') + nota((nueva or 0) - (anterior or 0)),
+        'actualizado': timezone.now(),
+    }
+    if filas.update(**cambios):
+        incrementar(ALCANCE)
+    else:
+        actualizar({seccion_id})
+
+
+def _calcular(detalles):
+    filas = detalles.filter(seccion__isnull=False).values('inscripcion__periodo_id', 'seccion_id').annotate(
+        inscritos=Count('id'),
+        calificadas=Count('nota_final'),
+        aprobados=Count('id', filter=Q(nota_final__gte=10)),
+        suma_notas=Sum('nota_final'),
+        nota_maxima=Max('nota_final'),
+        nota_minima=Min('nota_final'),
+    ).order_by()
+    return [
+        EstadisticaSeccion(
+            periodo_id=fila['inscripcion__periodo_id'],
+            seccion_id=fila['seccion_id'],
+            inscritos=fila['inscritos'],
+            calificadas=fila['calificadas'],
+            aprobados=fila['aprobados'],
+            suma_notas=fila['suma_notas'] or 0,
+            nota_maxima=fila['nota_maxima'],
+            nota_minima=fila['nota_minima'],
+        )
+        for fila in filas
+    ]
+
+
+def actualizar(seccion_ids):
+    """Recalcula las filas de las secciones indicadas (todas sus combinaciones de período)."""
+    seccion_ids = set(seccion_ids)
+    if not hasattr(_local, 'recalculadas'):
+        _local.recalculadas = {}
+    secuencia = _secuencia()
+    _local.recalculadas.update(dict.fromkeys(seccion_ids, secuencia))
+    filas = _calcular(DetalleInscripcion.objects.filter(seccion_id__in=seccion_ids))
+
+    with transaction.atomic():
+        if filas:
+            EstadisticaSeccion.objects.bulk_create(
+                filas, update_conflicts=True, unique_fields=['periodo', 'seccion'], update_fields=CAMPOS_ESTADISTICA
+            )
+        vigentes = Q()
+        for fila in filas:
+            vigentes |= Q(periodo_id=fila.periodo_id, seccion_id=fila.seccion_id)
+        obsoletas = EstadisticaSeccion.objects.filter(seccion_id__in=seccion_ids)
+        if filas:
+            obsoletas = obsoletas.exclude(vigentes)
+        obsoletas.delete()
+    incrementar(ALCANCE)
+
+
+def reconstruir():
+    """Rehace la tabla completa desde DetalleInscripcion. Retorna el número de filas."""
+    filas = _calcular(DetalleInscripcion.objects.all())
+    with transaction.atomic():
+        EstadisticaSeccion.objects.all().delete()
+        EstadisticaSeccion.objects.bulk_create(filas, batch_size=1000)
+    incrementar(ALCANCE)
+    return len(filas)
+
+
+def congelar_periodo(periodo):
+    """
+    Congela los agregados del período por sección, asignatura, semestre y programa.
+    Reemplaza una instantánea anterior del mismo período. Retorna el número de filas.
+    """
+    secciones = DetalleInscripcion.objects.filter(
+        inscripcion__periodo=periodo, seccion__isnull=False
+    ).values_list('seccion_id', flat=True).distinct()
+    actualizar(set(secciones))
+
+    filas = EstadisticaSeccion.objects.filter(periodo=periodo).select_related(
+        'seccion__asignatura__programa', 'seccion__docente'
+    ).order_by('seccion__asignatura__semestre', 'seccion__asignatura__orden', 'seccion_id')
+
+    niveles = {}
+
+    def acumular(clave, base, fila):
+        instantanea = niveles.get(clave)
+        if instantanea is None:
+            instantanea = niveles[clave] = InstantaneaEstadistica(periodo=periodo, **base)
+        instantanea.inscritos += fila.inscritos
+        instantanea.calificadas += fila.calificadas
+        instantanea.aprobados += fila.aprobados
+        instantanea.suma_notas += fila.suma_notas
+        for campo, elegir in (('nota_maxima', max), ('nota_minima', min)):
+            valor = getattr(fila, campo)
+            actual = getattr(instantanea, campo)
+            if valor is not None:
+                setattr(instantanea, campo, valor if actual is None else elegir(actual, valor))
+
+    for fila in filas:
+        seccion = fila.seccion
+        asignatura = seccion.asignatura
+        programa = {'programa_id': asignatura.programa_id, 'programa_nombre': asignatura.programa.nombre_programa}
+        semestre = dict(programa, semestre=asignatura.semestre)
+        materia = dict(
+            semestre, asignatura_id=asignatura.pk, asignatura_codigo=asignatura.codigo,
+            asignatura_nombre=asignatura.nombre_asignatura, orden=asignatura.orden,
+        )
+        docente = seccion.docente
+        acumular((InstantaneaEstadistica.SECCION, seccion.pk), dict(
+            materia, nivel=InstantaneaEstadistica.SECCION, seccion_id=seccion.pk, seccion_codigo=seccion.codigo_seccion,
+            docente_id=seccion.docente_id, docente_nombre=docente.get_full_name() if docente else '',
+        ), fila)
+        acumular((InstantaneaEstadistica.ASIGNATURA, asignatura.pk), dict(materia, nivel=InstantaneaEstadistica.ASIGNATURA), fila)
+        acumular((InstantaneaEstadistica.SEMESTRE, asignatura.programa_id, asignatura.semestre),
+                 dict(semestre, nivel=InstantaneaEstadistica.SEMESTRE), fila)
+        acumular((InstantaneaEstadistica.PROGRAMA, asignatura.programa_id), dict(programa, nivel=InstantaneaEstadistica.PROGRAMA), fila)
+
+    with transaction.atomic():
+        InstantaneaEstadistica.objects.filter(periodo=periodo).delete()
+        InstantaneaEstadistica.objects.bulk_create(niveles.values(), batch_size=1000)
+    incrementar(ALCANCE)
+    return len(niveles)
+
+
+def leer_instantanea(periodo, nivel):
+    """Filas congeladas del período para un nivel."""
+    return InstantaneaEstadistica.objects.filter(periodo=periodo, nivel=nivel)
+
+
+def congelado(periodo):
+    """
+    Indica si las consultas del período deben leer la instantánea: período cerrado
+    y ya congelado. Un período cerrado sin instantánea se sigue leyendo en vivo.
+    """
+    return periodo is not None and not periodo.activo and InstantaneaEstadistica.objects.filter(periodo=periodo).exists()
+
+
+def _agregados(prefijo='', filtro=None):
+    """Agregados sobre filas de estadísticas: count, avg, max, min (avg ponderado por notas cargadas)."""
+    return {
+        'count': Coalesce(Sum(f'{prefijo}inscritos', filter=filtro), 0),
+        'avg': Cast(Sum(f'{prefijo}suma_notas', filter=filtro), FloatField())
+        / Cast(NullIf(Sum(f'{prefijo}calificadas', filter=filtro), 0), FloatField()),
+        'max': Max(f'{prefijo}nota_maxima', filter=filtro),
+        'min': Min(f'{prefijo}nota_minima', filter=filtro),
+    }
+
+
+def anotar_secciones(secciones, periodo=None):
+    """Anota count/avg/max/min de cada sección sumando sus filas de todos los períodos, o solo del indicado."""
+    filtro = Q(estadisticas__periodo=periodo) if periodo is not None else None
+    return secciones.annotate(**_agregados('estadisticas__', filtro))
+
+
+def por_semestre(estadisticas, por_programa=True, congeladas=False):
+    """
+    Agrupa filas de EstadisticaSeccion (o de InstantaneaEstadistica con congeladas=True)
+    por (programa, semestre), o solo por semestre.
+    """
+    if congeladas:
+        campos = ['semestre'] + (['programa'] if por_programa else [])
+        return estadisticas.values(*campos).annotate(**_agregados()).order_by(*campos)
+    grupos = {'semestre': F('seccion__asignatura__semestre')}
+    if por_programa:
+        grupos['programa'] = F('seccion__asignatura__programa_id')
+    return estadisticas.values(**grupos).annotate(**_agregados()).order_by(*grupos)
+
+
+# Distribución de notas -------------------------------------------------------
+
+NOTA_APROBATORIA = 10
+BARRAS_HISTOGRAMA = 20
+
+
+class Percentil(Aggregate):
+    """PERCENTILE_CONT(p) WITHIN GROUP (ORDER BY expr) de PostgreSQL."""
+    function = 'PERCENTILE_CONT'
+    name = 'Percentil'
+    template = '%(function)s(%(percentil)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentil, **extra):
+        super().__init__(expression, percentil=float(percentil), **extra)
+
+
+CUARTILES = (('q1', 0.25), ('mediana', 0.5), ('q3', 0.75))
+
+
+def _agregados_distribucion(con_percentiles):
+    agregados = {
+        'inscritos': Count('id'),
+        'calificadas': Count('nota_final'),
+        'aprobados': Count('id', filter=Q(nota_final__gte=NOTA_APROBATORIA)),
+        'promedio': Avg('nota_final'),
+        'minima': Min('nota_final'),
+        'maxima': Max('nota_final'),
+    }
+    # Una barra por nota entera de 1 a 20: la barra k cuenta las notas en [k, k+1)
+    # (9.5 va con el 9) y la última solo el 20. Todas las barras salen de la
+    # misma consulta agrupada como conteos condicionales.
+    for barra in range(1, BARRAS_HISTOGRAMA + 1):
+        desde = Q(nota_final__gte=barra) if barra > 1 else Q(nota_final__isnull=False)
+        hasta = Q(nota_final__lt=barra + 1) if barra < BARRAS_HISTOGRAMA else Q()
+        agregados[f'barra_{barra}'] = Count('id', filter=desde & hasta)
+    if con_percentiles:
+        agregados['desviacion'] = StdDev('nota_final')
+        agregados.update({nombre: Percentil('nota_final', p) for nombre, p in CUARTILES})
+    return agregados
+
+
+def _cuartiles_en_proceso(detalles, por_seccion, por_asignatura):
+    """
+    Desviación y cuartiles sin PERCENTILE_CONT (SQLite, cuyo STDDEV_POP además falla
+    en grupos sin notas): una sola consulta ordenada con todas las notas y
+    statistics.quantiles(method='inclusive'), que interpola igual que PERCENTILE_CONT.
+    """
+    notas_seccion = {}
+    notas_asignatura = {}
+    filas = detalles.filter(nota_final__isnull=False).values_list(
+        'asignatura_id', 'seccion_id', 'nota_final'
+    ).order_by('nota_final')
+    for asignatura_id, seccion_id, nota in filas.iterator():
+        notas_asignatura.setdefault(asignatura_id, []).append(float(nota))
+        if seccion_id is not None:
+            notas_seccion.setdefault(seccion_id, []).append(float(nota))
+
+    for grupos, notas_por_clave, clave in ((por_seccion, notas_seccion, 'seccion_id'), (por_asignatura, notas_asignatura, 'asignatura_id')):
+        for fila in grupos:
+            notas = notas_por_clave.get(fila[clave], [])
+            fila['desviacion'] = statistics.pstdev(notas) if notas else None
+            if len(notas) > 1:
+                valores = statistics.quantiles(notas, n=4, method='inclusive')
+            else:
+                valores = notas * 3 or [None] * 3
+            fila.update(zip((nombre for nombre, _ in CUARTILES), valores))
+
+
+def _formatear_distribucion(fila):
+    def redondear(valor):
+        return round(float(valor), 2) if valor is not None else None
+
+    calificadas = fila['calificadas']
+    return {
+        'inscritos': fila['inscritos'],
+        'calificadas': calificadas,
+        'aprobados': fila['aprobados'],
+        'tasa_aprobacion': round(fila['aprobados'] * 100 / calificadas, 2) if calificadas else 0,
+        'promedio': redondear(fila['promedio']),
+        'desviacion': redondear(fila['desviacion']),
+        'minima': redondear(fila['minima']),
+        'maxima': redondear(fila['maxima']),
+        **{nombre: redondear(fila[nombre]) for nombre, _ in CUARTILES},
+        'histograma': [fila[f'barra_{barra}'] for barra in range(1, BARRAS_HISTOGRAMA + 1)],
+    }
+
+
+def distribucion(detalles):
+    """
+    Distribución de la nota final por sección y por asignatura: tasa de aprobación,
+    desviación estándar, cuartiles e histograma de una barra por nota (1 a 20). Todo se agrega en la
+    base de datos (dos consultas agrupadas; una más en SQLite para los cuartiles).
+    """
+    con_percentiles = connection.vendor == 'postgresql'
+    agregados = _agregados_distribucion(con_percentiles)
+
+    por_seccion = list(detalles.filter(seccion__isnull=False).values(
+        'seccion_id', 'seccion__codigo_seccion', 'seccion__docente__first_name', 'seccion__docente__last_name',
+        'asignatura_id',
+    ).annotate(**agregados).order_by('asignatura_id', 'seccion_id'))
+    por_asignatura = list(detalles.values(
+        'asignatura_id', 'asignatura__codigo', 'asignatura__nombre_asignatura', 'asignatura__semestre',
+    ).annotate(**agregados).order_by('asignatura__semestre', 'asignatura__orden', 'asignatura_id'))
+
+    if not con_percentiles:
+        _cuartiles_en_proceso(detalles, por_seccion, por_asignatura)
+
+    return {
+        'etiquetas_histograma': [str(barra) for barra in range(1, BARRAS_HISTOGRAMA + 1)],
+        'asignaturas': [{
+            'id': fila['asignatura_id'],
+            'code': fila['asignatura__codigo'],
+            'name': fila['asignatura__nombre_asignatura'],
+            'semestre': fila['asignatura__semestre'],
+            **_formatear_distribucion(fila),
+        } for fila in por_asignatura],
+        'secciones': [{
+            'id': fila['seccion_id'],
+            'code': fila['seccion__codigo_seccion'],
+            'asignatura_id': fila['asignatura_id'],
+            'docente': ' '.join(filter(None, [fila['seccion__docente__first_name'], fila['seccion__docente__last_name']])) or 'Sin asignar',
+            **_formatear_distribucion(fila),
+        } for fila in por_seccion],
+    }
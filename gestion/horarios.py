@@ -0,0 +1,126 @@
+"""
+Representación del horario como máscara de bits.
+
+La grilla de clases es fija: cada día tiene 14 bloques de 45 minutos entre
+las 07:00 y las 17:30. El resto del día (noche y madrugada) se cubre con
+bloques adicionales, de modo que ningún horario válido queda sin bits. Cada
+par (día, bloque) ocupa un bit, así que la ocupación semanal de una sección
+es un entero y dos secciones solo pueden chocar si el AND de sus máscaras es
+distinto de cero. La máscara es un filtro rápido: un horario marca todo bloque
+que toca, así que clases contiguas (07:00-08:00 y 08:00-09:00) comparten bloque
+sin chocar; cada coincidencia se confirma con se_solapan().
+"""
+from itertools import combinations
+
+BLOQUES = [
+    (1, '07:00', '07:45'), (2, '07:45', '08:30'), (3, '08:30', '09:15'),
+    (4, '09:15', '10:00'), (5, '10:00', '10:45'), (6, '10:45', '11:30'),
+    (7, '11:30', '12:15'), (8, '12:15', '13:00'), (9, '13:00', '13:45'),
+    (10, '13:45', '14:30'), (11, '14:30', '15:15'), (12, '15:15', '16:00'),
+    (13, '16:00', '16:45'), (14, '16:45', '17:30'),
+]
+
+NUM_DIAS = 7  # Lunes a Domingo, igual que Horario.DIA_CHOICES
+DURACION_BLOQUE = 45
+
+
+def _minutos(valor):
+    if isinstance(valor, str):
+        horas, minutos = valor.split(':')
+        return int(horas) * 60 + int(minutos)
+    return valor.hour * 60 + valor.minute
+
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def _bloques_fuera_de_grilla():
+    """Bloques de 45 minutos desde el fin de la grilla hasta medianoche y desde medianoche hasta su inicio."""
+    tramos = []
+    inicio = _minutos(BLOQUES[-1][2])
+    while inicio < 24 * 60:
+        tramos.append((inicio, min(inicio + DURACION_BLOQUE, 24 * 60)))
+        inicio += DURACION_BLOQUE
+    fin = _minutos(BLOQUES[0][1])
+    madrugada = []
+    while fin > 0:
+        madrugada.append((max(fin - DURACION_BLOQUE, 0), fin))
+        fin -= DURACION_BLOQUE
+    tramos.extend(reversed(madrugada))
+    return [(len(BLOQUES) + i, _hora(inicio), _hora(fin)) for i, (inicio, fin) in enumerate(tramos, 1)]
+
+
+# Los bloques 1-14 son la grilla oficial; los siguientes solo existen para
+# detectar choques entre horarios nocturnos o de madrugada.
+BLOQUES_EXTRA = _bloques_fuera_de_grilla()
+TODOS_LOS_BLOQUES = BLOQUES + BLOQUES_EXTRA
+NUM_BLOQUES = len(TODOS_LOS_BLOQUES)
+
+_LIMITES_BLOQUES = [(bid, _minutos(inicio), _minutos(fin)) for bid, inicio, fin in TODOS_LOS_BLOQUES]
+
+
+def bit(dia, bloque):
+    """Posición del bit para un día (1-7) y bloque (1-NUM_BLOQUES)."""
+    return 1 << ((dia - 1) * NUM_BLOQUES + (bloque - 1))
+
+
+def mascara_horario(dia, hora_inicio, hora_fin):
+    """Máscara de los bloques que se solapan con el intervalo [hora_inicio, hora_fin)."""
+    if not dia or dia < 1 or dia > NUM_DIAS:
+        return 0
+    inicio = _minutos(hora_inicio)
+    fin = _minutos(hora_fin)
+    mascara = 0
+    for bid, b_inicio, b_fin in _LIMITES_BLOQUES:
+        if b_inicio < fin and b_fin > inicio:
+            mascara |= bit(dia, bid)
+    return mascara
+
+
+def se_solapan(a, b):
+    """Choque exacto entre dos horarios (con dia, hora_inicio y hora_fin); los contiguos no chocan."""
+    return a.dia == b.dia and a.hora_inicio < b.hora_fin and b.hora_inicio < a.hora_fin
+
+
+def mascara_de_horarios(horarios):
+    """Combina la ocupación de varios objetos Horario."""
+    mascara = 0
+    for h in horarios:
+        mascara |= mascara_horario(h.dia, h.hora_inicio, h.hora_fin)
+    return mascara
+
+
+def a_texto(mascara):
+    """Serializa una máscara para guardarla en la base de datos (hexadecimal)."""
+    return format(mascara, 'x')
+
+
+def desde_texto(valor):
+    return int(valor, 16) if valor else 0
+
+
+def bloques_de_mascara(mascara):
+    """Lista de tuplas (dia, bloque) ocupadas por la máscara."""
+    ocupados = []
+    posicion = 0
+    while mascara:
+        if mascara & 1:
+            ocupados.append((posicion // NUM_BLOQUES + 1, posicion % NUM_BLOQUES + 1))
+        mascara >>= 1
+        posicion += 1
+    return ocupados
+
+
+def choques(mascaras):
+    """
+    Escaneo en lote de choques.
+
+    Recibe un diccionario {clave: mascara} y retorna la lista de pares
+    (clave_a, clave_b) cuyas máscaras se solapan: candidatos a choque que
+    se confirman con se_solapan().
+    """
+    return [
+        (a, b) for (a, mascara_a), (b, mascara_b) in combinations(mascaras.items(), 2)
+        if mascara_a & mascara_b
+    ]
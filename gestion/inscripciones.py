@@ -0,0 +1,469 @@
+"""
+Motor de validación de inscripciones.
+
+Carga el estado académico del estudiante (asignaturas aprobadas, UC del
+período y bloques de horario inscritos) en pocas consultas y evalúa en
+memoria todas las reglas de inscripción. Los choques de horario se
+filtran con las máscaras de ocupación precalculadas de cada sección y se
+confirman comparando las horas exactas (ver gestion/horarios.py).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from gestion.cache import incrementar
+from gestion.horarios import desde_texto, se_solapan
+from gestion.models import Asignatura, DetalleInscripcion, Horario, Inscripcion, PeriodoAcademico, Seccion, SolicitudInscripcion
+from gestion.prelaciones import obtener_grafo
+
+logger = logging.getLogger(__name__)
+
+LIMITE_UC_PERIODO = 35
+
+
+def obtener_periodo_inscripcion():
+    """Retorna (periodo, error) con el período activo que tiene inscripciones abiertas."""
+    periodos = list(PeriodoAcademico.objects.filter(activo=True).order_by('-inscripciones_activas', 'pk')[:1])
+    if not periodos:
+        return None, 'No hay período académico activo.'
+    periodo = periodos[0]
+    if not periodo.inscripciones_activas:
+        return None, f'Las inscripciones están cerradas para el período {periodo.nombre_periodo}.'
+    return periodo, None
+
+
+def mensaje_sin_cupo(seccion):
+    return f'La sección {seccion.codigo_seccion} de {seccion.asignatura.nombre_asignatura} no tiene cupos disponibles.'
+
+
+def mensaje_cupo_bloqueado(seccion):
+    return (
+        f'No se pudo reservar el cupo de la sección {seccion.codigo_seccion} de '
+        f'{seccion.asignatura.nombre_asignatura} por inscripciones simultáneas. Intenta de nuevo.'
+    )
+
+
+def recontar_inscritos():
+    """Recalcula en un solo UPDATE el contador de inscritos (período activo) de todas las secciones."""
+    conteo = DetalleInscripcion.objects.filter(
+        seccion=OuterRef('pk'), inscripcion__periodo__activo=True
+    ).values('seccion').annotate(total=Count('id')).values('total')
+    actualizadas = Seccion.objects.update(inscritos=Coalesce(Subquery(conteo), 0))
+    incrementar('inscripciones')
+    return actualizadas
+
+
+class EstadoAcademico:
+    """
+    Estado académico de un estudiante precargado para validar inscripciones.
+
+    Todas las inscripciones del estudiante, junto con la máscara de horario
+    de cada sección inscrita, se leen en una sola consulta.
+    """
+
+    def __init__(self, estudiante, periodo=None, error_periodo=None):
+        self.estudiante = estudiante
+        self.periodo = periodo
+        self.error_periodo = error_periodo
+
+        self.aprobadas = set()
+        self.aprobadas_estatus = set()
+        self.creditos_aprobados = 0
+        self.inscritas_periodo = set()
+        self.uc_periodo = 0
+        self.secciones_periodo = {}
+        self.mascara_periodo = 0
+        # Horarios de las secciones del período; se cargan solo al confirmar un choque.
+        self._horarios = {}
+        self._registradas = {}
+
+        self._total_creditos_programa = None
+        self._cargar()
+
+    @classmethod
+    def para_inscripcion(cls, estudiante):
+        """Construye el estado usando el período con inscripciones abiertas."""
+        periodo, error = obtener_periodo_inscripcion()
+        return cls(estudiante, periodo, error)
+
+    def _cargar(self):
+        filas = DetalleInscripcion.objects.filter(
+            inscripcion__estudiante=self.estudiante
+        ).values_list(
+            'asignatura_id', 'asignatura__creditos', 'inscripcion__periodo_id',
+            'estatus', 'nota_final', 'seccion_id', 'seccion__asignatura__nombre_asignatura',
+            'seccion__mascara_horario'
+        )
+
+        periodo_id = self.periodo.pk if self.periodo else None
+        for asignatura_id, creditos, det_periodo_id, estatus, nota_final, seccion_id, nombre, mascara in filas:
+            if estatus == 'APROBADO':
+                self.aprobadas_estatus.add(asignatura_id)
+            if estatus == 'APROBADO' or (nota_final is not None and nota_final >= 10):
+                self.aprobadas.add(asignatura_id)
+                self.creditos_aprobados += creditos
+
+            if periodo_id is not None and det_periodo_id == periodo_id:
+                self.inscritas_periodo.add(asignatura_id)
+                self.uc_periodo += creditos
+                if seccion_id:
+                    mascara = desde_texto(mascara)
+                    self.secciones_periodo[seccion_id] = (nombre, mascara)
+                    self.mascara_periodo |= mascara
+
+    def total_creditos_programa(self):
+        if self._total_creditos_programa is None:
+            self._total_creditos_programa = Asignatura.objects.filter(
+                programa_id=self.estudiante.programa_id
+            ).aggregate(total=Sum('creditos'))['total'] or 0
+        return self._total_creditos_programa
+
+    def _reglas(self, seccion, verificar_choques):
+        """Genera, en orden, los mensajes de error de cada regla incumplida."""
+        asignatura = seccion.asignatura
+
+        if "SERVICIO COMUNITARIO" in asignatura.nombre_asignatura.upper():
+            total_creditos = self.total_creditos_programa()
+            creditos_aprobados = self.creditos_aprobados
+            if creditos_aprobados < (total_creditos * 0.5):
+                porcentaje_actual = (creditos_aprobados / total_creditos * 100) if total_creditos > 0 else 0
+                yield f'Requisito no cumplido: Para cursar Servicio Comunitario debes tener aprobado el 50% de las Unidades de Crédito. (Tienes: {creditos_aprobados} UC - {porcentaje_actual:.1f}%)'
+
+        if self.periodo is None:
+            yield self.error_periodo
+            return
+
+        if asignatura.pk in self.inscritas_periodo:
+            yield 'El estudiante ya está inscrito en esta asignatura en el período actual.'
+
+        if asignatura.pk in self.aprobadas_estatus:
+            yield 'El estudiante ya aprobó esta asignatura anteriormente.'
+
+        grafo = obtener_grafo(asignatura.programa_id)
+        for prereq_id in grafo.faltantes(asignatura.pk, self.aprobadas):
+            prereq = grafo.info(prereq_id)
+            yield f'No puedes inscribir esta materia. Requiere haber aprobado: {prereq["nombre"]} ({prereq["codigo"]}).'
+
+        uc_nueva = asignatura.creditos
+        if (self.uc_periodo + uc_nueva) > LIMITE_UC_PERIODO:
+            yield f'No puedes inscribir esta asignatura porque superarías el límite de {LIMITE_UC_PERIODO} UC. (Tienes {self.uc_periodo} UC + {uc_nueva} UC de esta materia = {self.uc_periodo + uc_nueva})'
+
+        if verificar_choques:
+            choques = self.choques(seccion)
+            if choques:
+                yield mensaje_choque(asignatura, *choques[0])
+
+    def horarios_de(self, seccion_id):
+        """Horarios de una sección del período (inscrita o registrada en memoria)."""
+        if seccion_id not in self._horarios:
+            if seccion_id in self._registradas:
+                self._horarios[seccion_id] = list(self._registradas.pop(seccion_id).horarios.all())
+            else:
+                # Una sola consulta para todas las secciones inscritas aún sin cargar.
+                pendientes = [pk for pk in self.secciones_periodo if pk not in self._horarios and pk not in self._registradas]
+                for pk in pendientes:
+                    self._horarios[pk] = []
+                for h in Horario.objects.filter(seccion_id__in=pendientes):
+                    self._horarios[h.seccion_id].append(h)
+        return self._horarios.get(seccion_id, [])
+
+    def choques(self, seccion):
+        """
+        Pares (asignatura inscrita, horario nuevo) que se solapan de verdad con la
+        sección. La máscara descarta sin consultas las secciones sin bloques en común.
+        """
+        if not seccion.mascara & self.mascara_periodo:
+            return []
+        encontrados = []
+        for seccion_id, (nombre_existente, mascara_existente) in self.secciones_periodo.items():
+            if seccion_id == seccion.pk or not seccion.mascara & mascara_existente:
+                continue
+            existentes = self.horarios_de(seccion_id)
+            for h_nuevo in seccion.horarios.all():
+                if any(se_solapan(h_nuevo, h) for h in existentes):
+                    encontrados.append((nombre_existente, h_nuevo))
+                    break
+        return encontrados
+
+    def registrar(self, seccion):
+        """Agrega la sección al estado en memoria, como si ya estuviera inscrita."""
+        asignatura = seccion.asignatura
+        self.inscritas_periodo.add(asignatura.pk)
+        self.uc_periodo += asignatura.creditos
+        self.secciones_periodo[seccion.pk] = (asignatura.nombre_asignatura, seccion.mascara)
+        self.mascara_periodo |= seccion.mascara
+        self._registradas[seccion.pk] = seccion
+
+    def validar(self, seccion, verificar_choques=True):
+        """Retorna el primer error de inscripción para la sección, o None si es válida."""
+        return next(self._reglas(seccion, verificar_choques), None)
+
+    def errores(self, seccion, verificar_choques=True):
+        """Retorna todos los errores de inscripción para la sección."""
+        return list(self._reglas(seccion, verificar_choques))
+
+
+def mensaje_choque(asignatura, nombre_existente, h_nuevo):
+    return (
+        f"CHOQUE DE HORARIO: La asignatura '{asignatura.nombre_asignatura}' "
+        f"choca con '{nombre_existente}' "
+        f"el día {h_nuevo.get_dia_display()} ({h_nuevo.hora_inicio.strftime('%H:%M')} - {h_nuevo.hora_fin.strftime('%H:%M')}). "
+        f"Por favor comunica esta situación a un administrador."
+    )
+
+
+def clasificar_secciones(estudiante):
+    """
+    Clasifica todas las secciones del programa del estudiante según su estado de
+    inscripción: ELEGIBLE, INSCRITA, APROBADA, PRELACION (con las asignaturas que
+    faltan), LIMITE_UC o CHOQUE. Todo se calcula con operaciones de conjuntos y
+    máscaras sobre datos precargados y el grafo de prelaciones del programa, sin
+    consultas por sección.
+    """
+    estado = EstadoAcademico.para_inscripcion(estudiante)
+
+    secciones = Seccion.objects.filter(
+        asignatura__programa_id=estudiante.programa_id
+    ).select_related('asignatura', 'docente').prefetch_related('horarios').order_by(
+        'asignatura__semestre', 'asignatura__orden', 'codigo_seccion'
+    )
+
+    grafo = obtener_grafo(estudiante.programa_id)
+
+    resultado = []
+    for seccion in secciones:
+        asignatura = seccion.asignatura
+        faltantes = grafo.faltantes(asignatura.pk, estado.aprobadas)
+        choques = estado.choques(seccion)
+        item = {
+            'id': seccion.pk,
+            'codigo_seccion': seccion.codigo_seccion,
+            'asignatura_id': asignatura.pk,
+            'asignatura_codigo': asignatura.codigo,
+            'asignatura': asignatura.nombre_asignatura,
+            'semestre': asignatura.semestre,
+            'creditos': asignatura.creditos,
+            'docente': seccion.docente.get_full_name() if seccion.docente else 'Sin asignar',
+        }
+
+        if asignatura.pk in estado.inscritas_periodo:
+            item['estado'] = 'INSCRITA'
+        elif asignatura.pk in estado.aprobadas_estatus:
+            item['estado'] = 'APROBADA'
+        elif "SERVICIO COMUNITARIO" in asignatura.nombre_asignatura.upper() and estado.creditos_aprobados < estado.total_creditos_programa() * 0.5:
+            item['estado'] = 'PRELACION'
+            item['prelaciones_faltantes'] = []
+            item['motivo'] = 'Requiere el 50% de las Unidades de Crédito aprobadas.'
+        elif faltantes:
+            item['estado'] = 'PRELACION'
+            item['prelaciones_faltantes'] = [
+                {'codigo': grafo.info(pk)['codigo'], 'nombre': grafo.info(pk)['nombre']} for pk in faltantes
+            ]
+        elif estado.uc_periodo + asignatura.creditos > LIMITE_UC_PERIODO:
+            item['estado'] = 'LIMITE_UC'
+        elif choques:
+            item['estado'] = 'CHOQUE'
+            item['choca_con'] = list(dict.fromkeys(nombre for nombre, _ in choques))
+        else:
+            item['estado'] = 'ELEGIBLE'
+        resultado.append(item)
+
+    return {
+        'inscripciones_abiertas': estado.periodo is not None,
+        'mensaje': estado.error_periodo,
+        'uc_inscritas': estado.uc_periodo,
+        'uc_disponibles': max(LIMITE_UC_PERIODO - estado.uc_periodo, 0),
+        'secciones': resultado,
+    }
+
+
+def secciones_disponibles(estudiante):
+    """Clasificación de secciones cacheada hasta que cambien las notas o inscripciones del estudiante."""
+    from gestion.cache import obtener_o_calcular
+    return obtener_o_calcular(
+        f'secciones_disponibles:{estudiante.pk}',
+        [f'estudiante:{estudiante.pk}', 'secciones', 'periodos'],
+        lambda: clasificar_secciones(estudiante),
+    )
+
+
+def simular_inscripcion(estudiante, seccion_ids):
+    """
+    Evalúa una combinación completa de secciones sin escribir en la base de datos.
+
+    Cada sección se valida contra lo ya inscrito y contra las secciones
+    anteriores de la misma propuesta, reportando todas las reglas incumplidas.
+    Retorna además la grilla semanal combinada (inscritas + propuestas).
+    """
+    from itertools import combinations
+    from gestion.horarios import TODOS_LOS_BLOQUES, bloques_de_mascara
+
+    estado = EstadoAcademico.para_inscripcion(estudiante)
+    inscritas = [(seccion_id, nombre, mascara) for seccion_id, (nombre, mascara) in estado.secciones_periodo.items()]
+
+    secciones = Seccion.objects.filter(pk__in=seccion_ids).select_related('asignatura').prefetch_related('horarios')
+    secciones_map = {seccion.pk: seccion for seccion in secciones}
+
+    resultados = []
+    propuestas = []
+    for seccion_id in seccion_ids:
+        seccion = secciones_map.get(seccion_id)
+        if seccion is None:
+            resultados.append({'seccion_id': seccion_id, 'asignatura': None, 'errores': ['Sección no encontrada.']})
+            continue
+
+        if estudiante.programa_id != seccion.asignatura.programa_id:
+            errores = ['Esta asignatura no pertenece a tu programa.']
+        else:
+            errores = estado.errores(seccion)
+        if seccion.cupo_maximo is not None and seccion.inscritos >= seccion.cupo_maximo:
+            errores.append(mensaje_sin_cupo(seccion))
+
+        resultados.append({
+            'seccion_id': seccion_id,
+            'asignatura': seccion.asignatura.nombre_asignatura,
+            'errores': errores,
+        })
+        estado.registrar(seccion)
+        propuestas.append((seccion.pk, seccion.asignatura.nombre_asignatura, seccion.mascara))
+
+    def chocan_en(dia, a, b):
+        # Dos clases que comparten bloque y se solapan ese día se solapan dentro del bloque.
+        return any(
+            se_solapan(h_a, h_b)
+            for h_a in estado.horarios_de(a) if h_a.dia == dia
+            for h_b in estado.horarios_de(b)
+        )
+
+    nombres_dia = dict(Horario.DIA_CHOICES)
+    celdas = {}
+    for seccion_id, nombre, mascara in inscritas + propuestas:
+        for posicion in bloques_de_mascara(mascara):
+            celdas.setdefault(posicion, []).append((seccion_id, nombre))
+
+    horario = []
+    for (dia, bloque), ocupantes in sorted(celdas.items()):
+        _, hora_inicio, hora_fin = TODOS_LOS_BLOQUES[bloque - 1]
+        horario.append({
+            'dia': dia,
+            'dia_nombre': nombres_dia.get(dia),
+            'bloque': bloque,
+            'hora_inicio': hora_inicio,
+            'hora_fin': hora_fin,
+            'asignaturas': [nombre for _, nombre in ocupantes],
+            'choque': any(chocan_en(dia, a, b) for (a, _), (b, _) in combinations(ocupantes, 2)),
+        })
+
+    return {
+        'valida': not any(r['errores'] for r in resultados),
+        'inscripciones_abiertas': estado.periodo is not None,
+        'uc_total': estado.uc_periodo,
+        'limite_uc': LIMITE_UC_PERIODO,
+        'resultados': resultados,
+        'horario': horario,
+    }
+
+
+def inscribir(estudiante, seccion, verificar_choques=True):
+    """
+    Valida e inscribe al estudiante en la sección.
+    Retorna {'detalle_id': ...} o {'error': ...}.
+    """
+    estado = EstadoAcademico.para_inscripcion(estudiante)
+    error = estado.validar(seccion, verificar_choques=verificar_choques)
+    if error:
+        return {'error': error}
+
+    with transaction.atomic():
+        if not seccion.ocupar_cupo():
+            return {'error': mensaje_sin_cupo(seccion)}
+
+        inscripcion, _ = Inscripcion.objects.get_or_create(
+            estudiante=estudiante,
+            periodo=estado.periodo
+        )
+
+        detalle = DetalleInscripcion.objects.create(
+            inscripcion=inscripcion,
+            asignatura=seccion.asignatura,
+            seccion=seccion,
+            estatus='CURSANDO'
+        )
+
+    return {'detalle_id': detalle.id}
+
+
+def encolar_solicitud(estudiante, seccion):
+    """
+    Registra una solicitud de inscripción pendiente (o retorna la ya existente)
+    y despierta al procesador de la cola cuando se confirma la transacción.
+    """
+    solicitud = SolicitudInscripcion.objects.filter(
+        estudiante=estudiante, seccion=seccion, estado=SolicitudInscripcion.PENDIENTE
+    ).first()
+    if solicitud is None:
+        solicitud = SolicitudInscripcion.objects.create(estudiante=estudiante, seccion=seccion)
+
+        transaction.on_commit(_despertar_procesador)
+    return solicitud
+
+
+def _despertar_procesador():
+    from gestion.tasks import procesar_inscripciones_task
+    if procesar_inscripciones_task is None:
+        return
+    try:
+        procesar_inscripciones_task()
+    except Exception as e:
+        # La solicitud ya está guardada; la tomará el siguiente procesador.
+        logger.warning(f"No se pudo encolar el procesamiento de inscripciones: {e}")
+
+
+def procesar_solicitudes(limite=None):
+    """
+    Procesa solicitudes pendientes por orden de llegada, de modo que los cupos de
+    cada sección se asignan a quien llegó primero. Se trabaja por sección: el
+    procesador bloquea la fila de la sección con la solicitud pendiente más
+    antigua y atiende sus solicitudes en orden; otros procesadores saltan esa
+    sección y toman la siguiente. Una solicitud que falla se rechaza con el
+    error sin detener la cola. Retorna la cantidad de solicitudes procesadas.
+    """
+    from django.utils import timezone
+
+    pendientes = SolicitudInscripcion.objects.filter(estado=SolicitudInscripcion.PENDIENTE)
+    procesadas = 0
+    while limite is None or procesadas < limite:
+        with transaction.atomic():
+            seccion = Seccion.objects.select_for_update(skip_locked=True, of=('self',)).select_related(
+                'asignatura'
+            ).annotate(
+                primera=Subquery(pendientes.filter(seccion=OuterRef('pk')).order_by('id').values('id')[:1])
+            ).filter(primera__isnull=False).order_by('primera').first()
+            if seccion is None:
+                break
+
+            solicitudes = pendientes.filter(seccion=seccion).select_related('estudiante').order_by('id')
+            if limite is not None:
+                solicitudes = solicitudes[:limite - procesadas]
+
+            for solicitud in solicitudes:
+                try:
+                    with transaction.atomic():
+                        resultado = inscribir(solicitud.estudiante, seccion)
+                except Exception as exc:
+                    logger.exception("Error al procesar la solicitud de inscripción %s", solicitud.pk)
+                    resultado = {'error': f'No se pudo procesar la solicitud: {exc}'}
+
+                if resultado.get('error'):
+                    solicitud.estado = SolicitudInscripcion.RECHAZADA
+                    solicitud.mensaje = resultado['error']
+                else:
+                    solicitud.estado = SolicitudInscripcion.INSCRITA
+                    solicitud.mensaje = 'Te has inscrito exitosamente.'
+                    solicitud.detalle_id = resultado['detalle_id']
+                solicitud.procesada = timezone.now()
+                solicitud.save(update_fields=['estado', 'mensaje', 'detalle', 'procesada'])
+                procesadas += 1
+    return procesadas
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from gestion.models import PeriodoAcademico, Docente, Administrador, Estudiante, DetalleInscripcion
+from gestion.models import PeriodoAcademico, Docente, Administrador, Estudiante
 from gestion.notifications import notify_docente_period_end, notify_admin_period_status, send_notification_email
 from datetime import timedelta
 
@@ -64,10 +64,7 @@ class Command(BaseCommand):
                     notify_admin_period_status(admin.usuario.email, periodo_activo, "cierre")
                     notify_admin_period_status(admin.usuario.email, periodo_activo, "inicio_proximo")
 
-        pending_grades = DetalleInscripcion.objects.filter(
-            inscripcion__periodo=periodo_activo, 
-            nota_final__isnull=True
-        ).exists()
+        pending_grades = periodo_activo.calificaciones_pendientes() > 0
         
         if not pending_grades:
             admins = Administrador.objects.all()
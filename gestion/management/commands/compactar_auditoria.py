@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from gestion.models import AuditoriaNota
+
+
+class Command(BaseCommand):
+    help = ('Compacta la auditoría de notas: en los registros antiguos deja un solo cambio por nota '
+            '(valor original -> valor final) y opcionalmente elimina los que superan la retención')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=180,
+            help='Compactar registros con más de N días de antigüedad (default: 180)',
+        )
+        parser.add_argument(
+            '--retencion',
+            type=int,
+            default=None,
+            help='Eliminar registros con más de N días de antigüedad (por defecto no se elimina nada)',
+        )
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+
+        if options['retencion'] is not None:
+            eliminados, _ = AuditoriaNota.objects.filter(fecha__lt=ahora - timedelta(days=options['retencion'])).delete()
+            self.stdout.write(f"Registros eliminados por retención: {eliminados}")
+
+        antiguos = AuditoriaNota.objects.filter(fecha__lt=ahora - timedelta(days=options['dias']), detalle__isnull=False)
+        ultimos = antiguos.values('detalle', 'campo').annotate(ultimo=Max('id')).values('ultimo')
+        valor_inicial = antiguos.filter(
+            detalle=OuterRef('detalle'), campo=OuterRef('campo')
+        ).order_by('id').values('valor_anterior')[:1]
+
+        with transaction.atomic():
+            # El último cambio de cada nota hereda el valor anterior del primero y el resto se elimina.
+            AuditoriaNota.objects.filter(id__in=Subquery(ultimos)).update(valor_anterior=Subquery(valor_inicial))
+            compactados, _ = antiguos.exclude(id__in=Subquery(ultimos)).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Registros compactados: {compactados}"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from gestion.models import PeriodoAcademico, InstantaneaEstadistica
+from gestion.estadisticas import congelar_periodo
+
+
+class Command(BaseCommand):
+    help = 'Congela las estadísticas de un período cerrado (por sección, asignatura, semestre y programa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            help='ID o nombre del período a congelar (se reemplaza su instantánea si ya existe)',
+        )
+        parser.add_argument(
+            '--pendientes',
+            action='store_true',
+            help='Congelar todos los períodos inactivos que aún no tienen instantánea',
+        )
+
+    def handle(self, *args, **options):
+        if options['pendientes']:
+            periodos = PeriodoAcademico.objects.filter(activo=False).exclude(
+                pk__in=InstantaneaEstadistica.objects.values('periodo')
+            )
+        elif options['periodo']:
+            periodos = [self.obtener_periodo(options['periodo'])]
+        else:
+            raise CommandError('Indique --periodo o --pendientes.')
+
+        for periodo in periodos:
+            filas = congelar_periodo(periodo)
+            self.stdout.write(self.style.SUCCESS(f"{periodo}: {filas} agregados congelados."))
+
+    def obtener_periodo(self, valor):
+        filtro = {'pk': int(valor)} if valor.isdigit() else {'nombre_periodo': valor}
+        try:
+            return PeriodoAcademico.objects.get(**filtro)
+        except (PeriodoAcademico.DoesNotExist, PeriodoAcademico.MultipleObjectsReturned):
+            raise CommandError(f'No se encontró un único período para "{valor}".')
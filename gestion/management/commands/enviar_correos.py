@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from gestion.correos import enviar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos de la bandeja de salida reutilizando una conexión SMTP por lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Ejecutar el comando en bucle infinito (modo servicio)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10.0,
+            help='Segundos de espera entre lotes en modo continuo (default: 10)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=settings.CORREOS_LOTE,
+            help='Máximo de correos por conexión SMTP',
+        )
+
+    def handle(self, *args, **options):
+        continuous = options['continuous']
+        interval = options['interval']
+        lote = options['lote']
+
+        self.stdout.write(f"Enviando correos pendientes. Modo continuo: {continuous}")
+
+        while True:
+            enviados, fallidos = enviar_pendientes(limite=lote)
+            if enviados or fallidos:
+                self.stdout.write(f"[{timezone.now()}] {enviados} enviados, {fallidos} con error.")
+
+            if enviados + fallidos < lote:
+                if not continuous:
+                    break
+                import time
+                time.sleep(interval)
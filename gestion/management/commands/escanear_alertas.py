@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from gestion.models import PeriodoAcademico
+from gestion.alertas import escanear
+
+
+class Command(BaseCommand):
+    help = 'Escanea las notas del período y notifica solo a los estudiantes que entran en riesgo o reprueban'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            help='ID o nombre del período (default: período activo)',
+        )
+        parser.add_argument(
+            '--sin-notificar',
+            action='store_true',
+            help='Actualizar las alertas sin enviar correos',
+        )
+
+    def handle(self, *args, **options):
+        periodo = self.obtener_periodo(options['periodo'])
+        resultado = escanear(periodo, notificar=not options['sin_notificar'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{periodo}: {resultado['vigentes']} alertas vigentes, "
+            f"{resultado['nuevas']} nuevas, {resultado['resueltas']} resueltas."
+        ))
+
+    def obtener_periodo(self, valor):
+        if not valor:
+            periodo = PeriodoAcademico.objects.filter(activo=True).first()
+            if not periodo:
+                raise CommandError('No hay período activo; indique --periodo.')
+            return periodo
+        filtro = {'pk': int(valor)} if valor.isdigit() else {'nombre_periodo': valor}
+        try:
+            return PeriodoAcademico.objects.get(**filtro)
+        except (PeriodoAcademico.DoesNotExist, PeriodoAcademico.MultipleObjectsReturned):
+            raise CommandError(f'No se encontró un único período para "{valor}".')
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from gestion.inscripciones import procesar_solicitudes
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de solicitudes de inscripción por orden de llegada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Ejecutar el comando en bucle infinito (modo servicio)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Segundos de espera entre lotes en modo continuo (default: 1)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=settings.INSCRIPCIONES_LOTE_COLA,
+            help='Máximo de solicitudes por lote; junto con --interval controla el ritmo de procesamiento',
+        )
+
+    def handle(self, *args, **options):
+        continuous = options['continuous']
+        interval = options['interval']
+        lote = options['lote']
+
+        self.stdout.write(f"Procesando solicitudes de inscripción. Modo continuo: {continuous}")
+
+        while True:
+            procesadas = procesar_solicitudes(limite=lote)
+            if procesadas:
+                self.stdout.write(f"[{timezone.now()}] {procesadas} solicitudes procesadas.")
+
+            if not continuous:
+                break
+
+            if procesadas < lote:
+                import time
+                time.sleep(interval)
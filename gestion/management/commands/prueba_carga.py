@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as hora
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from gestion.horarios import a_texto, mascara_horario
+from gestion.models import (
+    Programa, Asignatura, Seccion, Horario, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion
+)
+
+NOMBRE_PROGRAMA = 'Prueba de Carga'
+PERIODO_CARGA = 'CARGA'
+
+
+class Command(BaseCommand):
+    help = ('Simula el día de inscripciones: crea datos de prueba y lanza solicitudes concurrentes '
+            'autenticadas contra mi-info, mis-inscripciones e inscribirme, reportando rendimiento')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=2000,
+                            help='Cantidad de estudiantes simulados (default: 2000)')
+        parser.add_argument('--hilos', type=int, default=50,
+                            help='Cantidad de hilos concurrentes (default: 50)')
+        parser.add_argument('--secciones', type=int, default=4,
+                            help='Secciones por asignatura de primer semestre (default: 4)')
+        parser.add_argument('--cupo', type=int, default=40,
+                            help='Cupo máximo de cada sección (default: 40)')
+        parser.add_argument('--semilla', type=int, default=None,
+                            help='Semilla aleatoria para repetir la misma corrida')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No eliminar los datos de prueba al terminar')
+
+    def handle(self, *args, **options):
+        random.seed(options['semilla'])
+        if Programa.objects.filter(nombre_programa=NOMBRE_PROGRAMA).exists():
+            self.stdout.write("Eliminando datos de una corrida anterior...")
+            self.limpiar()
+
+        self.stdout.write(f"Creando datos de prueba para {options['estudiantes']} estudiantes...")
+        inicio = time.perf_counter()
+        tokens, secciones = self.sembrar(options['estudiantes'], options['secciones'], options['cupo'])
+        self.stdout.write(f"Datos creados en {time.perf_counter() - inicio:.1f} s.")
+
+        try:
+            self.stdout.write(f"Lanzando {len(tokens)} estudiantes con {options['hilos']} hilos...")
+            resultados, duracion = self.ejecutar(tokens, secciones, options['hilos'])
+            self.reportar(resultados, duracion)
+        finally:
+            if not options['conservar']:
+                self.stdout.write("Eliminando datos de prueba...")
+                self.limpiar()
+
+    def sembrar(self, num_estudiantes, secciones_por_asignatura, cupo):
+        periodo = PeriodoAcademico.objects.filter(activo=True).first()
+        if periodo is None:
+            # bulk_create evita la señal que notifica el inicio del período a todos los estudiantes.
+            periodo = PeriodoAcademico.objects.bulk_create([PeriodoAcademico(
+                nombre_periodo=PERIODO_CARGA, fecha_inicio=date.today(), fecha_fin=date.today(),
+                activo=True, inscripciones_activas=True
+            )])[0]
+        elif not periodo.inscripciones_activas:
+            raise CommandError(f'Las inscripciones están cerradas para el período {periodo.nombre_periodo}.')
+
+        programa = Programa.objects.create(nombre_programa=NOMBRE_PROGRAMA, titulo_otorgado='N/A', duracion_anios=5)
+
+        # Pensum de 5 semestres con 6 asignaturas cada uno; cada asignatura prela a la del semestre siguiente.
+        asignaturas = Asignatura.objects.bulk_create([
+            Asignatura(programa=programa, codigo=f'CRG{semestre}{i}', nombre_asignatura=f'Carga {semestre}-{i}',
+                       creditos=3, semestre=semestre, orden=i)
+            for semestre in range(1, 6) for i in range(6)
+        ])
+        por_codigo = {a.codigo: a for a in asignaturas}
+        Asignatura.prelaciones.through.objects.bulk_create([
+            Asignatura.prelaciones.through(from_asignatura_id=a.pk, to_asignatura_id=por_codigo[f'CRG{a.semestre - 1}{a.orden}'].pk)
+            for a in asignaturas if a.semestre > 1
+        ])
+
+        secciones = []
+        horarios = []
+        for a in asignaturas:
+            for s in range(secciones_por_asignatura if a.semestre == 1 else 1):
+                dia = 1 + (a.orden + s) % 5
+                bloque = 2 * (s % 7)
+                inicio = hora(7 + (bloque * 45) // 60, (bloque * 45) % 60)
+                fin = hora(7 + ((bloque + 2) * 45) // 60, ((bloque + 2) * 45) % 60)
+                seccion = Seccion(asignatura=a, codigo_seccion=f'D{s + 1}', cupo_maximo=cupo,
+                                  mascara_horario=a_texto(mascara_horario(dia, inicio, fin)))
+                secciones.append(seccion)
+                horarios.append((seccion, dia, inicio, fin))
+        Seccion.objects.bulk_create(secciones)
+        Horario.objects.bulk_create([
+            Horario(seccion=seccion, dia=dia, hora_inicio=inicio, hora_fin=fin) for seccion, dia, inicio, fin in horarios
+        ])
+
+        password = make_password(None)
+        usuarios = User.objects.bulk_create([
+            User(username=f'carga{i:05d}', first_name='Carga', last_name=str(i), password=password)
+            for i in range(num_estudiantes)
+        ])
+        grupo, _ = Group.objects.get_or_create(name='Estudiante')
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=u.pk, group_id=grupo.pk) for u in usuarios
+        ])
+        Estudiante.objects.bulk_create([
+            Estudiante(usuario=u, programa=programa, cedula=f'CRG-{u.pk}', telefono='0000000')
+            for u in usuarios
+        ])
+        tokens = Token.objects.bulk_create([Token(user=u, key=Token.generate_key()) for u in usuarios])
+
+        primer_semestre = [s.pk for s in secciones if s.asignatura.semestre == 1]
+        return [t.key for t in tokens], primer_semestre
+
+    def ejecutar(self, tokens, secciones, hilos):
+        resultados = []
+        bloqueo = threading.Lock()
+
+        def solicitud(client, metodo, ruta, clave):
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                try:
+                    resp = getattr(client, metodo)(ruta)
+                    codigo = resp.status_code
+                except Exception:
+                    codigo = None
+                latencia = time.perf_counter() - t0
+            with bloqueo:
+                resultados.append((clave, codigo, latencia, len(ctx.captured_queries)))
+            return codigo
+
+        def estudiante(token):
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+            try:
+                solicitud(client, 'get', '/api/estudiantes/mi-info/', 'mi-info')
+                solicitud(client, 'get', '/api/estudiantes/mis-inscripciones/', 'mis-inscripciones')
+                # Como en el día real, el estudiante reintenta en otra sección si la suya se llenó.
+                for seccion_id in random.sample(secciones, min(3, len(secciones))):
+                    if solicitud(client, 'post', f'/api/secciones/{seccion_id}/inscribirme/', 'inscribirme') in (200, 202):
+                        break
+            finally:
+                connections.close_all()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            list(pool.map(estudiante, tokens))
+        return resultados, time.perf_counter() - inicio
+
+    def reportar(self, resultados, duracion):
+        def percentil(valores, p):
+            indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+            return valores[indice] * 1000
+
+        total = len(resultados)
+        self.stdout.write(f"\nSolicitudes: {total} en {duracion:.2f} s ({total / duracion:.1f} req/s)\n")
+        self.stdout.write(f"{'Endpoint':<20}{'N':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                          f"{'4xx':>7}{'Errores':>9}{'Consultas':>11}{'Máx':>6}")
+        for clave in ('mi-info', 'mis-inscripciones', 'inscribirme'):
+            filas = [r for r in resultados if r[0] == clave]
+            if not filas:
+                continue
+            latencias = sorted(r[2] for r in filas)
+            rechazos = sum(1 for r in filas if r[1] is not None and 400 <= r[1] < 500)
+            errores = sum(1 for r in filas if r[1] is None or r[1] >= 500)
+            consultas = [r[3] for r in filas]
+            self.stdout.write(
+                f"{clave:<20}{len(filas):>7}{percentil(latencias, 50):>10.1f}{percentil(latencias, 95):>10.1f}"
+                f"{percentil(latencias, 99):>10.1f}{rechazos:>7}{errores:>9}"
+                f"{sum(consultas) / len(consultas):>11.1f}{max(consultas):>6}"
+            )
+
+        errores = sum(1 for r in resultados if r[1] is None or r[1] >= 500)
+        mensaje = f"\nTasa de error: {errores / total * 100:.2f}%" if total else "\nSin solicitudes."
+        self.stdout.write(self.style.SUCCESS(mensaje) if not errores else self.style.ERROR(mensaje))
+
+    def limpiar(self):
+        programas = Programa.objects.filter(nombre_programa=NOMBRE_PROGRAMA)
+        Inscripcion.objects.filter(estudiante__programa__in=programas).delete()
+        DetalleInscripcion.objects.filter(asignatura__programa__in=programas).delete()
+        User.objects.filter(estudiante__programa__in=programas).delete()
+        programas.delete()
+        PeriodoAcademico.objects.filter(nombre_periodo=PERIODO_CARGA).delete()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from gestion.models import PeriodoAcademico
+from gestion.calificaciones import recalcular_notas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula nota final y estatus de todas las asignaturas de un período con UPDATE masivos (sin señales)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            help='ID o nombre del período (default: período activo)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Mostrar los cambios sin guardarlos',
+        )
+
+    def handle(self, *args, **options):
+        periodo = self.obtener_periodo(options['periodo'])
+        cambios = recalcular_notas(periodo, simular=options['simular'])
+
+        for cambio in cambios:
+            nota_antes, nota_despues = cambio['nota_final']
+            estatus_antes, estatus_despues = cambio['estatus']
+            self.stdout.write(
+                f"{cambio['cedula']} {cambio['asignatura']}: "
+                f"{nota_antes} ({estatus_antes}) -> {nota_despues} ({estatus_despues})"
+            )
+
+        if options['simular']:
+            self.stdout.write(f"Simulación: {len(cambios)} registros cambiarían en {periodo}.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(cambios)} registros actualizados en {periodo}."))
+
+    def obtener_periodo(self, valor):
+        if not valor:
+            periodo = PeriodoAcademico.objects.filter(activo=True).first()
+            if not periodo:
+                raise CommandError('No hay período activo; indique --periodo.')
+            return periodo
+        filtro = {'pk': int(valor)} if valor.isdigit() else {'nombre_periodo': valor}
+        try:
+            return PeriodoAcademico.objects.get(**filtro)
+        except (PeriodoAcademico.DoesNotExist, PeriodoAcademico.MultipleObjectsReturned):
+            raise CommandError(f'No se encontró un único período para "{valor}".')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from gestion.estadisticas import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero la tabla de estadísticas por período y sección'
+
+    def handle(self, *args, **options):
+        filas = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas reconstruidas: {filas} filas (período, sección)."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from gestion.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el resumen académico (avance, UC, índice) de cada estudiante'
+
+    def handle(self, *args, **options):
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes reconstruidos: {total} estudiantes."))
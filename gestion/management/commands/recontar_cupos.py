@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from gestion.inscripciones import recontar_inscritos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el contador de inscritos de cada sección a partir de las inscripciones del período activo'
+
+    def handle(self, *args, **options):
+        total = recontar_inscritos()
+        self.stdout.write(self.style.SUCCESS(f"Contadores recalculados para {total} secciones."))
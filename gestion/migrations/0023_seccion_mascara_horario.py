@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+def calcular_mascaras(apps, schema_editor):
+    from gestion.horarios import mascara_de_horarios, a_texto
+    Seccion = apps.get_model('gestion', 'Seccion')
+    Horario = apps.get_model('gestion', 'Horario')
+
+    horarios_por_seccion = {}
+    for h in Horario.objects.all():
+        horarios_por_seccion.setdefault(h.seccion_id, []).append(h)
+
+    secciones = list(Seccion.objects.filter(pk__in=list(horarios_por_seccion)))
+    for seccion in secciones:
+        seccion.mascara_horario = a_texto(mascara_de_horarios(horarios_por_seccion[seccion.pk]))
+    Seccion.objects.bulk_update(secciones, ['mascara_horario'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0022_alter_programa_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seccion',
+            name='mascara_horario',
+            field=models.CharField(default='0', editable=False, help_text='Ocupación semanal precalculada (bits día x bloque, en hexadecimal).', max_length=25),
+        ),
+        migrations.RunPython(calcular_mascaras, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+def contar_inscritos(apps, schema_editor):
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    Seccion = apps.get_model('gestion', 'Seccion')
+    DetalleInscripcion = apps.get_model('gestion', 'DetalleInscripcion')
+
+    conteo = DetalleInscripcion.objects.filter(
+        seccion=OuterRef('pk'), inscripcion__periodo__activo=True
+    ).values('seccion').annotate(total=Count('id')).values('total')
+    Seccion.objects.update(inscritos=Coalesce(Subquery(conteo), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0023_seccion_mascara_horario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seccion',
+            name='cupo_maximo',
+            field=models.PositiveIntegerField(blank=True, help_text='Máximo de estudiantes por período. Vacío = sin límite.', null=True),
+        ),
+        migrations.AddField(
+            model_name='seccion',
+            name='inscritos',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Estudiantes inscritos en el período activo (contador mantenido).'),
+        ),
+        migrations.RunPython(contar_inscritos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0024_seccion_cupos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudInscripcion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('INSCRITA', 'Inscrita'), ('RECHAZADA', 'Rechazada')], default='PENDIENTE', max_length=20)),
+                ('mensaje', models.TextField(blank=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('procesada', models.DateTimeField(blank=True, null=True)),
+                ('detalle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='gestion.detalleinscripcion')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_inscripcion', to='gestion.estudiante')),
+                ('seccion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_inscripcion', to='gestion.seccion')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='gestion_sol_estado_8757eb_idx')],
+            },
+        ),
+    ]
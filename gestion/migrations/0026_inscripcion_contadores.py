@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+def contar_asignaturas(apps, schema_editor):
+    from django.db.models import Count, OuterRef, Q, Subquery
+    from django.db.models.functions import Coalesce
+    Inscripcion = apps.get_model('gestion', 'Inscripcion')
+    DetalleInscripcion = apps.get_model('gestion', 'DetalleInscripcion')
+
+    conteo = DetalleInscripcion.objects.filter(inscripcion=OuterRef('pk')).values('inscripcion').annotate(
+        total=Count('id'), calificadas=Count('id', filter=Q(nota_final__isnull=False))
+    )
+    Inscripcion.objects.update(
+        total_asignaturas=Coalesce(Subquery(conteo.values('total')), 0),
+        asignaturas_calificadas=Coalesce(Subquery(conteo.values('calificadas')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0025_solicitudinscripcion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inscripcion',
+            name='asignaturas_calificadas',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Asignaturas con nota final (contador mantenido).'),
+        ),
+        migrations.AddField(
+            model_name='inscripcion',
+            name='total_asignaturas',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Asignaturas inscritas (contador mantenido).'),
+        ),
+        migrations.RunPython(contar_asignaturas, migrations.RunPython.noop),
+    ]
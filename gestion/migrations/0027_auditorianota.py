@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0026_inscripcion_contadores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditoriaNota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(max_length=20)),
+                ('valor_anterior', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('valor_nuevo', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('origen', models.CharField(blank=True, help_text='Ruta de la solicitud o comando que hizo el cambio.', max_length=100)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('detalle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditoria', to='gestion.detalleinscripcion')),
+                ('estudiante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditoria_notas', to='gestion.estudiante')),
+                ('periodo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditoria_notas', to='gestion.periodoacademico')),
+                ('seccion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditoria_notas', to='gestion.seccion')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditoria_notas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['estudiante', 'fecha'], name='gestion_aud_estudia_69069b_idx'), models.Index(fields=['seccion', 'fecha'], name='gestion_aud_seccion_c2abc1_idx'), models.Index(fields=['periodo', 'fecha'], name='gestion_aud_periodo_c5a029_idx'), models.Index(fields=['fecha'], name='gestion_aud_fecha_3551e4_idx')],
+            },
+        ),
+    ]
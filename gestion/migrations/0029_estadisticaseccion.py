@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def calcular_estadisticas(apps, schema_editor):
+    from django.db.models import Count, Max, Min, Q, Sum
+    DetalleInscripcion = apps.get_model('gestion', 'DetalleInscripcion')
+    EstadisticaSeccion = apps.get_model('gestion', 'EstadisticaSeccion')
+
+    filas = DetalleInscripcion.objects.filter(seccion__isnull=False).values('inscripcion__periodo_id', 'seccion_id').annotate(
+        inscritos=Count('id'),
+        calificadas=Count('nota_final'),
+        aprobados=Count('id', filter=Q(nota_final__gte=10)),
+        suma_notas=Sum('nota_final'),
+        nota_maxima=Max('nota_final'),
+        nota_minima=Min('nota_final'),
+    ).order_by()
+    EstadisticaSeccion.objects.bulk_create([
+        EstadisticaSeccion(
+            periodo_id=fila['inscripcion__periodo_id'],
+            seccion_id=fila['seccion_id'],
+            inscritos=fila['inscritos'],
+            calificadas=fila['calificadas'],
+            aprobados=fila['aprobados'],
+            suma_notas=fila['suma_notas'] or 0,
+            nota_maxima=fila['nota_maxima'],
+            nota_minima=fila['nota_minima'],
+        )
+        for fila in filas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0028_correopendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaSeccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inscritos', models.PositiveIntegerField(default=0)),
+                ('calificadas', models.PositiveIntegerField(default=0)),
+                ('aprobados', models.PositiveIntegerField(default=0)),
+                ('suma_notas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('nota_maxima', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('nota_minima', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_secciones', to='gestion.periodoacademico')),
+                ('seccion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas', to='gestion.seccion')),
+            ],
+            options={
+                'unique_together': {('periodo', 'seccion')},
+            },
+        ),
+        migrations.RunPython(calcular_estadisticas, migrations.RunPython.noop),
+    ]
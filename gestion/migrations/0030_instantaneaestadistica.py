@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0029_estadisticaseccion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstantaneaEstadistica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.CharField(choices=[('SECCION', 'Sección'), ('ASIGNATURA', 'Asignatura'), ('SEMESTRE', 'Semestre'), ('PROGRAMA', 'Programa')], max_length=20)),
+                ('programa_nombre', models.CharField(blank=True, max_length=200)),
+                ('semestre', models.IntegerField(blank=True, null=True)),
+                ('asignatura_codigo', models.CharField(blank=True, max_length=20)),
+                ('asignatura_nombre', models.CharField(blank=True, max_length=200)),
+                ('orden', models.IntegerField(default=0)),
+                ('seccion_codigo', models.CharField(blank=True, max_length=10)),
+                ('docente_nombre', models.CharField(blank=True, max_length=300)),
+                ('inscritos', models.PositiveIntegerField(default=0)),
+                ('calificadas', models.PositiveIntegerField(default=0)),
+                ('aprobados', models.PositiveIntegerField(default=0)),
+                ('suma_notas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('nota_maxima', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('nota_minima', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('asignatura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion.asignatura')),
+                ('docente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='instantaneas', to='gestion.periodoacademico')),
+                ('programa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion.programa')),
+                ('seccion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion.seccion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'nivel'], name='gestion_ins_periodo_096f24_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def calcular_resumenes(apps, schema_editor):
+    from decimal import Decimal
+    from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+    Asignatura = apps.get_model('gestion', 'Asignatura')
+    DetalleInscripcion = apps.get_model('gestion', 'DetalleInscripcion')
+    Estudiante = apps.get_model('gestion', 'Estudiante')
+    PeriodoAcademico = apps.get_model('gestion', 'PeriodoAcademico')
+    ResumenEstudiante = apps.get_model('gestion', 'ResumenEstudiante')
+
+    periodo_activo = PeriodoAcademico.objects.filter(activo=True).order_by('pk').values_list('pk', flat=True).first()
+    aprobada = Q(nota_final__gte=10)
+    calificada = Q(nota_final__isnull=False)
+    notas = {
+        fila['inscripcion__estudiante_id']: fila
+        for fila in DetalleInscripcion.objects.values('inscripcion__estudiante_id').annotate(
+            aprobadas=Count('id', filter=aprobada),
+            uc_aprobadas=Sum('asignatura__creditos', filter=aprobada),
+            uc_calificadas=Sum('asignatura__creditos', filter=calificada),
+            suma_ponderada=Sum(ExpressionWrapper(
+                F('nota_final') * F('asignatura__creditos'), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ), filter=calificada),
+            uc_periodo_actual=Sum('asignatura__creditos', filter=Q(inscripcion__periodo_id=periodo_activo)),
+        ).order_by()
+    }
+    totales = dict(Asignatura.objects.values('programa_id').annotate(total=Count('id')).order_by().values_list('programa_id', 'total'))
+
+    resumenes = []
+    for estudiante_id, programa_id in Estudiante.objects.values_list('pk', 'programa_id'):
+        fila = notas.get(estudiante_id, {})
+        total = totales.get(programa_id, 0)
+        aprobadas = fila.get('aprobadas', 0)
+        uc_calificadas = fila.get('uc_calificadas') or 0
+        resumenes.append(ResumenEstudiante(
+            estudiante_id=estudiante_id,
+            avance=round((aprobadas / total) * 100, 2) if total else 0,
+            aprobadas=aprobadas,
+            total_asignaturas=total,
+            uc_aprobadas=fila.get('uc_aprobadas') or 0,
+            uc_periodo_actual=fila.get('uc_periodo_actual') or 0,
+            indice=(Decimal(fila['suma_ponderada']) / uc_calificadas).quantize(Decimal('0.01')) if uc_calificadas else None,
+        ))
+    ResumenEstudiante.objects.bulk_create(resumenes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0030_instantaneaestadistica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEstudiante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('avance', models.FloatField(default=0, help_text='Porcentaje de asignaturas del programa aprobadas.')),
+                ('aprobadas', models.PositiveIntegerField(default=0)),
+                ('total_asignaturas', models.PositiveIntegerField(default=0)),
+                ('uc_aprobadas', models.PositiveIntegerField(default=0)),
+                ('uc_periodo_actual', models.PositiveIntegerField(default=0)),
+                ('indice', models.DecimalField(blank=True, decimal_places=2, help_text='Promedio de notas finales ponderado por las UC de cada asignatura.', max_digits=4, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='gestion.estudiante')),
+            ],
+        ),
+        migrations.RunPython(calcular_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0031_resumenestudiante'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaTemprana',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RIESGO', 'Riesgo de reprobar'), ('REPROBADO', 'Reprobado')], max_length=20)),
+                ('promedio', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('nota_necesaria', models.DecimalField(blank=True, decimal_places=2, help_text='Puntos que necesita en la evaluación restante para aprobar (solo en riesgo).', max_digits=5, null=True)),
+                ('detectada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actualizada', models.DateTimeField(auto_now=True)),
+                ('detalle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='alerta', to='gestion.detalleinscripcion')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='gestion.estudiante')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='gestion.periodoacademico')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'tipo'], name='gestion_ale_periodo_265d05_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+def recalcular_mascaras(apps, schema_editor):
+    # Con los bloques fuera de grilla cambian las posiciones de bit de cada día.
+    from gestion.horarios import mascara_de_horarios, a_texto
+    Seccion = apps.get_model('gestion', 'Seccion')
+    Horario = apps.get_model('gestion', 'Horario')
+
+    horarios_por_seccion = {}
+    for h in Horario.objects.all():
+        horarios_por_seccion.setdefault(h.seccion_id, []).append(h)
+
+    secciones = list(Seccion.objects.filter(pk__in=list(horarios_por_seccion)))
+    for seccion in secciones:
+        seccion.mascara_horario = a_texto(mascara_de_horarios(horarios_por_seccion[seccion.pk]))
+    Seccion.objects.bulk_update(secciones, ['mascara_horario'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0032_alertatemprana'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='seccion',
+            name='mascara_horario',
+            field=models.CharField(default='0', editable=False, help_text='Ocupación semanal precalculada (bits día x bloque, en hexadecimal).', max_length=64),
+        ),
+        migrations.RunPython(recalcular_mascaras, migrations.RunPython.noop),
+    ]
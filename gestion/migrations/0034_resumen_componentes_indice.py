@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+def calcular_componentes(apps, schema_editor):
+    from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
+    DetalleInscripcion = apps.get_model('gestion', 'DetalleInscripcion')
+    ResumenEstudiante = apps.get_model('gestion', 'ResumenEstudiante')
+
+    calificada = Q(nota_final__isnull=False)
+    componentes = {
+        fila['inscripcion__estudiante_id']: fila
+        for fila in DetalleInscripcion.objects.values('inscripcion__estudiante_id').annotate(
+            uc_calificadas=Sum('asignatura__creditos', filter=calificada),
+            suma_ponderada=Sum(ExpressionWrapper(
+                F('nota_final') * F('asignatura__creditos'), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ), filter=calificada),
+        ).order_by()
+    }
+    resumenes = list(ResumenEstudiante.objects.filter(estudiante_id__in=list(componentes)))
+    for resumen in resumenes:
+        fila = componentes[resumen.estudiante_id]
+        resumen.uc_calificadas = fila['uc_calificadas'] or 0
+        resumen.suma_ponderada = fila['suma_ponderada'] or 0
+    ResumenEstudiante.objects.bulk_update(resumenes, ['uc_calificadas', 'suma_ponderada'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0033_mascara_horario_todo_el_dia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumenestudiante',
+            name='suma_ponderada',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='resumenestudiante',
+            name='uc_calificadas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_componentes, migrations.RunPython.noop),
+    ]
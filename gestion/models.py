@@ -3,6 +3,7 @@ Modelos de datos para la aplicación de gestión académica SISMEPA.
 """
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class PeriodoAcademico(models.Model):
@@ -14,9 +15,35 @@ class PeriodoAcademico(models.Model):
     inscripciones_activas = models.BooleanField(default=False, help_text="Indica si las inscripciones están abiertas para este período")
     anio = models.IntegerField(default=2025)
 
+    # Valor de 'activo' guardado en la base de datos (None si se desconoce): las
+    # señales solo reconstruyen lo que depende del período activo si cambia.
+    activo_original = None
+
     def __str__(self):
         return self.nombre_periodo
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.activo_original = instance.__dict__.get('activo')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'activo' in fields:
+            self.activo_original = self.activo
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is None or 'activo' in kwargs['update_fields']:
+            self.activo_original = self.activo
+
+    def calificaciones_pendientes(self):
+        """Asignaturas inscritas en el período que aún no tienen nota final (según los contadores de Inscripcion)."""
+        from django.db.models import Sum
+        totales = self.inscripcion_set.aggregate(total=Sum('total_asignaturas'), calificadas=Sum('asignaturas_calificadas'))
+        return (totales['total'] or 0) - (totales['calificadas'] or 0)
+
 
 class Programa(models.Model):
     """Representa un programa académico (carrera universitaria)."""
@@ -54,6 +81,12 @@ class Seccion(models.Model):
     asignatura = models.ForeignKey(Asignatura, on_delete=models.CASCADE, related_name='secciones')
     codigo_seccion = models.CharField(max_length=10)  # ej., D1, D2...
     docente = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='secciones_asignadas')
+    mascara_horario = models.CharField(max_length=64, default='0', editable=False,
+        help_text="Ocupación semanal precalculada (bits día x bloque, en hexadecimal).")
+    cupo_maximo = models.PositiveIntegerField(null=True, blank=True,
+        help_text="Máximo de estudiantes por período. Vacío = sin límite.")
+    inscritos = models.PositiveIntegerField(default=0, editable=False,
+        help_text="Estudiantes inscritos en el período activo (contador mantenido).")
 
     class Meta:
         unique_together = ('asignatura', 'codigo_seccion')
@@ -62,6 +95,63 @@ class Seccion(models.Model):
         docente_name = self.docente.get_full_name() if self.docente else "Sin asignar"
         return f"{self.asignatura.nombre_asignatura} - {self.codigo_seccion} ({docente_name})"
 
+    @property
+    def mascara(self):
+        """Máscara de ocupación como entero."""
+        from gestion.horarios import desde_texto
+        return desde_texto(self.mascara_horario)
+
+    def actualizar_mascara_horario(self):
+        """Recalcula la máscara a partir de los horarios guardados de la sección."""
+        from gestion.horarios import mascara_de_horarios, a_texto
+        self.mascara_horario = a_texto(mascara_de_horarios(Horario.objects.filter(seccion_id=self.pk)))
+        Seccion.objects.filter(pk=self.pk).update(mascara_horario=self.mascara_horario)
+        return self.mascara
+
+    def ocupar_cupo(self):
+        """
+        Reserva un cupo con un UPDATE condicional sobre la fila de la sección.
+        Retorna False si la sección ya está llena.
+        """
+        from django.db.models import F, Q
+        actualizadas = Seccion.objects.filter(pk=self.pk).filter(
+            Q(cupo_maximo__isnull=True) | Q(inscritos__lt=F('cupo_maximo'))
+        ).update(inscritos=F('inscritos') + 1)
+        return actualizadas == 1
+
+    def liberar_cupo(self):
+        """Devuelve un cupo ocupado."""
+        from django.db.models import F
+        Seccion.objects.filter(pk=self.pk, inscritos__gt=0).update(inscritos=F('inscritos') - 1)
+
+
+class EstudianteQuerySet(models.QuerySet):
+    def con_avance(self):
+        """
+        Anota aprobadas, total_asignaturas y avance (%) con subconsultas en el mismo
+        SELECT; mismo cálculo que calcular_avance() sin consultas por estudiante.
+        """
+        from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Value, When
+        from django.db.models.functions import Cast, Coalesce, Round
+
+        aprobadas = DetalleInscripcion.objects.filter(
+            inscripcion__estudiante=OuterRef('pk'), nota_final__gte=10
+        ).order_by().values('inscripcion__estudiante').annotate(n=Count('id')).values('n')
+        total = Asignatura.objects.filter(
+            programa=OuterRef('programa')
+        ).order_by().values('programa').annotate(n=Count('id')).values('n')
+
+        return self.annotate(
+            aprobadas=Coalesce(Subquery(aprobadas), 0),
+            total_asignaturas=Coalesce(Subquery(total), 0),
+        ).annotate(
+            avance=Case(
+                When(total_asignaturas=0, then=Value(0.0)),
+                default=Round(Cast(F('aprobadas'), FloatField()) * 100 / F('total_asignaturas'), 2),
+                output_field=FloatField(),
+            )
+        )
+
 
 class Estudiante(models.Model):
     """Representa un estudiante inscrito en un programa académico."""
@@ -72,6 +162,8 @@ class Estudiante(models.Model):
     fecha_ingreso = models.DateField(auto_now_add=True)
     fecha_ingreso = models.DateField(auto_now_add=True)
 
+    objects = EstudianteQuerySet.as_manager()
+
     def __str__(self):
         name = self.usuario.get_full_name()
         return f"{name} ({self.cedula})" if name else f"{self.usuario.username} - {self.cedula}"
@@ -146,6 +238,40 @@ class Inscripcion(models.Model):
     estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE)
     periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE)
     fecha_inscripcion = models.DateTimeField(auto_now_add=True)
+    total_asignaturas = models.PositiveIntegerField(default=0, editable=False,
+        help_text="Asignaturas inscritas (contador mantenido).")
+    asignaturas_calificadas = models.PositiveIntegerField(default=0, editable=False,
+        help_text="Asignaturas con nota final (contador mantenido).")
+
+    @property
+    def calificaciones_completas(self):
+        return self.total_asignaturas > 0 and self.asignaturas_calificadas >= self.total_asignaturas
+
+    def ajustar_contadores(self, total=0, calificadas=0):
+        """Suma los incrementos indicados a los contadores con un UPDATE atómico."""
+        from django.db.models import F
+        cambios = {}
+        if total:
+            cambios['total_asignaturas'] = F('total_asignaturas') + total
+        if calificadas:
+            cambios['asignaturas_calificadas'] = F('asignaturas_calificadas') + calificadas
+        if cambios:
+            Inscripcion.objects.filter(pk=self.pk).update(**cambios)
+
+    @staticmethod
+    def recontar_contadores(inscripciones=None):
+        """Recalcula los contadores desde los detalles con un solo UPDATE."""
+        from django.db.models import Count, OuterRef, Q, Subquery
+        from django.db.models.functions import Coalesce
+        conteo = DetalleInscripcion.objects.filter(inscripcion=OuterRef('pk')).values('inscripcion').annotate(
+            total=Count('id'), calificadas=Count('id', filter=Q(nota_final__isnull=False))
+        )
+        if inscripciones is None:
+            inscripciones = Inscripcion.objects.all()
+        return inscripciones.update(
+            total_asignaturas=Coalesce(Subquery(conteo.values('total')), 0),
+            asignaturas_calificadas=Coalesce(Subquery(conteo.values('calificadas')), 0),
+        )
 
 
 class DetalleInscripcion(models.Model):
@@ -184,40 +310,98 @@ class DetalleInscripcion(models.Model):
             self.estatus = 'APROBADO' if self.nota_final >= 10 else 'REPROBADO'
         return self.nota_final
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_valores_originales()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # refresh_from_db no pasa por from_db en esta instancia: se rehace la foto
+        # de los campos recargados para que campos_modificados() no compare con valores viejos.
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or not hasattr(self, '_valores_originales'):
+            self._guardar_valores_originales()
+        else:
+            self._guardar_valores_originales(fields)
+
+    def _guardar_valores_originales(self, campos=None):
+        """Toma una foto de los valores cargados para detectar cambios sin releer la fila."""
+        cargados = self.__dict__
+        valores = {
+            f.attname: cargados[f.attname] for f in self._meta.concrete_fields
+            if f.attname in cargados and (campos is None or f.name in campos or f.attname in campos)
+        }
+        if campos is None:
+            self._valores_originales = valores
+        else:
+            self._valores_originales.update(valores)
+
+    def valor_original(self, campo):
+        """Valor del campo al cargarse desde la base de datos (None si la instancia es nueva)."""
+        return getattr(self, '_valores_originales', {}).get(campo)
+
+    def tiene_valores_originales(self, *campos):
+        """Indica si la foto de valores originales incluye los campos (attname) indicados."""
+        return set(campos) <= getattr(self, '_valores_originales', {}).keys()
+
+    def campos_modificados(self):
+        """Campos (attname) cuyo valor cambió desde que se cargó la instancia."""
+        originales = getattr(self, '_valores_originales', {})
+        cargados = self.__dict__
+        return [
+            f.attname for f in self._meta.concrete_fields
+            if not f.primary_key and f.attname in cargados
+            and (f.attname not in originales or originales[f.attname] != cargados[f.attname])
+        ]
+
     def save(self, *args, **kwargs):
         from gestion.notifications import notify_student_repair_grade, notify_student_period_completion
-        
-        old_instance = None
-        if self.pk:
-            try:
-                old_instance = DetalleInscripcion.objects.get(pk=self.pk)
-            except DetalleInscripcion.DoesNotExist:
-                pass
+
+        es_nuevo = self._state.adding
+        reparacion_anterior = self.valor_original('nota_reparacion')
+        final_anterior = self.valor_original('nota_final')
 
         if any([self.nota1, self.nota2, self.nota3, self.nota4, self.nota_reparacion]):
             self.calcular_nota_final()
 
+        # Una instancia cargada desde la base de datos solo escribe las columnas modificadas.
+        if not es_nuevo and hasattr(self, '_valores_originales') and 'update_fields' not in kwargs and not args:
+            kwargs['update_fields'] = self.campos_modificados()
+
         super().save(*args, **kwargs)
 
-        
+        inscripcion_anterior = self.valor_original('inscripcion_id')
+        if not es_nuevo and inscripcion_anterior != self.inscripcion_id:
+            Inscripcion(pk=inscripcion_anterior).ajustar_contadores(total=-1, calificadas=-(final_anterior is not None))
+            es_nuevo_en_inscripcion, calificada_antes = True, False
+        else:
+            es_nuevo_en_inscripcion, calificada_antes = es_nuevo, final_anterior is not None
+        Inscripcion(pk=self.inscripcion_id).ajustar_contadores(
+            total=int(es_nuevo_en_inscripcion),
+            calificadas=int(self.nota_final is not None) - int(calificada_antes),
+        )
+
+        if es_nuevo or kwargs.get('update_fields') is None:
+            self._guardar_valores_originales()
+        else:
+            self._guardar_valores_originales(kwargs['update_fields'])
+
         if self.nota_reparacion is not None:
-            is_new_repair = old_instance is None or old_instance.nota_reparacion is None
+            is_new_repair = es_nuevo or reparacion_anterior is None
             if is_new_repair:
                 notify_student_repair_grade(self.inscripcion.estudiante, self.asignatura, self.nota_reparacion)
 
-        has_grade = self.nota_final is not None
-        
-        if has_grade:
-            all_details = self.inscripcion.detalles.all()
-            pending_grades = all_details.filter(nota_final__isnull=True).exists()
-            
-            if not pending_grades:
-                
-                was_incomplete = old_instance is None or old_instance.nota_final is None
-                
-                
-                if was_incomplete: 
-                     notify_student_period_completion(self.inscripcion.estudiante, self.inscripcion.periodo, all_details)
+        was_incomplete = es_nuevo or final_anterior is None
+
+        if self.nota_final is not None and was_incomplete:
+            total, calificadas = Inscripcion.objects.filter(pk=self.inscripcion_id).values_list(
+                'total_asignaturas', 'asignaturas_calificadas'
+            ).get()
+
+            if calificadas >= total:
+                all_details = self.inscripcion.detalles.select_related('asignatura')
+                notify_student_period_completion(self.inscripcion.estudiante, self.inscripcion.periodo, all_details)
 
 
 class DocumentoCalificaciones(models.Model):
@@ -276,3 +460,198 @@ class Horario(models.Model):
 
     def __str__(self):
         return f"{self.get_dia_display()} {self.hora_inicio}-{self.hora_fin} ({self.aula})"
+
+
+class SolicitudInscripcion(models.Model):
+    """Solicitud de inscripción encolada para procesarse de forma asíncrona (modo cola)."""
+    PENDIENTE = 'PENDIENTE'
+    INSCRITA = 'INSCRITA'
+    RECHAZADA = 'RECHAZADA'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (INSCRITA, 'Inscrita'),
+        (RECHAZADA, 'Rechazada'),
+    ]
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='solicitudes_inscripcion')
+    seccion = models.ForeignKey(Seccion, on_delete=models.CASCADE, related_name='solicitudes_inscripcion')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    mensaje = models.TextField(blank=True)
+    detalle = models.ForeignKey(DetalleInscripcion, on_delete=models.SET_NULL, null=True, blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    procesada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['estado', 'id'])]
+
+    def __str__(self):
+        return f"{self.estudiante} -> {self.seccion_id} ({self.estado})"
+
+
+class AuditoriaNota(models.Model):
+    """Registro de solo inserción de cada cambio de nota (quién, qué campo, valor anterior y nuevo)."""
+    detalle = models.ForeignKey(DetalleInscripcion, on_delete=models.SET_NULL, null=True, blank=True, related_name='auditoria')
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.SET_NULL, null=True, blank=True, related_name='auditoria_notas')
+    seccion = models.ForeignKey(Seccion, on_delete=models.SET_NULL, null=True, blank=True, related_name='auditoria_notas')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.SET_NULL, null=True, blank=True, related_name='auditoria_notas')
+    campo = models.CharField(max_length=20)
+    valor_anterior = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    valor_nuevo = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='auditoria_notas')
+    origen = models.CharField(max_length=100, blank=True, help_text="Ruta de la solicitud o comando que hizo el cambio.")
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['estudiante', 'fecha']),
+            models.Index(fields=['seccion', 'fecha']),
+            models.Index(fields=['periodo', 'fecha']),
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.detalle_id} {self.campo}: {self.valor_anterior} -> {self.valor_nuevo}"
+
+
+class CorreoPendiente(models.Model):
+    """Correo en la bandeja de salida; se guarda en la misma transacción que el cambio que lo origina."""
+    PENDIENTE = 'PENDIENTE'
+    ENVIADO = 'ENVIADO'
+    FALLIDO = 'FALLIDO'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (ENVIADO, 'Enviado'),
+        (FALLIDO, 'Fallido'),
+    ]
+    destinatarios = models.TextField(help_text="Direcciones separadas por coma.")
+    asunto = models.CharField(max_length=255)
+    mensaje = models.TextField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['estado', 'proximo_intento'])]
+
+    def __str__(self):
+        return f"{self.asunto} -> {self.destinatarios} ({self.estado})"
+
+
+class EstadisticaSeccion(models.Model):
+    """
+    Estadísticas de nota final por (período, sección), mantenidas por gestion.estadisticas.
+    Los dashboards leen estas filas en lugar de agregar DetalleInscripcion en cada solicitud.
+    """
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='estadisticas_secciones')
+    seccion = models.ForeignKey(Seccion, on_delete=models.CASCADE, related_name='estadisticas')
+    inscritos = models.PositiveIntegerField(default=0)
+    calificadas = models.PositiveIntegerField(default=0)
+    aprobados = models.PositiveIntegerField(default=0)
+    suma_notas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    nota_maxima = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    nota_minima = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('periodo', 'seccion')
+
+    def __str__(self):
+        return f"{self.seccion_id} ({self.periodo_id}): {self.inscritos} inscritos"
+
+
+class InstantaneaEstadistica(models.Model):
+    """
+    Agregados de notas congelados al cerrar un período, por sección, asignatura,
+    semestre y programa. Guarda los nombres para sobrevivir a cambios posteriores del pensum.
+    """
+    SECCION = 'SECCION'
+    ASIGNATURA = 'ASIGNATURA'
+    SEMESTRE = 'SEMESTRE'
+    PROGRAMA = 'PROGRAMA'
+    NIVEL_CHOICES = [
+        (SECCION, 'Sección'),
+        (ASIGNATURA, 'Asignatura'),
+        (SEMESTRE, 'Semestre'),
+        (PROGRAMA, 'Programa'),
+    ]
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='instantaneas')
+    nivel = models.CharField(max_length=20, choices=NIVEL_CHOICES)
+    programa = models.ForeignKey(Programa, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    programa_nombre = models.CharField(max_length=200, blank=True)
+    semestre = models.IntegerField(null=True, blank=True)
+    asignatura = models.ForeignKey(Asignatura, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    asignatura_codigo = models.CharField(max_length=20, blank=True)
+    asignatura_nombre = models.CharField(max_length=200, blank=True)
+    orden = models.IntegerField(default=0)
+    seccion = models.ForeignKey(Seccion, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    seccion_codigo = models.CharField(max_length=10, blank=True)
+    docente = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    docente_nombre = models.CharField(max_length=300, blank=True)
+    inscritos = models.PositiveIntegerField(default=0)
+    calificadas = models.PositiveIntegerField(default=0)
+    aprobados = models.PositiveIntegerField(default=0)
+    suma_notas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    nota_maxima = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    nota_minima = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['periodo', 'nivel'])]
+
+    def __str__(self):
+        return f"{self.periodo_id} {self.nivel}: {self.inscritos} inscritos"
+
+
+class ResumenEstudiante(models.Model):
+    """
+    Resumen académico del estudiante mantenido por gestion.resumenes: avance,
+    asignaturas y UC aprobadas, UC del período activo e índice ponderado por créditos.
+    """
+    estudiante = models.OneToOneField(Estudiante, on_delete=models.CASCADE, related_name='resumen')
+    avance = models.FloatField(default=0, help_text="Porcentaje de asignaturas del programa aprobadas.")
+    aprobadas = models.PositiveIntegerField(default=0)
+    total_asignaturas = models.PositiveIntegerField(default=0)
+    uc_aprobadas = models.PositiveIntegerField(default=0)
+    uc_periodo_actual = models.PositiveIntegerField(default=0)
+    indice = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True,
+        help_text="Promedio de notas finales ponderado por las UC de cada asignatura.")
+    # Componentes del índice, para ajustarlo sin recalcular el resumen completo.
+    suma_ponderada = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    uc_calificadas = models.PositiveIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.estudiante_id}: {self.avance}%"
+
+
+class AlertaTemprana(models.Model):
+    """
+    Asignatura del período en riesgo de reprobación o ya reprobada, según el último
+    escaneo de gestion.alertas. Se notifica solo al aparecer o cambiar de tipo.
+    """
+    RIESGO = 'RIESGO'
+    REPROBADO = 'REPROBADO'
+    TIPO_CHOICES = [
+        (RIESGO, 'Riesgo de reprobar'),
+        (REPROBADO, 'Reprobado'),
+    ]
+    detalle = models.OneToOneField(DetalleInscripcion, on_delete=models.CASCADE, related_name='alerta')
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='alertas')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='alertas')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    promedio = models.DecimalField(max_digits=4, decimal_places=2)
+    nota_necesaria = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True,
+        help_text="Puntos que necesita en la evaluación restante para aprobar (solo en riesgo).")
+    detectada = models.DateTimeField(default=timezone.now)
+    actualizada = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['periodo', 'tipo'])]
+
+    def __str__(self):
+        return f"{self.estudiante_id} {self.tipo}: {self.detalle_id}"
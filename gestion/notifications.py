@@ -8,10 +8,21 @@ logger = logging.getLogger(__name__)
 def send_notification_email(subject, message, recipient_list):
     """
     Función utilitaria para enviar correos usando la configuración de Django.
+    Con CORREOS_EN_COLA el correo se guarda en la bandeja de salida dentro de la
+    transacción actual y lo envía el worker (ver gestion.correos).
     """
     if not isinstance(recipient_list, list):
         recipient_list = [recipient_list]
-    
+
+    if settings.CORREOS_EN_COLA:
+        from gestion.correos import encolar
+        try:
+            encolar(subject, message, recipient_list)
+            return True
+        except Exception as e:
+            logger.error(f"Error encolando correo a {recipient_list}: {e}")
+            return False
+
     try:
         send_mail(
             subject=subject,
@@ -0,0 +1,133 @@
+"""
+Grafo de prelaciones precalculado por programa.
+
+Las asignaturas de un programa se indexan con enteros consecutivos y las
+prelaciones se guardan como arreglos compactos de índices (directas e
+inversas), más la clausura transitiva en forma de conjunto de bits y un
+orden topológico. Cada proceso construye el grafo una sola vez y lo reutiliza
+mientras no cambie la versión 'prelaciones:<programa>' (ver gestion/cache.py),
+que se incrementa al modificar asignaturas o prelaciones.
+"""
+from array import array
+
+from gestion.cache import version
+from gestion.models import Asignatura
+
+_grafos = {}
+
+
+def alcance(programa_id):
+    return f'prelaciones:{programa_id}'
+
+
+class GrafoPrelaciones:
+    """Prelaciones directas, transitivas e inversas de las asignaturas de un programa."""
+
+    def __init__(self, programa_id, version, asignaturas, aristas):
+        self.programa_id = programa_id
+        self.version = version
+
+        self.ids = array('q', [a[0] for a in asignaturas])
+        self.indice = {asignatura_id: i for i, asignatura_id in enumerate(self.ids)}
+        self.codigos = [a[1] for a in asignaturas]
+        self.nombres = [a[2] for a in asignaturas]
+
+        directas = [[] for _ in self.ids]
+        inversas = [[] for _ in self.ids]
+        for asignatura_id, prereq_id in aristas:
+            i, j = self.indice.get(asignatura_id), self.indice.get(prereq_id)
+            if i is None or j is None:
+                continue
+            directas[i].append(j)
+            inversas[j].append(i)
+        self.directas = [array('I', sorted(d)) for d in directas]
+        self.inversas = [array('I', sorted(d)) for d in inversas]
+
+        self.orden_topologico = self._ordenar()
+        self.transitivas = self._clausura()
+
+    def _ordenar(self):
+        """Orden topológico (prelaciones antes que las asignaturas que desbloquean)."""
+        pendientes = array('I', (len(d) for d in self.directas))
+        cola = [i for i, n in enumerate(pendientes) if n == 0]
+        orden = array('I')
+        while cola:
+            i = cola.pop(0)
+            orden.append(i)
+            for k in self.inversas[i]:
+                pendientes[k] -= 1
+                if pendientes[k] == 0:
+                    cola.append(k)
+        # Las asignaturas atrapadas en un ciclo (dato inválido) se agregan al final.
+        if len(orden) < len(self.ids):
+            vistos = set(orden)
+            orden.extend(i for i in range(len(self.ids)) if i not in vistos)
+        return orden
+
+    def _clausura(self):
+        transitivas = [0] * len(self.ids)
+        for i in self.orden_topologico:
+            bits = 0
+            for j in self.directas[i]:
+                bits |= (1 << j) | transitivas[j]
+            transitivas[i] = bits
+        return transitivas
+
+    def _ids_de_bits(self, bits):
+        resultado = []
+        j = 0
+        while bits:
+            if bits & 1:
+                resultado.append(self.ids[j])
+            bits >>= 1
+            j += 1
+        return resultado
+
+    def info(self, asignatura_id):
+        i = self.indice[asignatura_id]
+        return {'id': asignatura_id, 'codigo': self.codigos[i], 'nombre': self.nombres[i]}
+
+    def prelaciones(self, asignatura_id):
+        """Ids de las prelaciones directas."""
+        i = self.indice.get(asignatura_id)
+        return [] if i is None else [self.ids[j] for j in self.directas[i]]
+
+    def prelaciones_transitivas(self, asignatura_id):
+        """Ids de todas las asignaturas que deben aprobarse antes (directa o indirectamente)."""
+        i = self.indice.get(asignatura_id)
+        return [] if i is None else self._ids_de_bits(self.transitivas[i])
+
+    def desbloquea(self, asignatura_id):
+        """Ids de las asignaturas que tienen a esta como prelación directa."""
+        i = self.indice.get(asignatura_id)
+        return [] if i is None else [self.ids[k] for k in self.inversas[i]]
+
+    def faltantes(self, asignatura_id, aprobadas):
+        """Prelaciones directas que no están en el conjunto de asignaturas aprobadas."""
+        return [pk for pk in self.prelaciones(asignatura_id) if pk not in aprobadas]
+
+    def topologico(self):
+        """Ids de las asignaturas en orden topológico."""
+        return [self.ids[i] for i in self.orden_topologico]
+
+
+def construir_grafo(programa_id, version_actual=None):
+    asignaturas = list(
+        Asignatura.objects.filter(programa_id=programa_id).order_by('semestre', 'orden', 'pk').values_list(
+            'pk', 'codigo', 'nombre_asignatura'
+        )
+    )
+    aristas = Asignatura.prelaciones.through.objects.filter(
+        from_asignatura__programa_id=programa_id
+    ).values_list('from_asignatura_id', 'to_asignatura_id')
+    return GrafoPrelaciones(programa_id, version_actual, asignaturas, aristas)
+
+
+def obtener_grafo(programa_id):
+    """Grafo del programa, reconstruido solo si cambió su versión."""
+    version_actual = version(alcance(programa_id))
+    grafo = _grafos.get(programa_id)
+    if grafo is None or grafo.version != version_actual:
+        grafo = construir_grafo(programa_id, version_actual)
+        _grafos[programa_id] = grafo
+    return grafo
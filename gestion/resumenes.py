@@ -0,0 +1,229 @@
+"""
+Resumen académico precalculado por estudiante (ResumenEstudiante).
+
+Los cambios de inscripción marcan al estudiante; al confirmar la transacción
+se recalculan solo los resúmenes marcados, con consultas agrupadas que no
+dependen de cuántos estudiantes haya. Un cambio de nota_final en la misma
+inscripción y asignatura ajusta el resumen con un solo UPDATE a partir de la
+nota anterior y la nueva. Cambios que afectan a todos (activar o cerrar un
+período) marcan la tabla completa. `manage.py reconstruir_resumenes`
+la rehace desde cero.
+"""
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, FloatField, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, NullIf, Round
+from django.utils import timezone
+
+from gestion.cache import incrementar
+from gestion.models import Asignatura, DetalleInscripcion, Estudiante, PeriodoAcademico, ResumenEstudiante
+
+# Alcance de caché (gestion.cache) que cambia al reconstruir todos los resúmenes;
+# las actualizaciones puntuales incrementan 'estudiante:<pk>'.
+ALCANCE = 'resumenes'
+
+# Campos de DetalleInscripcion que afectan el resumen.
+CAMPOS_RELEVANTES = {'nota_final', 'asignatura', 'asignatura_id', 'inscripcion', 'inscripcion_id'}
+
+CAMPOS_RESUMEN = [
+    'avance', 'aprobadas', 'total_asignaturas', 'uc_aprobadas', 'uc_periodo_actual', 'indice',
+    'suma_ponderada', 'uc_calificadas', 'actualizado',
+]
+
+NOTA_APROBATORIA = 10
+
+_local = threading.local()
+
+
+def marcar(*estudiante_ids):
+    """Programa el recálculo de los estudiantes indicados para cuando se confirme la transacción."""
+    ids = {pk for pk in estudiante_ids if pk is not None}
+    if not ids:
+        return
+    if not hasattr(_local, 'estudiantes'):
+        _local.estudiantes = set()
+    _local.estudiantes.update(ids)
+    transaction.on_commit(_vaciar)
+
+
+def marcar_todos():
+    """Programa la reconstrucción completa (p. ej. al cambiar el período activo)."""
+    _local.todos = True
+    transaction.on_commit(_vaciar)
+
+
+def _vaciar():
+    pendientes = getattr(_local, 'estudiantes', set())
+    if getattr(_local, 'todos', False):
+        _local.todos = False
+        pendientes.clear()
+        reconstruir()
+        return
+    if not pendientes:
+        return
+    ids = set(pendientes)
+    pendientes.clear()
+    actualizar(ids)
+    incrementar(*(f'estudiante:{pk}' for pk in ids))
+
+
+def _secuencia():
+    """Número creciente por hilo: ordena los ajustes pendientes respecto de los recálculos."""
+    _local.secuencia = getattr(_local, 'secuencia', 0) + 1
+    return _local.secuencia
+
+
+def ajustar(estudiante_id, asignatura_id, anterior, nueva):
+    """
+    Programa, para cuando se confirme la transacción, el ajuste del resumen por un
+    cambio de nota_final (anterior -> nueva) de un detalle que no cambió de
+    inscripción ni de asignatura.
+    """
+    if estudiante_id is None or anterior == nueva:
+        return
+    secuencia = _secuencia()
+    transaction.on_commit(lambda: _aplicar_ajuste(secuencia, estudiante_id, asignatura_id, anterior, nueva))
+
+
+def _aplicar_ajuste(secuencia, estudiante_id, asignatura_id, anterior, nueva):
+    recalculado = max(getattr(_local, 'recalculados', {}).get(estudiante_id, 0), getattr(_local, 'reconstruido', 0))
+    if recalculado > secuencia:
+        return  # El resumen se recalculó después del cambio y ya lo incluye.
+
+    def aprobada(valor):
+        return int(valor is not None and valor >= NOTA_APROBATORIA)
+
+    creditos = Subquery(Asignatura.objects.filter(pk=asignatura_id).values('creditos'))
+    aprobadas = aprobada(nueva) - aprobada(anterior)
+    calificadas = int(nueva is not None) - int(anterior is not None)
+    suma_ponderada = ExpressionWrapper(
+        F('suma_ponderada') + Value(Decimal(str((nueva or 0) - (anterior or 0)))) * creditos,
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    uc_calificadas = F('uc_calificadas') + calificadas * creditos
+
+    # Mismas fórmulas que _calcular, evaluadas con los valores de la fila antes del cambio.
+    actualizados = ResumenEstudiante.objects.filter(estudiante_id=estudiante_id).update(
+        avance=Case(
+            When(total_asignaturas=0, then=Value(0.0)),
+            default=Round(Cast(F('aprobadas') + aprobadas, FloatField()) * 100 / F('total_asignaturas'), 2),
+            output_field=FloatField(),
+        ),
+        indice=Round(Cast(suma_ponderada, FloatField()) / NullIf(uc_calificadas, 0), 2),
+        aprobadas=F('aprobadas') + aprobadas,
+        uc_aprobadas=F('uc_aprobadas') + aprobadas * creditos,
+        suma_ponderada=suma_ponderada,
+        uc_calificadas=uc_calificadas,
+        actualizado=timezone.now(),
+    )
+    if not actualizados:
+        actualizar([estudiante_id])
+    incrementar(f'estudiante:{estudiante_id}')
+
+
+def _calcular(estudiantes):
+    """Resúmenes (sin guardar) de los estudiantes del queryset, en tres consultas."""
+    periodo_activo = PeriodoAcademico.objects.filter(activo=True).order_by('pk').values_list('pk', flat=True).first()
+    aprobada = Q(nota_final__gte=NOTA_APROBATORIA)
+    calificada = Q(nota_final__isnull=False)
+
+    notas = {
+        fila['inscripcion__estudiante_id']: fila
+        for fila in DetalleInscripcion.objects.filter(inscripcion__estudiante__in=estudiantes).values(
+            'inscripcion__estudiante_id'
+        ).annotate(
+            aprobadas=Count('id', filter=aprobada),
+            uc_aprobadas=Sum('asignatura__creditos', filter=aprobada),
+            uc_calificadas=Sum('asignatura__creditos', filter=calificada),
+            suma_ponderada=Sum(ExpressionWrapper(
+                F('nota_final') * F('asignatura__creditos'), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ), filter=calificada),
+            uc_periodo_actual=Sum('asignatura__creditos', filter=Q(inscripcion__periodo_id=periodo_activo)),
+        ).order_by()
+    }
+    totales = dict(
+        Asignatura.objects.filter(programa__estudiante__in=estudiantes).values('programa_id').annotate(
+            total=Count('id', distinct=True)
+        ).order_by().values_list('programa_id', 'total')
+    )
+
+    resumenes = []
+    for estudiante_id, programa_id in estudiantes.values_list('pk', 'programa_id'):
+        fila = notas.get(estudiante_id, {})
+        total = totales.get(programa_id, 0)
+        aprobadas = fila.get('aprobadas', 0)
+        uc_calificadas = fila.get('uc_calificadas') or 0
+        suma_ponderada = Decimal(fila.get('suma_ponderada') or 0)
+        indice = None
+        if uc_calificadas:
+            # Redondeo hacia arriba en los empates, como ROUND() en la base de datos (ver _aplicar_ajuste).
+            indice = (suma_ponderada / uc_calificadas).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        resumenes.append(ResumenEstudiante(
+            estudiante_id=estudiante_id,
+            # Mismo cálculo que Estudiante.calcular_avance().
+            avance=round((aprobadas / total) * 100, 2) if total else 0,
+            aprobadas=aprobadas,
+            total_asignaturas=total,
+            uc_aprobadas=fila.get('uc_aprobadas') or 0,
+            uc_periodo_actual=fila.get('uc_periodo_actual') or 0,
+            indice=indice,
+            suma_ponderada=suma_ponderada,
+            uc_calificadas=uc_calificadas,
+        ))
+    return resumenes
+
+
+def actualizar(estudiante_ids):
+    """
+    Recalcula y guarda los resúmenes de los estudiantes indicados. No invalida
+    cachés: quien lo llama tras un cambio de notas incrementa 'estudiante:<pk>'.
+    """
+    estudiante_ids = set(estudiante_ids)
+    if not hasattr(_local, 'recalculados'):
+        _local.recalculados = {}
+    _local.recalculados.update(dict.fromkeys(estudiante_ids, _secuencia()))
+    resumenes = _calcular(Estudiante.objects.filter(pk__in=estudiante_ids))
+    if resumenes:
+        ResumenEstudiante.objects.bulk_create(
+            resumenes, update_conflicts=True, unique_fields=['estudiante'], update_fields=CAMPOS_RESUMEN
+        )
+    return resumenes
+
+
+def reconstruir():
+    """Rehace la tabla completa. Retorna el número de resúmenes."""
+    _local.reconstruido = _secuencia()
+    resumenes = _calcular(Estudiante.objects.all())
+    # Upsert en lugar de borrar y crear: así no cambian los ids de las filas existentes.
+    ResumenEstudiante.objects.bulk_create(
+        resumenes, batch_size=1000, update_conflicts=True, unique_fields=['estudiante'], update_fields=CAMPOS_RESUMEN
+    )
+    incrementar(ALCANCE)
+    return len(resumenes)
+
+
+def obtener(estudiante):
+    """Resumen del estudiante; si aún no existe se calcula en el momento."""
+    try:
+        return ResumenEstudiante.objects.get(estudiante=estudiante)
+    except ResumenEstudiante.DoesNotExist:
+        return actualizar([estudiante.pk])[0]
+
+
+def obtener_varios(estudiantes):
+    """
+    Resúmenes por pk para una lista de estudiantes cargada con select_related('resumen');
+    los que falten se calculan juntos.
+    """
+    resumenes = {}
+    for estudiante in estudiantes:
+        try:
+            resumenes[estudiante.pk] = estudiante.resumen
+        except ResumenEstudiante.DoesNotExist:
+            pass
+    faltantes = {estudiante.pk for estudiante in estudiantes} - resumenes.keys()
+    if faltantes:
+        resumenes.update({resumen.estudiante_id: resumen for resumen in actualizar(faltantes)})
+    return resumenes
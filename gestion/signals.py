@@ -30,9 +30,20 @@ if user_signed_up is not None:
             pass
 
 
-from django.db.models.signals import post_save
-from gestion.models import PeriodoAcademico, DetalleInscripcion, Seccion
-from gestion.notifications import notify_student_period_start, notify_student_risk, notify_student_failure, notify_docente_assignment
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.auth.models import User
+from gestion.models import PeriodoAcademico, DetalleInscripcion, Seccion, Horario, Asignatura, Inscripcion, Programa, Planificacion, Estudiante
+from gestion.cache import incrementar
+from gestion.prelaciones import alcance as alcance_prelaciones
+from gestion.notifications import notify_student_period_start, notify_docente_assignment
+from gestion import auditoria, estadisticas, resumenes
+
+
+def _invalidar(*alcances):
+    """Incrementar las versiones al confirmar la transacción (antes, otra solicitud cachearía datos sin confirmar)."""
+    transaction.on_commit(lambda: incrementar(*alcances))
+
 
 @receiver(post_save, sender=PeriodoAcademico)
 def periodo_notification(sender, instance, created, **kwargs):
@@ -43,23 +54,185 @@ def periodo_notification(sender, instance, created, **kwargs):
         for est in estudiantes:
             notify_student_period_start(est, instance)
 
+
+@receiver(post_save, sender=Horario)
+@receiver(post_delete, sender=Horario)
+def actualizar_mascara_seccion(sender, instance, **kwargs):
+    """Mantener actualizada la máscara de ocupación de la sección."""
+    Seccion(pk=instance.seccion_id).actualizar_mascara_horario()
+
+
+@receiver(post_delete, sender=DetalleInscripcion)
+def liberar_cupo_seccion(sender, instance, **kwargs):
+    """Liberar el cupo de la sección al eliminar una inscripción del período activo."""
+    if instance.seccion_id and PeriodoAcademico.objects.filter(inscripcion=instance.inscripcion_id, activo=True).exists():
+        Seccion(pk=instance.seccion_id).liberar_cupo()
+
+
+@receiver(post_save, sender=DetalleInscripcion)
+def auditar_notas(sender, instance, **kwargs):
+    """Registrar en la auditoría las notas que cambiaron (se llama antes de refrescar los valores originales)."""
+    auditoria.registrar([instance])
+
+
+@receiver(post_delete, sender=DetalleInscripcion)
+def descontar_detalle_inscripcion(sender, instance, **kwargs):
+    """Mantener los contadores de la inscripción al eliminar un detalle."""
+    Inscripcion(pk=instance.inscripcion_id).ajustar_contadores(
+        total=-1, calificadas=-int(instance.valor_original('nota_final') is not None)
+    )
+
+
+@receiver(post_save, sender=DetalleInscripcion)
+@receiver(post_delete, sender=DetalleInscripcion)
+def actualizar_estadisticas_seccion(sender, instance, created=None, update_fields=None, **kwargs):
+    """Recalcular las estadísticas de la sección (y de la anterior si cambió) al confirmar la transacción."""
+    if update_fields is not None and not estadisticas.CAMPOS_RELEVANTES.intersection(update_fields):
+        return
+    seccion_anterior = instance.valor_original('seccion_id')
+    if (created is False and instance.tiene_valores_originales('seccion_id', 'inscripcion_id', 'nota_final')
+            and instance.seccion_id == seccion_anterior and instance.inscripcion_id == instance.valor_original('inscripcion_id')):
+        # Solo pudo cambiar la nota: se ajusta la fila en lugar de recalcular la sección.
+        estadisticas.ajustar(instance.seccion_id, instance.inscripcion_id, instance.valor_original('nota_final'), instance.nota_final)
+        return
+    estadisticas.marcar(instance.seccion_id, seccion_anterior)
+
+
+@receiver(post_save, sender=DetalleInscripcion)
+@receiver(post_delete, sender=DetalleInscripcion)
+def invalidar_cache_estudiante(sender, instance, **kwargs):
+    """Invalidar los datos cacheados del estudiante cuando cambian sus notas o inscripciones."""
+    estudiante_id = _estudiante_del_detalle(instance)
+    if estudiante_id:
+        _invalidar(f'estudiante:{estudiante_id}')
+
+
+def _estudiante_del_detalle(detalle):
+    if DetalleInscripcion._meta.get_field('inscripcion').is_cached(detalle):
+        return detalle.inscripcion.estudiante_id
+    return Inscripcion.objects.filter(pk=detalle.inscripcion_id).values_list('estudiante_id', flat=True).first()
+
+
+@receiver(post_save, sender=DetalleInscripcion)
+@receiver(post_delete, sender=DetalleInscripcion)
+def actualizar_resumen_estudiante(sender, instance, created=None, update_fields=None, **kwargs):
+    """Recalcular el resumen académico del estudiante al confirmar la transacción."""
+    if update_fields is not None and not resumenes.CAMPOS_RELEVANTES.intersection(update_fields):
+        return
+    estudiante_id = _estudiante_del_detalle(instance)
+    if (created is False and instance.tiene_valores_originales('asignatura_id', 'inscripcion_id', 'nota_final')
+            and instance.asignatura_id == instance.valor_original('asignatura_id')
+            and instance.inscripcion_id == instance.valor_original('inscripcion_id')):
+        # Solo pudo cambiar la nota: se ajusta el resumen en lugar de recalcularlo.
+        resumenes.ajustar(estudiante_id, instance.asignatura_id, instance.valor_original('nota_final'), instance.nota_final)
+        return
+    resumenes.marcar(estudiante_id)
+
+
+@receiver(post_save, sender=Estudiante)
+def actualizar_resumen_por_programa(sender, instance, **kwargs):
+    """El avance depende del programa del estudiante: recalcular al crearlo o editarlo."""
+    resumenes.marcar(instance.pk)
+
+
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+def actualizar_resumenes_del_programa(sender, instance, **kwargs):
+    """Las asignaturas y UC del pensum cambian el avance de todos los estudiantes del programa."""
+    resumenes.marcar(*Estudiante.objects.filter(programa_id=instance.programa_id).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=PeriodoAcademico)
+def actualizar_resumenes_por_periodo(sender, instance, created, update_fields=None, **kwargs):
+    """Las UC del período actual cambian para todos al activar o cerrar un período."""
+    if update_fields is not None and 'activo' not in update_fields:
+        return
+    if instance.activo == (False if created else instance.activo_original):
+        return
+    resumenes.marcar_todos()
+
+
+@receiver(post_save, sender=PeriodoAcademico)
+def congelar_estadisticas_al_cerrar(sender, instance, created, update_fields=None, **kwargs):
+    """Congelar las estadísticas del período al cerrarlo, sea desde la API, el admin o la consola."""
+    if created or (update_fields is not None and 'activo' not in update_fields):
+        return
+    if instance.activo_original and not instance.activo:
+        transaction.on_commit(lambda: estadisticas.congelar_periodo(instance))
+
+
+@receiver(post_save, sender=Seccion)
+@receiver(post_delete, sender=Seccion)
+@receiver(post_save, sender=Horario)
+@receiver(post_delete, sender=Horario)
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+@receiver(m2m_changed, sender=Asignatura.prelaciones.through)
+def invalidar_cache_secciones(sender, **kwargs):
+    """Invalidar los datos cacheados que dependen de la oferta de secciones."""
+    _invalidar('secciones')
+
+
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+def invalidar_grafo_asignatura(sender, instance, **kwargs):
+    """Invalidar el grafo de prelaciones del programa al crear, editar o eliminar una asignatura."""
+    _invalidar(alcance_prelaciones(instance.programa_id))
+
+
+@receiver(m2m_changed, sender=Asignatura.prelaciones.through)
+def invalidar_grafo_prelaciones(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidar el grafo de prelaciones cuando se agregan o quitan prelaciones."""
+    if not action.startswith('post_'):
+        return
+    programas = {instance.programa_id}
+    if reverse and pk_set:
+        # Desde el lado inverso, las asignaturas afectadas son las de pk_set.
+        programas.update(Asignatura.objects.filter(pk__in=pk_set).values_list('programa_id', flat=True))
+    _invalidar(*(alcance_prelaciones(programa_id) for programa_id in programas))
+
+
+@receiver(post_save, sender=PeriodoAcademico)
+@receiver(post_delete, sender=PeriodoAcademico)
+def invalidar_cache_periodos(sender, **kwargs):
+    _invalidar('periodos')
+
+
 @receiver(post_save, sender=DetalleInscripcion)
-def risk_notification(sender, instance, **kwargs):
-    """Verificar riesgo de reprobación al guardar una nota."""
-    if instance.estatus in ['CURSANDO', 'REPROBADO']:
-        notas = [n for n in [instance.nota1, instance.nota2, instance.nota3, instance.nota4] if n is not None]
-        num_notas = len(notas)
-        
-        if num_notas == 3:
-            suma = sum(notas)
-            necesario = 40 - suma
-            if necesario >= 15:
-                promedio_actual = sum(notas) / num_notas
-                notify_student_risk(instance.inscripcion.estudiante, instance.asignatura, promedio_actual, necesario)
-                
-        elif num_notas == 4:
-            nota_final = sum(notas) / 4
-            if nota_final < 10:
-                notify_student_failure(instance.inscripcion.estudiante, instance.asignatura, nota_final)
+@receiver(post_delete, sender=DetalleInscripcion)
+def invalidar_cache_inscripciones(sender, instance, created=False, update_fields=None, **kwargs):
+    """Invalidar los conteos de inscritos por sección cuando se inscribe, retira o cambia de sección."""
+    if update_fields is not None and not created and not {'seccion', 'seccion_id', 'inscripcion', 'inscripcion_id'}.intersection(update_fields):
+        return
+    _invalidar('inscripciones')
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_delete, sender=Estudiante)
+def invalidar_cache_datos_estudiante(sender, instance, **kwargs):
+    """Invalidar los datos cacheados del estudiante al editar su ficha (programa, datos personales)."""
+    _invalidar(f'estudiante:{instance.pk}')
+
+
+@receiver(post_save, sender=Programa)
+@receiver(post_delete, sender=Programa)
+def invalidar_cache_programas(sender, **kwargs):
+    _invalidar('programas')
+
+
+@receiver(post_save, sender=Planificacion)
+@receiver(post_delete, sender=Planificacion)
+@receiver(m2m_changed, sender=Asignatura.tutores.through)
+def invalidar_cache_asignaturas(sender, **kwargs):
+    """Invalidar los datos de asignaturas que no dependen de la oferta de secciones (planes y tutores)."""
+    _invalidar('asignaturas')
+
 
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuarios(sender, update_fields=None, **kwargs):
+    """Invalidar las respuestas que muestran nombres de usuarios (docentes, tutores)."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    _invalidar('usuarios')
 
@@ -43,3 +43,55 @@ else:
         except Exception as e:
             logger.exception('Failed to start alert thread: %s', e)
             return _send_work(to_email, subject, html_content)
+
+
+def _procesar_inscripciones(limite=None):
+    from django.conf import settings
+    from gestion.inscripciones import procesar_solicitudes
+    return procesar_solicitudes(limite or settings.INSCRIPCIONES_LOTE_COLA)
+
+
+if HUEY is not None:
+    @HUEY.task()
+    def procesar_inscripciones_task(limite=None):
+        return _procesar_inscripciones(limite)
+else:
+    # Sin Huey la cola vive solo en la base de datos y la drena
+    # `manage.py procesar_inscripciones`.
+    procesar_inscripciones_task = None
+
+
+def _enviar_correos(limite=None):
+    from gestion.correos import enviar_pendientes
+    return enviar_pendientes(limite)
+
+
+if HUEY is not None:
+    from huey import crontab
+
+    @HUEY.task()
+    def enviar_correos_task(limite=None):
+        return _enviar_correos(limite)
+
+    @HUEY.periodic_task(crontab(minute='*'))
+    def reintentar_correos_task():
+        # Toma los correos cuyo reintento ya venció.
+        return _enviar_correos()
+else:
+    # Sin Huey la bandeja la drena `manage.py enviar_correos`.
+    enviar_correos_task = None
+
+
+def _escanear_alertas():
+    from gestion.alertas import escanear
+    return escanear()
+
+
+if HUEY is not None:
+    @HUEY.periodic_task(crontab(hour='6', minute='0'))
+    def escanear_alertas_task():
+        # Alerta temprana diaria del período activo.
+        return _escanear_alertas()
+else:
+    # Sin Huey el escaneo lo ejecuta `manage.py escanear_alertas` (cron).
+    escanear_alertas_task = None
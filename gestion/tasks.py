@@ -1,6 +1,6 @@
 """Wrapper to keep `import gestion.tasks` working while implementation
 is located under `gestion.tasking.tasks` for better organization.
 """
-from .tasking.tasks import send_alert_task, HUEY
+from .tasking.tasks import send_alert_task, procesar_inscripciones_task, enviar_correos_task, escanear_alertas_task, HUEY
 
-__all__ = ['send_alert_task', 'HUEY']
+__all__ = ['send_alert_task', 'procesar_inscripciones_task', 'enviar_correos_task', 'escanear_alertas_task', 'HUEY']
@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gestion.alertas import escanear
+from gestion.correos import enviar_pendientes
+from gestion.models import Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion, Seccion, AlertaTemprana
+
+
+def crear_periodo_con_notas(notas_por_estudiante, sufijo=''):
+    docente = User.objects.create_user(username=f'docente_alerta{sufijo}')
+    docente.groups.add(Group.objects.get_or_create(name='Docente')[0])
+    prog = Programa.objects.create(nombre_programa=f'Alerta{sufijo}', titulo_otorgado='T', duracion_anios=4)
+    periodo = PeriodoAcademico.objects.get_or_create(
+        nombre_periodo='1-2025', defaults={'fecha_inicio': '2025-01-01', 'fecha_fin': '2025-06-01', 'activo': True}
+    )[0]
+    asig = Asignatura.objects.create(programa=prog, codigo=f'AL{sufijo}', nombre_asignatura='Física', creditos=3, semestre=1)
+    seccion = Seccion.objects.create(asignatura=asig, codigo_seccion='D1', docente=docente)
+
+    detalles = []
+    for i, notas in enumerate(notas_por_estudiante):
+        user = User.objects.create_user(username=f'alerta{sufijo}{i}', email=f'alerta{sufijo}{i}@example.com')
+        est = Estudiante.objects.create(usuario=user, programa=prog, cedula=f'V-AL{sufijo}{i}', telefono='000')
+        ins = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+        detalles.append(DetalleInscripcion.objects.create(
+            inscripcion=ins, asignatura=asig, seccion=seccion, **dict(zip(['nota1', 'nota2', 'nota3', 'nota4'], notas))
+        ))
+    return periodo, docente, detalles
+
+
+def test_escaneo_notifica_solo_alertas_nuevas(db, mailoutbox, django_capture_on_commit_callbacks):
+    periodo, _, detalles = crear_periodo_con_notas([
+        (5, 10, 8),       # riesgo: necesita 17
+        (15, 15, 15),     # sin riesgo
+        (5, 5, 5, 5),     # reprobado
+        (10,),            # aún sin suficientes notas
+    ])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert escanear() == {'nuevas': 2, 'resueltas': 0, 'vigentes': 2}
+    enviar_pendientes()
+    avisos = sorted((m.to[0], m.subject.split(':')[0]) for m in mailoutbox if not m.subject.startswith('Resumen de Notas'))
+    assert avisos == [('alerta0@example.com', 'Alerta de Rendimiento'), ('alerta2@example.com', 'Notificación de Reprobación')]
+
+    riesgo = AlertaTemprana.objects.get(detalle=detalles[0])
+    assert (riesgo.tipo, riesgo.promedio, riesgo.nota_necesaria) == ('RIESGO', Decimal('7.67'), 17)
+
+    # Editar la nota sin salir del riesgo no repite el correo.
+    detalles[0].nota2 = 11
+    detalles[0].save()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert escanear(periodo) == {'nuevas': 0, 'resueltas': 0, 'vigentes': 2}
+    assert enviar_pendientes() == (0, 0)
+
+    # Salir del riesgo resuelve la alerta; entrar en riesgo genera una nueva.
+    detalles[0].nota3 = 18
+    detalles[0].save()
+    detalles[3].nota2, detalles[3].nota3 = 6, 7
+    detalles[3].save()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert escanear(periodo) == {'nuevas': 1, 'resueltas': 1, 'vigentes': 2}
+    assert enviar_pendientes() == (1, 0)
+    assert set(AlertaTemprana.objects.values_list('detalle_id', flat=True)) == {detalles[2].pk, detalles[3].pk}
+
+
+def test_escaneo_en_consultas_constantes(db):
+    def consultas(notas, sufijo):
+        crear_periodo_con_notas(notas, sufijo)
+        with CaptureQueriesContext(connection) as ctx:
+            escanear(notificar=False)
+        return len(ctx.captured_queries)
+
+    pocas = consultas([(5, 5, 5)] * 2, 'a')
+    muchas = consultas([(5, 5, 5), (4, 4, 4, 4)] * 10, 'b')
+    assert muchas == pocas
+
+
+def test_listado_de_alertas_por_alcance(db):
+    cache.clear()
+    periodo, docente, _ = crear_periodo_con_notas([(5, 5, 5), (4, 4, 4, 4)])
+    crear_periodo_con_notas([(6, 6, 6)], sufijo='otro')
+    escanear(notificar=False)
+
+    admin = User.objects.create_user(username='admin_alerta')
+    admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    resp = client.get('/api/estadisticas/alertas/')
+    assert resp.status_code == 200
+    assert [(a['cedula'], a['tipo']) for a in resp.data] == [('V-AL1', 'REPROBADO'), ('V-AL0', 'RIESGO'), ('V-ALotro0', 'RIESGO')]
+    assert resp.data[1]['nota_necesaria'] == 25.0
+
+    assert len(client.get('/api/estadisticas/alertas/', {'tipo': 'riesgo'}).data) == 2
+
+    client.force_authenticate(user=docente)
+    assert [a['cedula'] for a in client.get('/api/estadisticas/alertas/').data] == ['V-AL1', 'V-AL0']
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from gestion.models import AuditoriaNota
+from gestion.tests.test_calificaciones import crear_seccion_con_estudiantes
+
+
+def test_auditoria_registra_cambios_en_un_solo_insert(db, django_capture_on_commit_callbacks):
+    client, seccion, detalles = crear_seccion_con_estudiantes(5)
+    filas = [{'detalle_id': d.id, 'nota1': 12, 'nota2': 14} for d in detalles]
+
+    with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': filas}, format='json')
+    assert resp.status_code == 200
+    inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "gestion_auditorianota"')]
+    assert len(inserts) == 1
+    assert AuditoriaNota.objects.count() == 10
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(f'/api/secciones/{seccion.id}/calificar/', {'detalle_id': detalles[0].id, 'nota1': 18}, format='json')
+    assert resp.status_code == 200
+    entrada = AuditoriaNota.objects.filter(detalle=detalles[0], campo='nota1').first()
+    assert (entrada.valor_anterior, entrada.valor_nuevo) == (Decimal('12'), Decimal('18'))
+    assert entrada.usuario == seccion.docente
+    assert entrada.origen == f'/api/secciones/{seccion.id}/calificar/'
+
+    resp = client.get('/api/auditoria-notas/', {'estudiante': detalles[0].inscripcion.estudiante_id})
+    assert resp.status_code == 200
+    assert resp.data['count'] == 3
+    assert resp.data['results'][0]['valor_nuevo'] == '18.00'
+
+
+def test_auditoria_descarta_lote_revertido(db, monkeypatch, django_capture_on_commit_callbacks):
+    client, seccion, detalles = crear_seccion_con_estudiantes(2)
+    filas = [{'detalle_id': d.id, 'nota1': 12} for d in detalles]
+
+    def fallar(*args):
+        raise RuntimeError('fallo después de escribir las notas')
+
+    # El lote falla dentro de la transacción, después de registrar la auditoría.
+    monkeypatch.setattr('gestion.calificaciones.estadisticas.marcar', fallar)
+    client.raise_request_exception = False
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': filas}, format='json')
+    assert resp.status_code == 500
+    assert not AuditoriaNota.objects.exists()
+
+    monkeypatch.undo()
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': filas}, format='json')
+    assert resp.status_code == 200
+    assert AuditoriaNota.objects.count() == 2
+
+
+def test_compactar_auditoria_conserva_valor_original_y_final(db, django_capture_on_commit_callbacks):
+    client, seccion, detalles = crear_seccion_con_estudiantes(1)
+    detalle = detalles[0]
+    for nota in (10, 12, 16):
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(f'/api/secciones/{seccion.id}/calificar/', {'detalle_id': detalle.id, 'nota1': nota}, format='json')
+    AuditoriaNota.objects.update(fecha=timezone.now() - timedelta(days=400))
+
+    call_command('compactar_auditoria', dias=180, stdout=StringIO())
+
+    entrada = AuditoriaNota.objects.get()
+    assert (entrada.valor_anterior, entrada.valor_nuevo) == (None, Decimal('16'))
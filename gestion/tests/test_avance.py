@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gestion.models import Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion
+from gestion.resumenes import reconstruir
+
+
+def crear_programa(estudiantes, sufijo=''):
+    prog = Programa.objects.create(nombre_programa=f'Avance{sufijo}', titulo_otorgado='T', duracion_anios=4)
+    asignaturas = [
+        Asignatura.objects.create(programa=prog, codigo=f'AV{i}', nombre_asignatura=f'Asig {i}', creditos=3, semestre=1)
+        for i in range(4)
+    ]
+    periodo = PeriodoAcademico.objects.create(nombre_periodo=f'1-2025{sufijo}', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=False)
+    for n in range(estudiantes):
+        est = Estudiante.objects.create(usuario=User.objects.create_user(username=f'av{sufijo}{n}'), programa=prog, cedula=f'V-AV{sufijo}{n}', telefono='000')
+        ins = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+        for i, asig in enumerate(asignaturas[:n % 4 + 1]):
+            DetalleInscripcion.objects.create(inscripcion=ins, asignatura=asig, nota_final=8 + i * 3)
+    return prog
+
+
+def test_con_avance_coincide_con_calcular_avance(db):
+    crear_programa(4)
+    Estudiante.objects.create(usuario=User.objects.create_user(username='sin_pensum'), programa=Programa.objects.create(
+        nombre_programa='Vacío', titulo_otorgado='T', duracion_anios=4), cedula='V-AV-X', telefono='000')
+
+    for est in Estudiante.objects.con_avance():
+        assert est.avance == est.calcular_avance()
+        assert est.total_asignaturas == (4 if est.programa.nombre_programa == 'Avance' else 0)
+    assert sorted(Estudiante.objects.con_avance().values_list('avance', flat=True)) == [0, 0, 25.0, 50.0, 75.0]
+
+
+def test_listado_y_reporte_en_consultas_constantes(db):
+    admin = User.objects.create_superuser(username='admin_av', password='x')
+    client = APIClient()
+    client.force_authenticate(user=admin)
+
+    def consultas(url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get(url, params)
+        assert resp.status_code == 200
+        return resp, len(ctx.captured_queries)
+
+    prog = crear_programa(3)
+    reconstruir()
+    consultas('/api/estudiantes/')  # calienta las consultas de autenticación
+    resp, pocas = consultas('/api/estudiantes/', programa=prog.pk)
+    _, reporte_pocas = consultas('/api/estudiantes/reporte_excel/')
+    fila = next(e for e in resp.json() if e['cedula'] == 'V-AV2')
+    assert (fila['aprobadas'], fila['total_asignaturas'], fila['porcentaje_avance']) == (2, 4, 50.0)
+
+    prog = crear_programa(12, sufijo='b')
+    reconstruir()
+    _, muchas = consultas('/api/estudiantes/', programa=prog.pk)
+    _, reporte_muchas = consultas('/api/estudiantes/reporte_excel/')
+    assert muchas == pocas
+    assert reporte_muchas == reporte_pocas == 1
+
+    est = Estudiante.objects.get(cedula='V-AV2')
+    resp, _ = consultas(f'/api/estudiantes/{est.pk}/')
+    assert resp.json()['porcentaje_avance'] == 50.0
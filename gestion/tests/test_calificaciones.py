@@ -0,0 +1,300 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User, Group
+from rest_framework.test import APIClient
+
+from gestion.correos import enviar_pendientes
+from gestion.models import Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion, Seccion, CorreoPendiente
+
+
+def crear_seccion_con_estudiantes(num_estudiantes):
+    docente = User.objects.create_user(username='docente_lote', password='pass')
+    docente.groups.add(Group.objects.get_or_create(name='Docente')[0])
+    prog = Programa.objects.create(nombre_programa='Lote', titulo_otorgado='T', duracion_anios=4)
+    periodo = PeriodoAcademico.objects.create(nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=False)
+    asig = Asignatura.objects.create(programa=prog, codigo='CAL', nombre_asignatura='Calculo', creditos=3, semestre=1)
+    seccion = Seccion.objects.create(asignatura=asig, codigo_seccion='D1', docente=docente)
+
+    detalles = []
+    for i in range(num_estudiantes):
+        user = User.objects.create_user(username=f'alumno{i}', email=f'alumno{i}@example.com')
+        est = Estudiante.objects.create(usuario=user, programa=prog, cedula=f'V-L{i}', telefono='000')
+        ins = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+        detalles.append(DetalleInscripcion.objects.create(inscripcion=ins, asignatura=asig, seccion=seccion))
+
+    client = APIClient()
+    client.force_authenticate(user=docente)
+    return client, seccion, detalles
+
+
+def test_calificar_lote_es_atomico(db):
+    client, seccion, detalles = crear_seccion_con_estudiantes(2)
+
+    resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+        {'detalle_id': detalles[0].id, 'nota1': 15, 'nota2': 15, 'nota3': 15, 'nota4': 15},
+        {'detalle_id': detalles[1].id, 'nota1': 12, 'nota_reparacion': 14},
+    ]}, format='json')
+
+    assert resp.status_code == 400
+    assert resp.data['errores'] == [{
+        'detalle_id': detalles[1].id,
+        'error': 'Debe cargar las 4 notas parciales antes de asignar una Nota de Reparación.'
+    }]
+    assert not DetalleInscripcion.objects.filter(nota1__isnull=False).exists()
+
+
+def test_calificar_lote_rechaza_detalles_duplicados(db):
+    client, seccion, detalles = crear_seccion_con_estudiantes(1)
+
+    resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+        {'detalle_id': detalles[0].id, 'nota1': 15, 'nota2': 15, 'nota3': 15, 'nota4': 15},
+        {'detalle_id': str(detalles[0].id), 'nota1': 5},
+    ]}, format='json')
+
+    assert resp.status_code == 400
+    assert resp.data['errores'] == [{'detalle_id': detalles[0].id, 'error': 'Detalle duplicado en el lote.'}]
+    assert not DetalleInscripcion.objects.filter(nota1__isnull=False).exists()
+
+
+def test_calificar_lote_rechaza_notas_invalidas_sin_borrar(db):
+    client, seccion, detalles = crear_seccion_con_estudiantes(3)
+    DetalleInscripcion.objects.filter(pk__in=[d.pk for d in detalles]).update(nota1=12)
+
+    resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+        {'detalle_id': detalles[0].id, 'nota1': 'doce'},
+        {'detalle_id': detalles[1].id, 'nota1': 25},
+        {'detalle_id': detalles[2].id, 'nota1': None},
+    ]}, format='json')
+    assert resp.status_code == 400
+    assert resp.data['errores'] == [
+        {'detalle_id': detalles[0].id, 'error': 'Nota 1 inválida: doce. Debe ser un número entre 1 y 20.'},
+        {'detalle_id': detalles[1].id, 'error': 'Nota 1 inválida: 25. Debe ser un número entre 1 y 20.'},
+    ]
+    assert DetalleInscripcion.objects.filter(nota1=12).count() == 3
+
+    # Un null explícito sí borra la nota; las ausentes no se tocan.
+    resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+        {'detalle_id': detalles[2].id, 'nota1': None},
+        {'detalle_id': detalles[1].id, 'nota2': 14},
+    ]}, format='json')
+    assert resp.status_code == 200, resp.data
+    notas = dict(DetalleInscripcion.objects.values_list('id', 'nota1'))
+    assert notas == {detalles[0].id: 12, detalles[1].id: 12, detalles[2].id: None}
+
+
+def test_calificar_lote_guarda_y_notifica_despues_del_commit(db, mailoutbox, django_capture_on_commit_callbacks):
+    client, seccion, detalles = crear_seccion_con_estudiantes(3)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+            {'detalle_id': detalles[0].id, 'nota1': 15, 'nota2': 15, 'nota3': 15, 'nota4': 15},
+            {'detalle_id': detalles[1].id, 'nota1': 5, 'nota2': 5, 'nota3': 5, 'nota4': 5},
+            {'detalle_id': str(detalles[2].id), 'nota1': 18},
+        ]}, format='json')
+
+    assert resp.status_code == 200, resp.data
+    finales = dict(DetalleInscripcion.objects.values_list('id', 'estatus'))
+    assert finales == {detalles[0].id: 'APROBADO', detalles[1].id: 'REPROBADO', detalles[2].id: 'CURSANDO'}
+
+    # Los correos quedan en la bandeja de salida hasta que el worker los envía.
+    assert CorreoPendiente.objects.count() == 3
+    assert len(mailoutbox) == 0
+    assert enviar_pendientes() == (3, 0)
+
+    asuntos = sorted(m.subject for m in mailoutbox)
+    # Resumen del período para los dos estudiantes que completaron notas y aviso de reprobación para uno.
+    assert len([a for a in asuntos if a.startswith('Resumen de Notas')]) == 2
+    assert len(mailoutbox) == 3
+
+    resp = client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+        {'detalle_id': detalles[1].id, 'nota_reparacion': 12},
+    ]}, format='json')
+    assert resp.status_code == 200
+    assert resp.data['resultados'][0]['estatus'] == 'APROBADO'
+
+
+def test_guardar_detalle_solo_escribe_columnas_modificadas(db):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    client, seccion, detalles = crear_seccion_con_estudiantes(1)
+    detalle = DetalleInscripcion.objects.select_related('inscripcion').get(pk=detalles[0].pk)
+    detalle.nota1 = 14
+
+    with CaptureQueriesContext(connection) as ctx:
+        detalle.save()
+
+    consultas = [q['sql'] for q in ctx.captured_queries if 'gestion_detalleinscripcion' in q['sql']]
+    assert len(consultas) == 1
+    assert consultas[0].startswith('UPDATE') and '"nota1"' in consultas[0] and '"nota2"' not in consultas[0]
+    assert detalle.campos_modificados() == []
+
+    detalle.nota2 = detalle.nota3 = detalle.nota4 = 14
+    detalle.save()
+    detalle.refresh_from_db()
+    assert detalle.nota_final == 14 and detalle.estatus == 'APROBADO'
+
+
+def test_calificar_con_numero_fijo_de_consultas(db, django_assert_num_queries):
+    client, seccion, detalles = crear_seccion_con_estudiantes(1)
+    url = f'/api/secciones/{seccion.id}/calificar/'
+    client.post(url, {'detalle_id': detalles[0].id, 'nota1': 12}, format='json')  # registra la actividad del usuario
+
+    # 4 de permisos y sección, 1 SELECT del detalle con su inscripción y 1 UPDATE:
+    # la auditoría y las señales no consultan la inscripción de nuevo.
+    with django_assert_num_queries(6):
+        resp = client.post(url, {'detalle_id': detalles[0].id, 'nota1': 13}, format='json')
+    assert resp.status_code == 200
+
+    # Al completar la materia: + contador, conteo de la inscripción, detalles con
+    # sus asignaturas y el correo del resumen (sin cargar estudiante ni período).
+    with django_assert_num_queries(10):
+        resp = client.post(url, {'detalle_id': detalles[0].id, 'nota2': 12, 'nota3': 12, 'nota4': 5}, format='json')
+    assert resp.data['estatus'] == 'APROBADO'
+
+
+def test_refresh_from_db_renueva_los_valores_originales(db, mailoutbox):
+    _, _, detalles = crear_seccion_con_estudiantes(1)
+    detalle = DetalleInscripcion.objects.select_related('inscripcion').get(pk=detalles[0].pk)
+
+    # Otra instancia completa las notas; esta se recarga y se guarda sin cambios.
+    otra = DetalleInscripcion.objects.get(pk=detalle.pk)
+    otra.nota1 = otra.nota2 = otra.nota3 = otra.nota4 = 15
+    otra.save()
+    avisos = len(mailoutbox) + CorreoPendiente.objects.count()
+
+    detalle.refresh_from_db()
+    assert detalle.campos_modificados() == []
+    detalle.save()
+
+    detalle.inscripcion.refresh_from_db()
+    assert detalle.inscripcion.asignaturas_calificadas == 1
+    assert len(mailoutbox) + CorreoPendiente.objects.count() == avisos
+
+    detalle.nota_reparacion = 16
+    detalle.save()
+    detalle.refresh_from_db(fields=['nota_reparacion'])
+    assert detalle.campos_modificados() == []
+
+
+def test_contadores_de_inscripcion_se_mantienen(db):
+    client, seccion, detalles = crear_seccion_con_estudiantes(1)
+    inscripcion = detalles[0].inscripcion
+    otra = Asignatura.objects.create(programa=seccion.asignatura.programa, codigo='FIS', nombre_asignatura='Fisica', creditos=3, semestre=1)
+    extra = DetalleInscripcion.objects.create(inscripcion=inscripcion, asignatura=otra)
+
+    inscripcion.refresh_from_db()
+    assert (inscripcion.total_asignaturas, inscripcion.asignaturas_calificadas) == (2, 0)
+
+    client.post(f'/api/secciones/{seccion.id}/calificar-lote/', {'calificaciones': [
+        {'detalle_id': detalles[0].id, 'nota1': 15, 'nota2': 15, 'nota3': 15, 'nota4': 15},
+    ]}, format='json')
+    inscripcion.refresh_from_db()
+    assert (inscripcion.total_asignaturas, inscripcion.asignaturas_calificadas) == (2, 1)
+    assert inscripcion.periodo.calificaciones_pendientes() == 1
+
+    extra.delete()
+    inscripcion.refresh_from_db()
+    assert inscripcion.calificaciones_completas
+    assert inscripcion.periodo.calificaciones_pendientes() == 0
+
+    Inscripcion.objects.update(total_asignaturas=0, asignaturas_calificadas=0)
+    Inscripcion.recontar_contadores()
+    inscripcion.refresh_from_db()
+    assert (inscripcion.total_asignaturas, inscripcion.asignaturas_calificadas) == (1, 1)
+
+
+def test_importar_planilla_de_descargar_listado(db):
+    import io
+    import time
+    import openpyxl
+
+    client, seccion, detalles = crear_seccion_con_estudiantes(500)
+    resp = client.get(f'/api/secciones/{seccion.id}/descargar-listado/')
+    wb = openpyxl.load_workbook(io.BytesIO(resp.content))
+    ws = wb.active
+    for fila in range(8, 8 + 500):
+        for columna in range(5, 9):
+            ws.cell(row=fila, column=columna, value=15)
+    ws.cell(row=8, column=5, value=4)
+    cedula_modificada = ws.cell(row=8, column=1).value
+
+    archivo = io.BytesIO()
+    wb.save(archivo)
+    archivo.seek(0)
+    archivo.name = 'planilla.xlsx'
+
+    inicio = time.perf_counter()
+    resp = client.post(f'/api/secciones/{seccion.id}/importar-notas/', {'archivo': archivo}, format='multipart')
+    assert time.perf_counter() - inicio < 3
+    assert resp.status_code == 200, resp.data
+    assert resp.data['modificadas'] == 500
+    primera = resp.data['filas'][0]
+    assert primera['cedula'] == cedula_modificada
+    assert primera['cambios']['nota1'] == {'antes': None, 'despues': 4.0}
+    assert primera['cambios']['nota_final'] == {'antes': None, 'despues': 12.25}
+    assert DetalleInscripcion.objects.filter(estatus='APROBADO').count() == 500
+
+
+def test_importar_planilla_rechaza_filas_invalidas(db):
+    import io
+    import openpyxl
+
+    client, seccion, detalles = crear_seccion_con_estudiantes(2)
+    resp = client.get(f'/api/secciones/{seccion.id}/descargar-listado/')
+    wb = openpyxl.load_workbook(io.BytesIO(resp.content))
+    ws = wb.active
+    ws.cell(row=8, column=5, value=15)
+    ws.cell(row=9, column=5, value=25)
+    ws.cell(row=10, column=1, value='V-NOEXISTE')
+
+    archivo = io.BytesIO()
+    wb.save(archivo)
+    archivo.seek(0)
+    archivo.name = 'planilla.xlsx'
+
+    resp = client.post(f'/api/secciones/{seccion.id}/importar-notas/', {'archivo': archivo}, format='multipart')
+    assert resp.status_code == 400
+    assert [e['fila'] for e in resp.data['errores']] == [9, 10]
+    assert not DetalleInscripcion.objects.filter(nota1__isnull=False).exists()
+
+
+def test_recalcular_notas_del_periodo(db):
+    from django.core.management import call_command
+    from io import StringIO
+
+    client, seccion, detalles = crear_seccion_con_estudiantes(3)
+    # Notas cargadas directamente en la base de datos, sin pasar por save().
+    DetalleInscripcion.objects.filter(pk=detalles[0].pk).update(nota1=15, nota2=15, nota3=15, nota4=16)
+    DetalleInscripcion.objects.filter(pk=detalles[1].pk).update(nota1=5, nota2=5, nota3=5, nota4=5, nota_reparacion=11)
+    DetalleInscripcion.objects.filter(pk=detalles[2].pk).update(nota1=9)
+    periodo = detalles[0].inscripcion.periodo
+
+    salida = StringIO()
+    call_command('recalcular_notas', periodo=str(periodo.pk), simular=True, stdout=salida)
+    assert 'Simulación: 2 registros' in salida.getvalue()
+    assert not DetalleInscripcion.objects.filter(nota_final__isnull=False).exists()
+
+    call_command('recalcular_notas', periodo=str(periodo.pk), stdout=StringIO())
+    finales = {d.pk: (d.nota_final, d.estatus) for d in DetalleInscripcion.objects.all()}
+    assert finales[detalles[0].pk] == (Decimal('15.25'), 'APROBADO')
+    assert finales[detalles[1].pk] == (Decimal('11'), 'APROBADO')
+    assert finales[detalles[2].pk] == (None, 'CURSANDO')
+    assert periodo.calificaciones_pendientes() == 1
+
+
+def test_recalcular_notas_solo_marca_estudiantes_con_cambios(db, monkeypatch):
+    from gestion import resumenes
+    from gestion.calificaciones import recalcular_notas
+
+    _, seccion, detalles = crear_seccion_con_estudiantes(3)
+    DetalleInscripcion.objects.filter(pk=detalles[0].pk).update(nota1=15, nota2=15, nota3=15, nota4=16)
+    marcados = []
+    invalidados = []
+    monkeypatch.setattr(resumenes, 'marcar', lambda *ids: marcados.extend(ids))
+    monkeypatch.setattr('gestion.calificaciones.incrementar', lambda *alcances: invalidados.extend(alcances))
+
+    assert len(recalcular_notas(detalles[0].inscripcion.periodo)) == 1
+    estudiante_id = detalles[0].inscripcion.estudiante_id
+    assert marcados == [estudiante_id]
+    assert invalidados == [f'estudiante:{estudiante_id}']
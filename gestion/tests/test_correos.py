@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from gestion.correos import enviar_pendientes
+from gestion.models import CorreoPendiente
+from gestion.notifications import send_notification_email
+
+
+def test_correo_revertido_no_se_envia(db, mailoutbox):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            send_notification_email('Asunto', 'Mensaje', 'a@example.com')
+            raise RuntimeError
+
+    send_notification_email('Otro', 'Mensaje', ['b@example.com', 'c@example.com'])
+
+    assert len(mailoutbox) == 0
+    assert enviar_pendientes() == (1, 0)
+    assert [m.to for m in mailoutbox] == [['b@example.com', 'c@example.com']]
+    assert CorreoPendiente.objects.get().estado == CorreoPendiente.ENVIADO
+
+
+def test_lote_usa_una_sola_conexion(db, monkeypatch):
+    for i in range(5):
+        send_notification_email(f'Asunto {i}', 'Mensaje', f'alumno{i}@example.com')
+
+    conexiones = []
+    original = mail.get_connection
+
+    def contar_conexiones(*args, **kwargs):
+        conexion = original(*args, **kwargs)
+        conexiones.append(conexion)
+        return conexion
+
+    monkeypatch.setattr('gestion.correos.get_connection', contar_conexiones)
+    assert enviar_pendientes(limite=3) == (3, 0)
+    assert enviar_pendientes(limite=3) == (2, 0)
+    assert len(conexiones) == 2
+    assert len(mail.outbox) == 5
+
+
+def test_reintentos_con_espera_y_estado_fallido(db, settings, monkeypatch):
+    settings.CORREOS_MAX_INTENTOS = 2
+    send_notification_email('Asunto', 'Mensaje', 'a@example.com')
+
+    def fallar(self, *args, **kwargs):
+        raise ConnectionError('SMTP caído')
+
+    monkeypatch.setattr('django.core.mail.EmailMessage.send', fallar)
+
+    assert enviar_pendientes() == (0, 1)
+    correo = CorreoPendiente.objects.get()
+    assert correo.estado == CorreoPendiente.PENDIENTE
+    assert correo.intentos == 1
+    assert correo.proximo_intento > timezone.now() + timedelta(seconds=50)
+    assert correo.ultimo_error == 'SMTP caído'
+
+    # Todavía no vence el reintento.
+    assert enviar_pendientes() == (0, 0)
+
+    CorreoPendiente.objects.update(proximo_intento=timezone.now())
+    assert enviar_pendientes() == (0, 1)
+    assert CorreoPendiente.objects.get().estado == CorreoPendiente.FALLIDO
+    assert enviar_pendientes() == (0, 0)
+
+
+def test_lote_se_reclama_antes_de_enviar(db, monkeypatch):
+    send_notification_email('Asunto', 'Mensaje', 'a@example.com')
+    send = mail.EmailMessage.send
+    vistos = []
+
+    def enviar(self, *args, **kwargs):
+        # Durante el envío el correo ya está reclamado: otro worker no lo toma.
+        vistos.append(CorreoPendiente.objects.filter(proximo_intento__lte=timezone.now()).count())
+        return send(self, *args, **kwargs)
+
+    monkeypatch.setattr('django.core.mail.EmailMessage.send', enviar)
+    assert enviar_pendientes() == (1, 0)
+    assert vistos == [0]
+    assert CorreoPendiente.objects.get().estado == CorreoPendiente.ENVIADO
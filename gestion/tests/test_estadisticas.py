@@ -0,0 +1,295 @@
+from django.contrib.auth.models import User, Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gestion.estadisticas import reconstruir
+from gestion.models import Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion, Seccion, EstadisticaSeccion
+
+
+def crear_programa(num_asignaturas, secciones_por_asignatura=2, sufijo=''):
+    docente = User.objects.create_user(username=f'docente_est{sufijo}', first_name='Ana', last_name='Pérez')
+    docente.groups.add(Group.objects.get_or_create(name='Docente')[0])
+    otro = User.objects.create_user(username=f'docente_otro{sufijo}')
+    admin = User.objects.create_user(username=f'admin_est{sufijo}')
+    admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+    prog = Programa.objects.create(nombre_programa=f'Est{sufijo}', titulo_otorgado='T', duracion_anios=4)
+    periodo = PeriodoAcademico.objects.create(nombre_periodo=f'1-2025{sufijo}', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=False)
+    est = Estudiante.objects.create(usuario=User.objects.create_user(username=f'alumno_est{sufijo}'), programa=prog, cedula=f'V-E1{sufijo}', telefono='000')
+    ins = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+
+    for i in range(num_asignaturas):
+        asig = Asignatura.objects.create(programa=prog, codigo=f'E{i}', nombre_asignatura=f'Asig {i}', creditos=3, semestre=i % 3 + 1, orden=i)
+        for j in range(secciones_por_asignatura):
+            seccion = Seccion.objects.create(asignatura=asig, codigo_seccion=f'D{j}', docente=docente if j == 0 else otro)
+            if j == 0:
+                DetalleInscripcion.objects.create(inscripcion=ins, asignatura=asig, seccion=seccion, nota_final=10 + i, estatus='APROBADO')
+    return prog, docente, admin
+
+
+def get_desglose(user, prog):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get('/api/estadisticas/desglose/', {'programa': prog.id})
+    assert resp.status_code == 200
+    return resp.data, len(ctx.captured_queries)
+
+
+def test_desglose_respeta_alcance_y_forma(db, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, docente, admin = crear_programa(3)
+
+    data, _ = get_desglose(admin, prog)
+    assert [sem['id'] for sem in data] == [1, 2, 3]
+    asig = data[0]['subjects'][0]
+    assert asig['code'] == 'E0'
+    assert [s['code'] for s in asig['sections']] == ['D0', 'D1']
+    assert asig['sections'][0] == {
+        'id': asig['sections'][0]['id'], 'code': 'D0', 'docente': 'Ana Pérez',
+        'count': 1, 'avg': 10.0, 'max': 10.0, 'min': 10.0,
+    }
+    assert asig['sections'][1]['count'] == 0
+
+    data, _ = get_desglose(docente, prog)
+    assert all(len(subj['sections']) == 1 for sem in data for subj in sem['subjects'])
+    assert data[2]['subjects'][0]['sections'][0]['avg'] == 12.0
+
+
+def test_desglose_consultas_constantes(db, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, _, admin = crear_programa(2)
+    _, pocas = get_desglose(admin, prog)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, _, admin = crear_programa(20, secciones_por_asignatura=3, sufijo='b')
+    _, muchas = get_desglose(admin, prog)
+
+    assert muchas == pocas
+
+
+def test_estadisticas_se_mantienen_al_cambiar_notas(db, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, docente, admin = crear_programa(1)
+    detalle = DetalleInscripcion.objects.get()
+    fila = EstadisticaSeccion.objects.get(seccion=detalle.seccion)
+    assert (fila.inscritos, fila.calificadas, fila.aprobados, fila.nota_maxima) == (1, 1, 1, 10)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        otro = DetalleInscripcion.objects.create(
+            inscripcion=detalle.inscripcion, asignatura=detalle.asignatura, seccion=detalle.seccion
+        )
+    with django_capture_on_commit_callbacks(execute=True):
+        otro.nota_reparacion = 6
+        otro.save()
+    fila.refresh_from_db()
+    assert (fila.inscritos, fila.calificadas, fila.aprobados) == (2, 2, 1)
+    assert (fila.nota_minima, fila.suma_notas) == (6, 16)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        otro.delete()
+        detalle.delete()
+    assert not EstadisticaSeccion.objects.exists()
+
+    # Un cambio que no pasa por save() se repara con la reconstrucción completa.
+    DetalleInscripcion.objects.bulk_create([
+        DetalleInscripcion(inscripcion=detalle.inscripcion, asignatura=detalle.asignatura, seccion=detalle.seccion)
+    ])
+    assert reconstruir() == 1
+    assert EstadisticaSeccion.objects.get().inscritos == 1
+
+
+def test_cambio_de_nota_ajusta_la_fila_sin_recalcular(db, django_capture_on_commit_callbacks):
+    from gestion.estadisticas import _calcular
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, docente, admin = crear_programa(1)
+        detalle = DetalleInscripcion.objects.get()
+        otros = [
+            DetalleInscripcion.objects.create(inscripcion=detalle.inscripcion, asignatura=detalle.asignatura, seccion=detalle.seccion)
+            for _ in range(2)
+        ]
+
+    def comparar():
+        fila = EstadisticaSeccion.objects.get(seccion=detalle.seccion)
+        esperada = _calcular(DetalleInscripcion.objects.filter(seccion=detalle.seccion))[0]
+        campos = ['inscritos', 'calificadas', 'aprobados', 'suma_notas', 'nota_maxima', 'nota_minima']
+        assert [getattr(fila, c) for c in campos] == [getattr(esperada, c) for c in campos]
+
+    # Cambia la única nota, entran notas nuevas, cambian máxima y mínima, y se quitan extremos (estos recalculan la sección).
+    for objetivo, nota in [(detalle, 15), (detalle, 10), (otros[0], 12), (otros[1], 7), (otros[0], 18), (otros[1], 9), (otros[0], 11), (otros[1], None), (detalle, 3)]:
+        objetivo.nota_reparacion = nota
+        if nota is None:
+            objetivo.nota_final = None
+        with django_capture_on_commit_callbacks(execute=True):
+            objetivo.save()
+        comparar()
+
+    otros[0].nota_reparacion = 14
+    with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+        otros[0].save()
+    comparar()
+    consultas = [q['sql'] for q in ctx.captured_queries if 'gestion_estadisticaseccion' in q['sql']]
+    assert len(consultas) == 1 and consultas[0].startswith('UPDATE')
+
+
+def test_chart_data_agrupado_cacheado_e_invalidado(db, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    cache.clear()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, docente, admin = crear_programa(3)
+        Asignatura.objects.create(programa=prog, codigo='E10', nombre_asignatura='Pasantía', creditos=3, semestre=10)
+    client = APIClient()
+    client.force_authenticate(user=admin)
+
+    resp = client.get('/api/estadisticas/chart-data/', {'programa': prog.id})
+    assert resp.data['labels'] == [f'Sem {n}' for n in range(1, 11)]
+    assert resp.data['data'][:4] == [10.0, 11.0, 12.0, 0]
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get('/api/estadisticas/chart-data/', {'programa': prog.id}).data == resp.data
+    assert not any('gestion_estadisticaseccion' in q['sql'] for q in ctx.captured_queries)
+
+    detalle = DetalleInscripcion.objects.get(asignatura__codigo='E0')
+    with django_capture_on_commit_callbacks(execute=True):
+        detalle.nota_reparacion = 16
+        detalle.save()
+    assert client.get('/api/estadisticas/chart-data/', {'programa': prog.id}).data['data'][0] == 16.0
+
+    client.force_authenticate(user=docente)
+    assert client.get('/api/estadisticas/chart-data/').data['data'][:3] == [16.0, 11.0, 12.0]
+
+
+def test_periodo_cerrado_se_lee_de_la_instantanea(db, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    from gestion.estadisticas import congelar_periodo
+    from gestion.models import InstantaneaEstadistica
+    cache.clear()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, docente, admin = crear_programa(3)
+    periodo = PeriodoAcademico.objects.get()
+    # 3 secciones con estudiantes, 3 asignaturas, 3 semestres y el programa.
+    assert congelar_periodo(periodo) == 10
+    programa = InstantaneaEstadistica.objects.get(periodo=periodo, nivel=InstantaneaEstadistica.PROGRAMA)
+    assert (programa.inscritos, programa.calificadas, programa.suma_notas) == (3, 3, 33)
+
+    # Cambios posteriores al cierre no alteran la instantánea.
+    detalle = DetalleInscripcion.objects.get(asignatura__codigo='E0')
+    with django_capture_on_commit_callbacks(execute=True):
+        detalle.nota_reparacion = 20
+        detalle.save()
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    congelado = client.get('/api/estadisticas/desglose/', {'programa': prog.id, 'periodo': periodo.id}).data
+    vivo = client.get('/api/estadisticas/desglose/', {'programa': prog.id}).data
+    assert congelado[0]['subjects'][0]['sections'][0]['avg'] == 10.0
+    assert vivo[0]['subjects'][0]['sections'][0]['avg'] == 20.0
+    # La instantánea solo guarda secciones que tuvieron estudiantes.
+    assert [s['code'] for s in congelado[0]['subjects'][0]['sections']] == ['D0']
+
+    chart = client.get('/api/estadisticas/chart-data/', {'programa': prog.id, 'periodo': periodo.id}).data
+    assert chart['data'][:3] == [10.0, 11.0, 12.0]
+
+    client.force_authenticate(user=docente)
+    chart = client.get('/api/estadisticas/chart-data/', {'periodo': periodo.id}).data
+    assert chart['data'][:3] == [10.0, 11.0, 12.0]
+
+    assert client.get('/api/estadisticas/desglose/', {'periodo': 999}).status_code == 404
+
+
+def test_cerrar_periodo_fuera_de_la_api_lo_congela(db, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    from gestion.models import InstantaneaEstadistica
+    cache.clear()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog, docente, admin = crear_programa(3)
+    periodo = PeriodoAcademico.objects.get()
+    client = APIClient()
+    client.force_authenticate(user=admin)
+
+    # Cerrado sin instantánea (p. ej. con un UPDATE directo): se lee en vivo.
+    PeriodoAcademico.objects.filter(pk=periodo.pk).update(activo=False)
+    vivo = client.get('/api/estadisticas/desglose/', {'programa': prog.id, 'periodo': periodo.id}).data
+    assert vivo[0]['subjects'][0]['sections'][0]['avg'] == 10.0
+
+    # Cerrarlo con save() (admin, PUT/PATCH o consola) congela sus estadísticas.
+    with django_capture_on_commit_callbacks(execute=True):
+        periodo.activo = True
+        periodo.save()
+    periodo.refresh_from_db()
+    with django_capture_on_commit_callbacks(execute=True):
+        periodo.activo = False
+        periodo.save()
+    assert InstantaneaEstadistica.objects.filter(periodo=periodo, nivel=InstantaneaEstadistica.PROGRAMA).exists()
+
+    detalle = DetalleInscripcion.objects.get(asignatura__codigo='E0')
+    with django_capture_on_commit_callbacks(execute=True):
+        detalle.nota_reparacion = 20
+        detalle.save()
+    congelado = client.get('/api/estadisticas/desglose/', {'programa': prog.id, 'periodo': periodo.id}).data
+    assert congelado[0]['subjects'][0]['sections'][0]['avg'] == 10.0
+
+
+def get_distribucion(user, prog):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get('/api/estadisticas/distribucion/', {'programa': prog.id})
+    assert resp.status_code == 200
+    return resp.data, len(ctx.captured_queries)
+
+
+def test_distribucion_de_notas(db):
+    from django.core.cache import cache
+    cache.clear()
+    prog, docente, admin = crear_programa(1)
+    seccion = Seccion.objects.get(codigo_seccion='D0')
+    otra = Seccion.objects.get(codigo_seccion='D1')
+    periodo = PeriodoAcademico.objects.get()
+    for i, (nota, sec) in enumerate([(4, seccion), (9.5, seccion), (15, otra), (20, otra), (None, otra)]):
+        est = Estudiante.objects.create(usuario=User.objects.create_user(username=f'dist{i}'), programa=prog, cedula=f'V-D{i}', telefono='000')
+        ins = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+        DetalleInscripcion.objects.create(inscripcion=ins, asignatura=seccion.asignatura, seccion=sec, nota_final=nota)
+    # Igual que el desglose, las secciones sin docente no cuentan.
+    sin_docente = Seccion.objects.create(asignatura=seccion.asignatura, codigo_seccion='SD')
+    DetalleInscripcion.objects.create(inscripcion=ins, asignatura=seccion.asignatura, seccion=sin_docente, nota_final=1)
+
+    data, _ = get_distribucion(admin, prog)
+    assert 'SD' not in {s['code'] for s in data['secciones']}
+    assert data['etiquetas_histograma'][0] == '1' and data['etiquetas_histograma'][-1] == '20'
+    assert len(data['etiquetas_histograma']) == 20
+    asig = data['asignaturas'][0]
+    # Notas: 4, 9.5, 10 (de crear_programa), 15, 20 y una sin calificar.
+    assert (asig['inscritos'], asig['calificadas'], asig['aprobados']) == (6, 5, 3)
+    assert asig['tasa_aprobacion'] == 60.0
+    assert (asig['q1'], asig['mediana'], asig['q3']) == (9.5, 10.0, 15.0)
+    assert asig['desviacion'] == 5.42
+    # Barra por nota entera: 4, 9 (el 9.5), 10, 15 y 20, cada una en su propia barra.
+    por_nota = dict(zip(data['etiquetas_histograma'], asig['histograma']))
+    assert {nota: n for nota, n in por_nota.items() if n} == {'4': 1, '9': 1, '10': 1, '15': 1, '20': 1}
+    assert por_nota['19'] == 0
+
+    por_codigo = {s['code']: s for s in data['secciones']}
+    assert por_codigo['D0']['calificadas'] == 3 and por_codigo['D0']['mediana'] == 9.5
+    assert por_codigo['D1']['q1'] == 16.25
+
+    data, _ = get_distribucion(docente, prog)
+    assert [s['code'] for s in data['secciones']] == ['D0']
+    assert data['asignaturas'][0]['calificadas'] == 3
+
+
+def test_distribucion_consultas_constantes(db):
+    from django.core.cache import cache
+    cache.clear()
+    prog, _, admin = crear_programa(2)
+    _, pocas = get_distribucion(admin, prog)
+
+    prog, _, admin = crear_programa(20, secciones_por_asignatura=3, sufijo='b')
+    _, muchas = get_distribucion(admin, prog)
+
+    assert muchas == pocas
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gestion.models import Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion
+
+
+def cliente(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def test_programas_responde_304_sin_consultar(db, django_capture_on_commit_callbacks):
+    cache.clear()
+    admin = User.objects.create_user(username='admin_etag')
+    admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+    Programa.objects.create(nombre_programa='Etag', titulo_otorgado='T', duracion_anios=4)
+    client = cliente(admin)
+
+    resp = client.get('/api/programas/')
+    assert resp.status_code == 200
+    etag = resp['ETag']
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get('/api/programas/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+    assert resp['ETag'] == etag
+    assert not any('gestion_programa' in q['sql'] for q in ctx.captured_queries)
+
+    # Otro usuario u otra URL no comparten ETag.
+    assert cliente(User.objects.create_user(username='otro_etag')).get('/api/programas/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert client.get('/api/programas/?page=1', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Programa.objects.create(nombre_programa='Nuevo', titulo_otorgado='T', duracion_anios=4)
+    resp = client.get('/api/programas/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp['ETag'] != etag
+
+
+def test_mi_progreso_se_revalida_al_cambiar_notas(db, django_capture_on_commit_callbacks):
+    cache.clear()
+    user = User.objects.create_user(username='alumno_etag')
+    user.groups.add(Group.objects.get_or_create(name='Estudiante')[0])
+    prog = Programa.objects.create(nombre_programa='Etag', titulo_otorgado='T', duracion_anios=4)
+    asig = Asignatura.objects.create(programa=prog, codigo='ET1', nombre_asignatura='Etag', creditos=3, semestre=1)
+    periodo = PeriodoAcademico.objects.create(nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=False)
+    est = Estudiante.objects.create(usuario=user, programa=prog, cedula='V-ET', telefono='000')
+    detalle = DetalleInscripcion.objects.create(inscripcion=Inscripcion.objects.create(estudiante=est, periodo=periodo), asignatura=asig)
+    client = cliente(user)
+
+    etag = client.get('/api/estadisticas/mi-progreso/')['ETag']
+    assert client.get('/api/estadisticas/mi-progreso/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    detalle.nota_reparacion = 15
+    with django_capture_on_commit_callbacks(execute=True):
+        detalle.save()
+    resp = client.get('/api/estadisticas/mi-progreso/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp.data['desglose'][0]['subjects'][0]['sections'][0]['nota_final'] == 15.0
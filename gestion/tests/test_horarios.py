@@ -0,0 +1,67 @@
+from datetime import time
+
+from gestion.horarios import mascara_horario, bloques_de_mascara, choques, bit
+from gestion.models import Programa, Asignatura, Seccion, Horario
+
+
+def test_mascara_cubre_bloques_solapados():
+    mascara = mascara_horario(1, time(7, 0), time(8, 30))
+    assert bloques_de_mascara(mascara) == [(1, 1), (1, 2)]
+    assert mascara_horario(2, time(7, 45), time(8, 30)) == bit(2, 2)
+    assert mascara_horario(7, time(16, 45), time(17, 30)) == bit(7, 14)
+
+
+def test_horarios_fuera_de_grilla_tambien_chocan():
+    noche = mascara_horario(6, time(18, 0), time(19, 30))
+    assert noche != 0
+    assert noche & mascara_horario(6, time(18, 45), time(20, 0))
+    assert not noche & mascara_horario(6, time(19, 45), time(21, 0))
+    assert mascara_horario(1, time(6, 0), time(7, 0)) & mascara_horario(1, time(6, 30), time(7, 45))
+
+
+def test_choques_en_lote():
+    mascaras = {
+        'a': mascara_horario(1, time(7, 0), time(8, 30)),
+        'b': mascara_horario(1, time(7, 45), time(9, 15)),
+        'c': mascara_horario(1, time(9, 15), time(10, 0)),
+    }
+    assert choques(mascaras) == [('a', 'b')]
+
+
+def test_mascara_de_seccion_se_mantiene_con_horarios(db):
+    prog = Programa.objects.create(nombre_programa='P', titulo_otorgado='T', duracion_anios=4)
+    asig = Asignatura.objects.create(programa=prog, codigo='A1', nombre_asignatura='A', creditos=3, semestre=1)
+    seccion = Seccion.objects.create(asignatura=asig, codigo_seccion='D1')
+
+    h = Horario.objects.create(seccion=seccion, dia=3, hora_inicio=time(10, 0), hora_fin=time(11, 30))
+    seccion.refresh_from_db()
+    assert seccion.mascara == bit(3, 5) | bit(3, 6)
+
+    h.hora_fin = time(10, 45)
+    h.save()
+    seccion.refresh_from_db()
+    assert seccion.mascara == bit(3, 5)
+
+    h.delete()
+    seccion.refresh_from_db()
+    assert seccion.mascara == 0
+
+
+def test_horario_del_estudiante_en_el_periodo_activo(db):
+    import io
+    import openpyxl
+    from gestion.tests.test_inscripciones import crear_escenario
+
+    client, est, _ = crear_escenario(0, 1)
+
+    resp = client.get('/api/estudiantes/mi-horario/')
+    assert resp.status_code == 200, resp.data
+    assert resp.data['periodo'] == '1-2025'
+    assert [(h['dia'], h['hora_inicio'], h['codigo']) for h in resp.data['horario']] == [(2, '07:00', 'INS0')]
+
+    resp = client.get('/api/estudiantes/descargar-horario/')
+    assert resp.status_code == 200
+    ws = openpyxl.load_workbook(io.BytesIO(resp.content)).active
+    celdas = [c for fila in ws.iter_rows(values_only=True) for c in fila if isinstance(c, str)]
+    assert any('1-2025' in c for c in celdas)
+    assert any('Ins 0' in c for c in celdas)
@@ -0,0 +1,374 @@
+from datetime import time
+
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gestion.models import (
+    Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion, Seccion, Horario
+)
+
+
+def crear_escenario(num_prelaciones, num_inscritas):
+    # Las versiones de caché solo cambian al confirmar, y el fixture db nunca confirma.
+    cache.clear()
+    Group.objects.get_or_create(name='Estudiante')
+    prog = Programa.objects.create(nombre_programa=f'P{num_prelaciones}-{num_inscritas}', titulo_otorgado='T', duracion_anios=4)
+    periodo, _ = PeriodoAcademico.objects.get_or_create(
+        nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2099-06-01',
+        activo=True, inscripciones_activas=True
+    )
+    periodo_anterior, _ = PeriodoAcademico.objects.get_or_create(
+        nombre_periodo='2-2024', fecha_inicio='2024-06-01', fecha_fin='2024-12-01', activo=False
+    )
+
+    user = User.objects.create_user(username=f'est{num_prelaciones}-{num_inscritas}', password='pass')
+    user.groups.add(Group.objects.get(name='Estudiante'))
+    est = Estudiante.objects.create(usuario=user, programa=prog, cedula=f'V-{num_prelaciones}{num_inscritas}', telefono='000')
+
+    objetivo = Asignatura.objects.create(programa=prog, codigo='OBJ', nombre_asignatura='Objetivo', creditos=3, semestre=3)
+    seccion = Seccion.objects.create(asignatura=objetivo, codigo_seccion='D1')
+    Horario.objects.create(seccion=seccion, dia=1, hora_inicio=time(7, 0), hora_fin=time(8, 30))
+
+    anterior = Inscripcion.objects.create(estudiante=est, periodo=periodo_anterior)
+    for i in range(num_prelaciones):
+        req = Asignatura.objects.create(programa=prog, codigo=f'REQ{i}', nombre_asignatura=f'Req {i}', creditos=1, semestre=1)
+        objetivo.prelaciones.add(req)
+        DetalleInscripcion.objects.create(inscripcion=anterior, asignatura=req, nota_final=15, estatus='APROBADO')
+
+    actual = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+    for i in range(num_inscritas):
+        asig = Asignatura.objects.create(programa=prog, codigo=f'INS{i}', nombre_asignatura=f'Ins {i}', creditos=1, semestre=2)
+        sec = Seccion.objects.create(asignatura=asig, codigo_seccion='D1')
+        Horario.objects.create(seccion=sec, dia=2 + (i % 4), hora_inicio=time(7 + i // 4, 0), hora_fin=time(7 + i // 4, 45))
+        DetalleInscripcion.objects.create(inscripcion=actual, asignatura=asig, seccion=sec)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, est, seccion
+
+
+def contar_consultas_inscripcion(num_prelaciones, num_inscritas):
+    from gestion.prelaciones import obtener_grafo
+    client, est, seccion = crear_escenario(num_prelaciones, num_inscritas)
+    obtener_grafo(est.programa_id)  # El grafo se construye una vez por proceso
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    assert resp.status_code == 200, resp.data
+    return len(ctx.captured_queries)
+
+
+def test_inscripcion_con_numero_acotado_de_consultas(db):
+    pocas = contar_consultas_inscripcion(1, 1)
+    muchas = contar_consultas_inscripcion(8, 8)
+
+    assert muchas == pocas
+    assert muchas <= 15  # incluye el UPDATE del contador de asignaturas de la inscripción
+
+
+def test_inscripcion_rechaza_prelacion_no_aprobada(db):
+    client, est, seccion = crear_escenario(2, 0)
+    DetalleInscripcion.objects.filter(asignatura__codigo='REQ1').update(nota_final=5, estatus='REPROBADO')
+
+    resp = client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    assert resp.status_code == 400
+    assert resp.data['error'] == 'No puedes inscribir esta materia. Requiere haber aprobado: Req 1 (REQ1).'
+
+
+def test_inscripcion_detecta_choque_de_horario(db):
+    client, est, seccion = crear_escenario(0, 1)
+    Horario.objects.create(seccion=seccion, dia=2, hora_inicio=time(7, 30), hora_fin=time(8, 15))
+
+    resp = client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    assert resp.status_code == 400
+    assert resp.data['error'].startswith("CHOQUE DE HORARIO: La asignatura 'Objetivo' choca con 'Ins 0' el día Martes (07:30 - 08:15).")
+
+
+def crear_seccion(prog, codigo, creditos=3, dia=1, hora_inicio=time(9, 15), hora_fin=time(10, 45)):
+    asig = Asignatura.objects.create(programa=prog, codigo=codigo, nombre_asignatura=f'Asig {codigo}', creditos=creditos, semestre=1)
+    seccion = Seccion.objects.create(asignatura=asig, codigo_seccion='D1')
+    Horario.objects.create(seccion=seccion, dia=dia, hora_inicio=hora_inicio, hora_fin=hora_fin)
+    return seccion
+
+
+def test_inscripcion_en_lote_crea_todas(db):
+    client, est, seccion = crear_escenario(0, 1)
+    otra = crear_seccion(est.programa, 'L1', dia=4)
+
+    resp = client.post('/api/secciones/inscribir-lote/', {'secciones': [seccion.id, otra.id]}, format='json')
+    assert resp.status_code == 200, resp.data
+    assert all('detalle_id' in r for r in resp.data['resultados'])
+    assert DetalleInscripcion.objects.filter(seccion__in=[seccion, otra]).count() == 2
+
+
+def test_inscripcion_en_lote_es_atomica(db):
+    client, est, seccion = crear_escenario(0, 0)
+    libre = crear_seccion(est.programa, 'L1', dia=4)
+    choca = crear_seccion(est.programa, 'L2', dia=1, hora_inicio=time(7, 45), hora_fin=time(9, 15))
+    excede = crear_seccion(est.programa, 'L3', creditos=30, dia=5)
+
+    resp = client.post('/api/secciones/inscribir-lote/', {'secciones': [seccion.id, libre.id, choca.id, excede.id]}, format='json')
+    assert resp.status_code == 400
+    resultados = {r['seccion_id']: r for r in resp.data['resultados']}
+    assert 'error' not in resultados[libre.id]
+    assert resultados[choca.id]['error'].startswith("CHOQUE DE HORARIO: La asignatura 'Asig L2' choca con 'Objetivo'")
+    assert 'límite de 35 UC' in resultados[excede.id]['error']
+    assert not DetalleInscripcion.objects.filter(inscripcion__estudiante=est).exists()
+
+
+def test_inscripcion_en_lote_reserva_en_orden_y_reporta_bloqueos(db, monkeypatch):
+    from django.db import OperationalError
+    client, est, seccion = crear_escenario(0, 0)
+    otra = crear_seccion(est.programa, 'L1', dia=4)
+    orden = []
+
+    def ocupar_cupo(self):
+        orden.append(self.pk)
+        if self.pk == otra.pk:
+            raise OperationalError('deadlock detected')
+        return True
+
+    monkeypatch.setattr(Seccion, 'ocupar_cupo', ocupar_cupo)
+    resp = client.post('/api/secciones/inscribir-lote/', {'secciones': [otra.id, seccion.id]}, format='json')
+    assert orden == sorted([otra.id, seccion.id])
+    assert resp.status_code == 400
+    resultados = {r['seccion_id']: r for r in resp.data['resultados']}
+    assert 'error' not in resultados[seccion.id]
+    assert resultados[otra.id]['error'].startswith('No se pudo reservar el cupo de la sección D1 de Asig L1')
+    assert not DetalleInscripcion.objects.filter(inscripcion__estudiante=est).exists()
+
+
+def test_choque_entre_secciones_nocturnas(db):
+    client, est, _ = crear_escenario(0, 0)
+    noche = crear_seccion(est.programa, 'N1', dia=6, hora_inicio=time(18, 0), hora_fin=time(19, 30))
+    choca = crear_seccion(est.programa, 'N2', dia=6, hora_inicio=time(18, 0), hora_fin=time(20, 15))
+
+    resp = client.post('/api/secciones/inscribir-lote/', {'secciones': [noche.id, choca.id]}, format='json')
+    assert resp.status_code == 400
+    resultados = {r['seccion_id']: r for r in resp.data['resultados']}
+    assert 'error' not in resultados[noche.id]
+    assert resultados[choca.id]['error'].startswith("CHOQUE DE HORARIO: La asignatura 'Asig N2' choca con 'Asig N1'")
+
+
+def test_secciones_contiguas_no_chocan(db):
+    client, est, seccion = crear_escenario(0, 0)
+    primera = crear_seccion(est.programa, 'C1', dia=3, hora_inicio=time(7, 0), hora_fin=time(8, 0))
+    segunda = crear_seccion(est.programa, 'C2', dia=3, hora_inicio=time(8, 0), hora_fin=time(9, 0))
+    noche = crear_seccion(est.programa, 'N1', dia=6, hora_inicio=time(18, 0), hora_fin=time(19, 30))
+    tarde_noche = crear_seccion(est.programa, 'N2', dia=6, hora_inicio=time(19, 30), hora_fin=time(21, 0))
+    ids = [primera.id, segunda.id, noche.id, tarde_noche.id]
+
+    resp = client.post('/api/secciones/simular-inscripcion/', {'secciones': ids}, format='json')
+    assert resp.data['valida'] is True, resp.data
+    compartido = [c for c in resp.data['horario'] if c['dia'] == 3 and len(c['asignaturas']) == 2]
+    assert compartido and not any(c['choque'] for c in compartido)
+
+    resp = client.post('/api/secciones/inscribir-lote/', {'secciones': ids}, format='json')
+    assert resp.status_code == 200, resp.data
+    assert DetalleInscripcion.objects.filter(inscripcion__estudiante=est).count() == 4
+
+
+def test_choque_nombra_la_asignatura_que_se_solapa(db):
+    client, est, _ = crear_escenario(0, 0)
+    contigua = crear_seccion(est.programa, 'X1', dia=3, hora_inicio=time(7, 0), hora_fin=time(8, 0))
+    solapada = crear_seccion(est.programa, 'Y1', dia=3, hora_inicio=time(8, 30), hora_fin=time(9, 30))
+    nueva = crear_seccion(est.programa, 'Z1', dia=3, hora_inicio=time(8, 0), hora_fin=time(9, 0))
+
+    resp = client.post('/api/secciones/inscribir-lote/', {'secciones': [contigua.id, solapada.id, nueva.id]}, format='json')
+    assert resp.status_code == 400
+    resultados = {r['seccion_id']: r for r in resp.data['resultados']}
+    assert 'error' not in resultados[contigua.id]
+    assert resultados[nueva.id]['error'].startswith("CHOQUE DE HORARIO: La asignatura 'Asig Z1' choca con 'Asig Y1'")
+
+
+def test_cupo_no_se_sobrepasa_con_inscripciones_concurrentes(transactional_db):
+    import threading
+    from django.db import connections, OperationalError
+
+    prog = Programa.objects.create(nombre_programa='Cupos', titulo_otorgado='T', duracion_anios=4)
+    asig = Asignatura.objects.create(programa=prog, codigo='C1', nombre_asignatura='Cupos', creditos=3, semestre=1)
+    seccion = Seccion.objects.create(asignatura=asig, codigo_seccion='D1', cupo_maximo=5)
+
+    exitos = []
+    inicio = threading.Barrier(20)
+
+    def reservar():
+        try:
+            inicio.wait()
+            for _ in range(50):
+                try:
+                    if Seccion(pk=seccion.pk).ocupar_cupo():
+                        exitos.append(1)
+                    return
+                except OperationalError:
+                    continue  # SQLite bloquea la tabla completa; se reintenta
+        finally:
+            connections.close_all()
+
+    hilos = [threading.Thread(target=reservar) for _ in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    seccion.refresh_from_db()
+    assert len(exitos) == 5
+    assert seccion.inscritos == 5
+
+
+def test_inscripcion_respeta_cupo_y_libera_al_retirarse(db):
+    client, est, seccion = crear_escenario(0, 0)
+    Seccion.objects.filter(pk=seccion.pk).update(cupo_maximo=1, inscritos=1)
+
+    resp = client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    assert resp.status_code == 400
+    assert 'no tiene cupos disponibles' in resp.data['error']
+
+    Seccion.objects.filter(pk=seccion.pk).update(inscritos=0)
+    resp = client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    assert resp.status_code == 200
+    seccion.refresh_from_db()
+    assert seccion.inscritos == 1
+
+    resp = client.post(f'/api/secciones/{seccion.id}/desinscribirme/')
+    assert resp.status_code == 200
+    seccion.refresh_from_db()
+    assert seccion.inscritos == 0
+
+
+def test_modo_cola_respeta_orden_de_llegada(db, settings):
+    from gestion.inscripciones import procesar_solicitudes
+    settings.INSCRIPCIONES_EN_COLA = True
+
+    client, est, seccion = crear_escenario(0, 0)
+    Seccion.objects.filter(pk=seccion.pk).update(cupo_maximo=1)
+    otro_user = User.objects.create_user(username='segundo', password='pass')
+    otro_user.groups.add(Group.objects.get(name='Estudiante'))
+    Estudiante.objects.create(usuario=otro_user, programa=est.programa, cedula='V-2DO', telefono='000')
+    otro_client = APIClient()
+    otro_client.force_authenticate(user=otro_user)
+
+    primera = client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    segunda = otro_client.post(f'/api/secciones/{seccion.id}/inscribirme/')
+    assert primera.status_code == segunda.status_code == 202
+    assert not DetalleInscripcion.objects.filter(seccion=seccion).exists()
+
+    resp = otro_client.get(f"/api/secciones/solicitudes/{segunda.data['solicitud_id']}/")
+    assert resp.data['estado'] == 'PENDIENTE'
+    assert resp.data['posicion'] == 2
+
+    assert procesar_solicitudes() == 2
+
+    resp = client.get(f"/api/secciones/solicitudes/{primera.data['solicitud_id']}/")
+    assert resp.data['estado'] == 'INSCRITA'
+    resp = otro_client.get(f"/api/secciones/solicitudes/{segunda.data['solicitud_id']}/")
+    assert resp.data['estado'] == 'RECHAZADA'
+    assert 'no tiene cupos disponibles' in resp.data['mensaje']
+
+
+def test_modo_cola_rechaza_la_solicitud_que_falla_y_sigue(db, monkeypatch):
+    from gestion import inscripciones
+    from gestion.models import SolicitudInscripcion
+
+    client, est, seccion = crear_escenario(0, 0)
+    otro_user = User.objects.create_user(username='segundo', password='pass')
+    otro = Estudiante.objects.create(usuario=otro_user, programa=est.programa, cedula='V-2DO', telefono='000')
+    primera = SolicitudInscripcion.objects.create(estudiante=est, seccion=seccion)
+    segunda = SolicitudInscripcion.objects.create(estudiante=otro, seccion=seccion)
+
+    inscribir = inscripciones.inscribir
+
+    def inscribir_fallando(estudiante, seccion, **kwargs):
+        if estudiante.pk == est.pk:
+            raise RuntimeError('fallo inesperado')
+        return inscribir(estudiante, seccion, **kwargs)
+
+    monkeypatch.setattr(inscripciones, 'inscribir', inscribir_fallando)
+    assert inscripciones.procesar_solicitudes() == 2
+
+    primera.refresh_from_db()
+    segunda.refresh_from_db()
+    assert primera.estado == 'RECHAZADA' and 'fallo inesperado' in primera.mensaje
+    assert segunda.estado == 'INSCRITA'
+    assert not SolicitudInscripcion.objects.filter(estado='PENDIENTE').exists()
+
+
+def test_secciones_disponibles_clasifica_y_se_invalida(db, django_capture_on_commit_callbacks):
+    client, est, seccion = crear_escenario(1, 1)
+    DetalleInscripcion.objects.filter(asignatura__codigo='REQ0').update(nota_final=5, estatus='REPROBADO')
+    libre = crear_seccion(est.programa, 'L1', dia=4)
+    choca = crear_seccion(est.programa, 'L2', dia=2, hora_inicio=time(7, 0), hora_fin=time(7, 45))
+    pesada = crear_seccion(est.programa, 'L3', creditos=40, dia=5)
+
+    resp = client.get('/api/secciones/disponibles/')
+    assert resp.status_code == 200
+    estados = {s['id']: s for s in resp.data['secciones']}
+    assert estados[seccion.id]['estado'] == 'PRELACION'
+    assert estados[seccion.id]['prelaciones_faltantes'] == [{'codigo': 'REQ0', 'nombre': 'Req 0'}]
+    assert estados[libre.id]['estado'] == 'ELEGIBLE'
+    assert estados[choca.id]['estado'] == 'CHOQUE'
+    assert estados[choca.id]['choca_con'] == ['Ins 0']
+    assert estados[pesada.id]['estado'] == 'LIMITE_UC'
+
+    with CaptureQueriesContext(connection) as ctx:
+        client.get('/api/secciones/disponibles/')
+    assert not any('gestion_seccion' in q['sql'] for q in ctx.captured_queries)
+
+    detalle = DetalleInscripcion.objects.get(asignatura__codigo='REQ0')
+    detalle.nota_final = 15
+    detalle.estatus = 'APROBADO'
+    with django_capture_on_commit_callbacks(execute=True):
+        detalle.save()
+
+    resp = client.get('/api/secciones/disponibles/')
+    estados = {s['id']: s for s in resp.data['secciones']}
+    assert estados[seccion.id]['estado'] == 'ELEGIBLE'
+
+
+def test_grafo_prelaciones_transitivas_y_se_invalida(db, django_capture_on_commit_callbacks):
+    from gestion.prelaciones import obtener_grafo
+    cache.clear()
+
+    prog = Programa.objects.create(nombre_programa='Grafo', titulo_otorgado='T', duracion_anios=4)
+    a = Asignatura.objects.create(programa=prog, codigo='A', nombre_asignatura='A', creditos=3, semestre=1)
+    b = Asignatura.objects.create(programa=prog, codigo='B', nombre_asignatura='B', creditos=3, semestre=2)
+    c = Asignatura.objects.create(programa=prog, codigo='C', nombre_asignatura='C', creditos=3, semestre=3)
+    b.prelaciones.add(a)
+    c.prelaciones.add(b)
+
+    grafo = obtener_grafo(prog.pk)
+    assert grafo.prelaciones(c.pk) == [b.pk]
+    assert sorted(grafo.prelaciones_transitivas(c.pk)) == sorted([a.pk, b.pk])
+    assert grafo.desbloquea(a.pk) == [b.pk]
+    assert grafo.topologico() == [a.pk, b.pk, c.pk]
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert obtener_grafo(prog.pk) is grafo
+    assert len(ctx.captured_queries) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        a.es_requisito_de.remove(b)
+    grafo = obtener_grafo(prog.pk)
+    assert grafo.prelaciones(b.pk) == []
+    assert grafo.prelaciones_transitivas(c.pk) == [b.pk]
+
+
+def test_simulacion_reporta_errores_sin_escribir(db):
+    client, est, seccion = crear_escenario(1, 1)
+    DetalleInscripcion.objects.filter(asignatura__codigo='REQ0').update(nota_final=5, estatus='REPROBADO')
+    choca = crear_seccion(est.programa, 'L2', dia=2, hora_inicio=time(7, 0), hora_fin=time(7, 45))
+    total = DetalleInscripcion.objects.count()
+
+    resp = client.post('/api/secciones/simular-inscripcion/', {'secciones': [seccion.id, choca.id]}, format='json')
+    assert resp.status_code == 200, resp.data
+    assert resp.data['valida'] is False
+    resultados = {r['seccion_id']: r for r in resp.data['resultados']}
+    assert resultados[seccion.id]['errores'] == ['No puedes inscribir esta materia. Requiere haber aprobado: Req 0 (REQ0).']
+    assert resultados[choca.id]['errores'][0].startswith("CHOQUE DE HORARIO: La asignatura 'Asig L2' choca con 'Ins 0'")
+
+    martes = [c for c in resp.data['horario'] if c['dia'] == 2 and c['bloque'] == 1][0]
+    assert martes['choque'] and sorted(martes['asignaturas']) == ['Asig L2', 'Ins 0']
+    assert resp.data['uc_total'] == 1 + 3 + 3
+    assert DetalleInscripcion.objects.count() == total
@@ -0,0 +1,124 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from gestion.models import Programa, Asignatura, Estudiante, PeriodoAcademico, Inscripcion, DetalleInscripcion, ResumenEstudiante
+from gestion.resumenes import obtener_varios
+
+
+def crear_estudiante(prog, n, periodo, notas):
+    est = Estudiante.objects.create(usuario=User.objects.create_user(username=f'res{prog.pk}_{n}'), programa=prog, cedula=f'V-R{prog.pk}-{n}', telefono='000')
+    ins = Inscripcion.objects.create(estudiante=est, periodo=periodo)
+    for asig, nota in notas:
+        DetalleInscripcion.objects.create(inscripcion=ins, asignatura=asig, nota_final=nota)
+    return est
+
+
+def test_resumen_se_mantiene_al_calificar(db, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        prog = Programa.objects.create(nombre_programa='Res', titulo_otorgado='T', duracion_anios=4)
+        a1 = Asignatura.objects.create(programa=prog, codigo='R1', nombre_asignatura='Uno', creditos=4, semestre=1)
+        a2 = Asignatura.objects.create(programa=prog, codigo='R2', nombre_asignatura='Dos', creditos=2, semestre=1)
+        Asignatura.objects.create(programa=prog, codigo='R3', nombre_asignatura='Tres', creditos=3, semestre=2)
+        Asignatura.objects.create(programa=prog, codigo='R4', nombre_asignatura='Cuatro', creditos=3, semestre=2)
+        periodo = PeriodoAcademico.objects.create(nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=True)
+        est = crear_estudiante(prog, 1, periodo, [(a1, 15), (a2, 6)])
+
+    resumen = ResumenEstudiante.objects.get(estudiante=est)
+    assert resumen.avance == est.calcular_avance() == 25.0
+    assert (resumen.aprobadas, resumen.total_asignaturas, resumen.uc_aprobadas) == (1, 4, 4)
+    assert resumen.uc_periodo_actual == est.get_uc_periodo_actual() == 6
+    assert resumen.indice == Decimal('12.00')  # (15*4 + 6*2) / 6
+
+    detalle = DetalleInscripcion.objects.get(asignatura=a2)
+    with django_capture_on_commit_callbacks(execute=True):
+        detalle.nota_reparacion = 12
+        detalle.save()
+
+    resumen.refresh_from_db()
+    assert (resumen.aprobadas, resumen.uc_aprobadas, resumen.avance) == (2, 6, 50.0)
+    assert resumen.indice == Decimal('14.00')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        periodo.activo = False
+        periodo.save()
+    resumen.refresh_from_db()
+    assert resumen.uc_periodo_actual == 0
+
+
+def test_ajuste_de_nota_coincide_con_el_recalculo(db, django_capture_on_commit_callbacks):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from gestion.resumenes import CAMPOS_RESUMEN, _calcular
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog = Programa.objects.create(nombre_programa='Aj', titulo_otorgado='T', duracion_anios=4)
+        asignaturas = [
+            Asignatura.objects.create(programa=prog, codigo=f'AJ{i}', nombre_asignatura=f'Aj {i}', creditos=creditos, semestre=1)
+            for i, creditos in enumerate([4, 3, 2])
+        ]
+        periodo = PeriodoAcademico.objects.create(nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=True)
+        est = crear_estudiante(prog, 1, periodo, [(asignaturas[0], None), (asignaturas[1], None), (asignaturas[2], 8)])
+    detalles = {d.asignatura_id: d for d in DetalleInscripcion.objects.filter(inscripcion__estudiante=est)}
+
+    def comparar():
+        resumen = ResumenEstudiante.objects.get(estudiante=est)
+        esperado = _calcular(Estudiante.objects.filter(pk=est.pk))[0]
+        campos = [c for c in CAMPOS_RESUMEN if c != 'actualizado']
+        assert [getattr(resumen, c) for c in campos] == [getattr(esperado, c) for c in campos]
+
+    for asignatura, nota in [(0, 15), (1, Decimal('9.5')), (2, None), (0, Decimal('11.75')), (1, 20), (0, None), (1, None)]:
+        detalle = detalles[asignaturas[asignatura].pk]
+        detalle.nota_final = nota
+        with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+            detalle.save()
+        comparar()
+        consultas = [q['sql'] for q in ctx.captured_queries if 'gestion_resumenestudiante' in q['sql']]
+        assert len(consultas) == 1 and consultas[0].startswith('UPDATE')
+
+
+def test_periodo_solo_reconstruye_si_cambia_activo(db, django_capture_on_commit_callbacks):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prog = Programa.objects.create(nombre_programa='Per', titulo_otorgado='T', duracion_anios=4)
+        periodo = PeriodoAcademico.objects.create(nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=True)
+        crear_estudiante(prog, 1, periodo, [])
+
+    periodo = PeriodoAcademico.objects.get()
+    periodo.nombre_periodo = '1-2025 (regular)'
+    with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+        periodo.save()
+    assert not any('gestion_resumenestudiante' in q['sql'] for q in ctx.captured_queries)
+
+    periodo.activo = False
+    with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+        periodo.save()
+    assert any('gestion_resumenestudiante' in q['sql'] for q in ctx.captured_queries)
+
+
+def test_obtener_varios_calcula_los_faltantes_en_lote(db):
+    periodo = PeriodoAcademico.objects.create(nombre_periodo='1-2025', fecha_inicio='2025-01-01', fecha_fin='2025-06-01', activo=False)
+
+    def consultas(estudiantes):
+        prog = Programa.objects.create(nombre_programa=f'Lote{estudiantes}', titulo_otorgado='T', duracion_anios=4)
+        asig = Asignatura.objects.create(programa=prog, codigo='R1', nombre_asignatura='Uno', creditos=3, semestre=1)
+        Asignatura.objects.create(programa=prog, codigo='R2', nombre_asignatura='Dos', creditos=3, semestre=1)
+        for n in range(estudiantes):
+            crear_estudiante(prog, n, periodo, [(asig, 10 + n)])
+        lista = list(Estudiante.objects.filter(programa=prog).select_related('resumen'))
+        with CaptureQueriesContext(connection) as ctx:
+            resumenes = obtener_varios(lista)
+        assert {resumen.avance for resumen in resumenes.values()} == {50.0}
+        assert ResumenEstudiante.objects.filter(estudiante__programa=prog).count() == estudiantes
+        # Ya guardados, se leen del select_related sin consultas.
+        lista = list(Estudiante.objects.filter(programa=prog).select_related('resumen'))
+        with CaptureQueriesContext(connection) as leidos:
+            obtener_varios(lista)
+        assert len(leidos.captured_queries) == 0
+        return len(ctx.captured_queries)
+
+    assert consultas(2) == consultas(15)
@@ -45,3 +45,19 @@ class UpdateLastActivityMiddleware:
                 pass 
 
         return response
+
+
+class AuditoriaNotasMiddleware:
+    """Acumula la auditoría de notas de la solicitud y la escribe con un solo bulk_create al final."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from gestion import auditoria
+
+        token = auditoria.iniciar()
+        try:
+            return self.get_response(request)
+        finally:
+            auditoria.finalizar(token, getattr(request, 'user', None), request.path)
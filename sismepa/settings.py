@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -65,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'sismepa.middleware.UpdateLastActivityMiddleware',
+    'sismepa.middleware.AuditoriaNotasMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -108,6 +110,17 @@ if not EMAIL_HOST_USER or not EMAIL_HOST_PASSWORD:
 
 LOW_PERFORMANCE_THRESHOLD = int(os.environ.get('LOW_PERFORMANCE_THRESHOLD', '50'))
 
+# Inscripciones en cola: las solicitudes se aceptan de inmediato y se procesan
+# por orden de llegada (Huey si está disponible, o `manage.py procesar_inscripciones`).
+INSCRIPCIONES_EN_COLA = os.environ.get('INSCRIPCIONES_EN_COLA', 'False') == 'True'
+INSCRIPCIONES_LOTE_COLA = int(os.environ.get('INSCRIPCIONES_LOTE_COLA', '50'))
+
+# Bandeja de salida de correos: las notificaciones se guardan en la base de datos
+# y las envía un worker (Huey o `manage.py enviar_correos`) reutilizando la conexión SMTP.
+CORREOS_EN_COLA = os.environ.get('CORREOS_EN_COLA', 'True') == 'True'
+CORREOS_LOTE = int(os.environ.get('CORREOS_LOTE', '100'))
+CORREOS_MAX_INTENTOS = int(os.environ.get('CORREOS_MAX_INTENTOS', '5'))
+
 # Gemini AI (Asesorías)
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
 
@@ -160,6 +173,26 @@ DATABASES = {
 
 
 
+# Caché compartida entre procesos: los contadores de versión (gestion.cache) deben
+# verse igual en todos los workers web y en el consumidor de Huey. Se usa Redis
+# siempre que esté configurado; la caché en memoria queda para pruebas y desarrollo sin Redis.
+TESTING = 'pytest' in sys.modules or 'test' in sys.argv[1:2]
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL')
+if CACHE_REDIS_URL and not TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'sismepa',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -12,7 +12,7 @@ from gestion.api.views import (
     EstudianteViewSet, AsignaturaViewSet, PensumViewSet,
     PlanificacionViewSet, DocumentoCalificacionesViewSet, UserManagementViewSet, ProgramaViewSet,
     DocenteViewSet, AdminViewSet, SeccionViewSet, PeriodoAcademicoViewSet, EstadisticasViewSet, OnlineUsersView,
-    ChatAsesoriasView
+    ChatAsesoriasView, AuditoriaNotaViewSet
 )
 
 router = DefaultRouter()
@@ -28,6 +28,7 @@ router.register(r'administradores', AdminViewSet, basename='administradores')
 router.register(r'secciones', SeccionViewSet, basename='seccion')
 router.register(r'periodos', PeriodoAcademicoViewSet, basename='periodo')
 router.register(r'estadisticas', EstadisticasViewSet, basename='estadisticas')
+router.register(r'auditoria-notas', AuditoriaNotaViewSet, basename='auditoria-notas')
 
 urlpatterns = [
     path('admin/', admin.site.urls),